@@ -1,12 +1,69 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from nsight import analyze
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from nsight.annotation import annotate
 from nsight.utils import col_panel, row_panel
 
+# Type checkers see the lazily imported attributes with their types
+if TYPE_CHECKING:
+    from nsight import (
+        aggregates,
+        analyze,
+        collection,
+        derived,
+        exceptions,
+        extraction,
+        occupancy,
+        store,
+        telemetry,
+        thermovision,
+        transformation,
+        utils,
+        visualization,
+    )
+    from nsight.transformation import vectorized
+
 # Versioning Scheme: major.minor.build
 __version__ = "0.9.4"
 
+_SUBMODULES = (
+    "aggregates",
+    "analyze",
+    "collection",
+    "derived",
+    "exceptions",
+    "extraction",
+    "occupancy",
+    "store",
+    "telemetry",
+    "thermovision",
+    "transformation",
+    "utils",
+    "visualization",
+)
+"""
+Submodules imported on first access. The script is rerun under ncu to profile it,
+and the child process only needs the annotations and the profiling loop, so it does
+not pay for importing pandas, matplotlib or the ncu report reader.
+"""
+
+_ATTRIBUTES = {"vectorized": "transformation"}
+"""Attributes imported on first access, mapped to the submodule defining them."""
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f"nsight.{name}")
+    if name in _ATTRIBUTES:
+        return getattr(importlib.import_module(f"nsight.{_ATTRIBUTES[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_SUBMODULES, *_ATTRIBUTES])
+
 
-__all__ = ["analyze", "annotate"]
+__all__ = ["analyze", "annotate", "vectorized"]
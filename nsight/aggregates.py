@@ -0,0 +1,202 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Mergeable summaries of metric values.
+
+An :class:`AggregateState` summarizes the metric values of one annotation and
+configuration without keeping the values themselves. Two states can be merged into
+the state of the combined values, so results collected in chunks, by adaptive runs
+or by several processes can be aggregated incrementally. See the ``keep_state`` and
+``previous`` arguments of :func:`nsight.transformation.aggregate_data`.
+
+The count, mean and variance are tracked exactly with Welford's algorithm. Quantiles
+are estimated from a sketch of logarithmically sized buckets, which guarantees a
+relative error of at most :data:`RELATIVE_ACCURACY` for every quantile.
+"""
+
+import dataclasses
+import math
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+"""Maximum relative error of the quantiles estimated from an :class:`AggregateState`."""
+
+STATE_COLUMN = "AggregateState"
+"""Name of the column holding the states in aggregated profiling data."""
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _bucket_indices(magnitudes: np.ndarray) -> np.ndarray:
+    return np.asarray(np.ceil(np.log(magnitudes) / _LOG_GAMMA).astype(np.int64))
+
+
+def _bucket_values(indices: np.ndarray) -> np.ndarray:
+    # The value in the middle of a bucket, in relative terms
+    return np.asarray(2 * np.power(_GAMMA, indices.astype(float)) / (_GAMMA + 1))
+
+
+def _merge_buckets(lhs: dict[int, int], rhs: dict[int, int]) -> dict[int, int]:
+    merged = dict(lhs)
+    for index, count in rhs.items():
+        merged[index] = merged.get(index, 0) + count
+    return merged
+
+
+@dataclasses.dataclass
+class AggregateState:
+    """
+    Mergeable summary of metric values.
+
+    Attributes:
+        count: Number of values, excluding missing values.
+        mean: Mean of the values.
+        m2: Sum of the squared differences from the mean.
+        min: Smallest value.
+        max: Largest value.
+        positive: Sketch of the positive values, mapping bucket index to count.
+        negative: Sketch of the magnitudes of the negative values.
+        zero_count: Number of values equal to zero.
+    """
+
+    count: int = 0
+    mean: float = math.nan
+    m2: float = math.nan
+    min: float = math.nan
+    max: float = math.nan
+    positive: dict[int, int] = dataclasses.field(default_factory=dict)
+    negative: dict[int, int] = dataclasses.field(default_factory=dict)
+    zero_count: int = 0
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "AggregateState":
+        """
+        Summarizes values. Missing and non-numeric values are ignored.
+
+        Args:
+            values: The values to summarize.
+        """
+        array = np.asarray(
+            [np.nan if v is None else v for v in values], dtype=float
+        ).ravel()
+        array = array[~np.isnan(array)]
+        if len(array) == 0:
+            return cls()
+
+        def sketch(magnitudes: np.ndarray) -> dict[int, int]:
+            indices, counts = np.unique(_bucket_indices(magnitudes), return_counts=True)
+            return dict(zip(indices.tolist(), counts.tolist()))
+
+        mean = float(array.mean())
+        return cls(
+            count=len(array),
+            mean=mean,
+            m2=float(((array - mean) ** 2).sum()),
+            min=float(array.min()),
+            max=float(array.max()),
+            positive=sketch(array[array > 0]),
+            negative=sketch(-array[array < 0]),
+            zero_count=int((array == 0).sum()),
+        )
+
+    def merge(self, other: "AggregateState") -> "AggregateState":
+        """
+        Returns the state of the values of both states. Merging is associative and
+        commutative, and the empty state ``AggregateState()`` is its identity.
+
+        Args:
+            other: The state to merge with.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return AggregateState(
+            count=count,
+            mean=self.mean + delta * other.count / count,
+            m2=self.m2 + other.m2 + delta**2 * self.count * other.count / count,
+            min=min(self.min, other.min),
+            max=max(self.max, other.max),
+            positive=_merge_buckets(self.positive, other.positive),
+            negative=_merge_buckets(self.negative, other.negative),
+            zero_count=self.zero_count + other.zero_count,
+        )
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values, NaN for less than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the values, NaN for less than two values."""
+        return math.sqrt(self.variance)
+
+    def _sorted_buckets(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the representative values and counts of the buckets in order."""
+        negative_indices = np.array(sorted(self.negative, reverse=True), dtype=np.int64)
+        positive_indices = np.array(sorted(self.positive), dtype=np.int64)
+        values = np.concatenate(
+            [
+                -_bucket_values(negative_indices),
+                [0.0],
+                _bucket_values(positive_indices),
+            ]
+        )
+        counts = np.concatenate(
+            [
+                [self.negative[i] for i in negative_indices.tolist()],
+                [self.zero_count],
+                [self.positive[i] for i in positive_indices.tolist()],
+            ]
+        ).astype(np.int64)
+        return values, counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile of the values, within :data:`RELATIVE_ACCURACY` of the
+        value of that rank.
+
+        Args:
+            q: The quantile, between 0 and 1.
+        """
+        if self.count == 0:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        values, counts = self._sorted_buckets()
+        rank = q * (self.count - 1)
+        bucket = int(np.searchsorted(np.cumsum(counts), rank, side="right"))
+        return float(np.clip(values[bucket], self.min, self.max))
+
+    def trimmed_mean(self, proportion: float) -> float:
+        """
+        Estimates the mean of the values without the given proportion of the lowest
+        and highest values.
+
+        Args:
+            proportion: Fraction of the values cut from each end.
+        """
+        cut = math.floor(self.count * proportion)
+        if self.count - 2 * cut <= 0:
+            return math.nan
+
+        values, counts = self._sorted_buckets()
+        # Number of values of every bucket ranked between cut and count - cut
+        upper = np.cumsum(counts)
+        lower = upper - counts
+        kept = np.clip(upper, cut, self.count - cut) - np.clip(
+            lower, cut, self.count - cut
+        )
+        return float((values * kept).sum() / kept.sum())
@@ -1,18 +1,22 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+from __future__ import annotations
+
 import contextlib
 import functools
 import os
 import tempfile
-from collections.abc import Callable, Sequence
-from typing import Any, Literal, overload
-
-import matplotlib
-import matplotlib.figure
+from collections.abc import Callable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Literal, overload
 
 import nsight.collection as collection
-import nsight.visualization as visualization
+import nsight.exceptions as exceptions
+import nsight.transformation as transformation
+import nsight.utils as utils
+
+if TYPE_CHECKING:
+    import matplotlib.figure
 
 
 # Overload 1: When used without parentheses: @kernel
@@ -32,7 +36,7 @@ def kernel(
     derive_metric: Callable[..., float] | None = None,
     normalize_against: str | None = None,
     output: Literal["quiet", "progress", "verbose"] = "progress",
-    metric: str = "gpu__time_duration.sum",
+    metric: str | Sequence[str] = "gpu__time_duration.sum",
     ignore_kernel_list: Sequence[str] | None = None,
     clock_control: Literal["base", "none"] = "none",
     cache_control: Literal["all", "none"] = "all",
@@ -41,6 +45,27 @@ def kernel(
     combine_kernel_metrics: Callable[[float, float], float] | None = None,
     output_prefix: str | None = None,
     output_csv: bool = False,
+    devices: Sequence[int] | None = None,
+    sections: Sequence[str] | None = None,
+    section_set: str | None = None,
+    derived: Mapping[str, str] | None = None,
+    roofline: bool = False,
+    statistics: Sequence[str] = (),
+    outlier_rejection: Literal["mad", "iqr"] | None = None,
+    ci_method: Literal["normal", "t", "bootstrap"] = "normal",
+    compare_against: str | None = None,
+    significance_test: Literal["welch", "mannwhitney"] = "welch",
+    p_value_correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm",
+    ab_test: Sequence[str] | None = None,
+    ab_batch_runs: int = 10,
+    noise_floor: Literal["flag", "subtract"] | None = None,
+    noise_floor_sigmas: float = 3.0,
+    reference_clocks: Sequence[float] | None = None,
+    store: str | None = None,
+    revision: str | None = None,
+    telemetry_interval: float | None = None,
+    energy: bool = False,
+    energy_batch_calls: int = 10,
 ) -> Callable[[Callable[..., Any]], Callable[..., collection.core.ProfileResults]]: ...
 
 
@@ -53,7 +78,7 @@ def kernel(
     derive_metric: Callable[..., float] | None = None,
     normalize_against: str | None = None,
     output: Literal["quiet", "progress", "verbose"] = "progress",
-    metric: str = "gpu__time_duration.sum",
+    metric: str | Sequence[str] = "gpu__time_duration.sum",
     ignore_kernel_list: Sequence[str] | None = None,
     clock_control: Literal["base", "none"] = "none",
     cache_control: Literal["all", "none"] = "all",
@@ -62,6 +87,27 @@ def kernel(
     combine_kernel_metrics: Callable[[float, float], float] | None = None,
     output_prefix: str | None = None,
     output_csv: bool = False,
+    devices: Sequence[int] | None = None,
+    sections: Sequence[str] | None = None,
+    section_set: str | None = None,
+    derived: Mapping[str, str] | None = None,
+    roofline: bool = False,
+    statistics: Sequence[str] = (),
+    outlier_rejection: Literal["mad", "iqr"] | None = None,
+    ci_method: Literal["normal", "t", "bootstrap"] = "normal",
+    compare_against: str | None = None,
+    significance_test: Literal["welch", "mannwhitney"] = "welch",
+    p_value_correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm",
+    ab_test: Sequence[str] | None = None,
+    ab_batch_runs: int = 10,
+    noise_floor: Literal["flag", "subtract"] | None = None,
+    noise_floor_sigmas: float = 3.0,
+    reference_clocks: Sequence[float] | None = None,
+    store: str | None = None,
+    revision: str | None = None,
+    telemetry_interval: float | None = None,
+    energy: bool = False,
+    energy_batch_calls: int = 10,
 ) -> (
     Callable[..., collection.core.ProfileResults]
     | Callable[[Callable[..., Any]], Callable[..., collection.core.ProfileResults]]
@@ -97,10 +143,16 @@ def kernel(
             be captured by ncu directly. The function takes the metric value and
             the arguments of the profile-decorated function and returns the new
             metric. See the examples for concrete use cases.
+            For large sweeps, wrap the function with ``nsight.vectorized``: it is then called
+            once with the array of all metric values and one array per function argument,
+            and must return an array of derived metrics.
         normalize_against:
             Annotation name to normalize metrics against.
             This is useful to compute relative metrics like speedup.
         metric: The metric to collect. By default, kernel runtimes in nanoseconds are collected. Default: ``"gpu__time_duration.sum"``. To see the available metrics on your system, use the command: ``ncu --query-metrics``.
+            A sequence of metrics can be provided to collect several metrics in one profiling session. The first metric is the primary metric reported in ``Value``/``AvgValue``,
+            the others are reported in columns named after the metric and averaged across runs. Before launching, Nsight Python prints the estimated number of replay passes
+            and kernel replays needed for the requested metrics.
         ignore_kernel_list:
             List of kernel names to ignore. If you call a library within an annotated range context, you might not have precise control over which and how many kernels are being launched.
             If some of these kernels should be ignored in the profile, their names can be provided in this parameter. Default: ``None``
@@ -152,6 +204,91 @@ def kernel(
 
             if ``None``, the intermediate profiler files are created in a directory under <TEMP_DIR> prefixed with nspy. <TEMP_DIR> is the system's temporary directory (`$TMPDIR` or `/tmp` on Linux, `%TEMP%` on Windows).
 
+        devices: GPUs used to collect the metric passes. When more than one GPU is given and the requested metrics need several replay passes,
+            the passes are grouped and collected by one NVIDIA Nsight Compute process per GPU in parallel. The partial reports are merged by run index,
+            so the results look as if they came from a single profiling session. All GPUs should be of the same model. Default: ``None``
+        sections: NVIDIA Nsight Compute sections to collect along with the metric, e.g. ``["SpeedOfLight", "MemoryWorkloadAnalysis", "Occupancy", "LaunchStats"]``.
+            All numeric metrics of these sections are extracted in the same pass over the report and reported in columns named after the metric, averaged across runs.
+            To see the available sections on your system, use the command: ``ncu --list-sections``. Default: ``None``
+        section_set: NVIDIA Nsight Compute section set to collect along with the metric, e.g. ``"detailed"``. All numeric metrics of the collected sections
+            are extracted like for ``sections``. To see the available sets on your system, use the command: ``ncu --list-sets``. Default: ``None``
+        derived: Derived metrics combining several collected metrics, given as a mapping from column name to an arithmetic expression, e.g.
+            ``{"GBps": "dram__bytes.sum / gpu__time_duration.sum"}``. Expressions can refer to NVIDIA Nsight Compute metrics, to other derived metrics and to
+            the arguments of the decorated function. The metrics they refer to are added to the collected metrics automatically. Each derived metric is
+            evaluated per run and reported in a column named after it, averaged across runs. See :mod:`nsight.derived`. Default: ``None``
+        roofline: If True, collect the metrics needed for a roofline analysis and classify every configuration as memory or compute bound.
+            The FLOPs, DRAM bytes and peak rates of the GPU are added as derived metrics (see :data:`nsight.transformation.ROOFLINE_DERIVED`),
+            and the ``RidgePoint``, ``Bound``, ``RooflineFLOPs`` and ``RooflineEfficiencyPct`` columns are added to the processed data
+            (see :func:`nsight.transformation.roofline`). Use ``@nsight.analyze.plot(plot_type="roofline")`` to plot the results. Default: ``False``
+        statistics: Additional statistics of the metric values across runs, which are more robust than the average for heavy-tailed timings.
+            ``"median"`` adds ``MedianValue``, percentiles like ``"p90"`` or ``"p99"`` add ``P90Value`` or ``P99Value``, and ``"trimmed_mean"`` adds
+            ``TrimmedMeanValue``, the average without the lowest and highest 10 % of the runs. Default: ``()``
+        outlier_rejection: Excludes outlier runs from all statistics, including ``AvgValue``. Allowed values:
+
+            - ``"mad"``: Runs whose modified z-score, based on the median absolute deviation, exceeds 3.5 are rejected.
+            - ``"iqr"``: Runs more than 1.5 interquartile ranges below the first or above the third quartile are rejected.
+
+            The number of rejected runs is reported in ``OutliersRemoved``. Default: ``None``
+        ci_method: How the 95% confidence interval of the average is computed. Allowed values:
+
+            - ``"normal"``: Normal approximation, ``AvgValue ± 1.96 * StdDev / sqrt(NumRuns)``.
+            - ``"t"``: t-distribution, which is accurate for a small number of runs. Requires scipy, install it with ``pip install nsight-python[stats]``.
+            - ``"bootstrap"``: Percentile bootstrap, which makes no assumption on the distribution of the metric.
+
+            Default: ``"normal"``
+        compare_against: Name of an annotation to compare all other annotations against. For every configuration, the ``Speedup`` of each annotation over
+            this baseline, i.e. the baseline average divided by the annotation average, is reported with a 95% confidence interval in ``SpeedupCI95_Lower``
+            and ``SpeedupCI95_Upper``. Whether the difference is statistically significant is tested from the individual runs, see
+            :func:`nsight.transformation.compare_annotations`. Requires scipy, install it with ``pip install nsight-python[stats]``. Default: ``None``
+        significance_test: Test used by ``compare_against``. Allowed values:
+
+            - ``"welch"``: Welch's t-test, which compares the averages without assuming equal variances.
+            - ``"mannwhitney"``: Mann-Whitney U test, which makes no assumption on the distribution of the metric.
+
+            Default: ``"welch"``
+        p_value_correction: Correction of the p-values of ``compare_against`` for testing many configurations and annotations at once.
+            ``"holm"`` and ``"bonferroni"`` control the family-wise error rate, ``"fdr_bh"`` controls the false discovery rate, and ``"none"`` disables
+            the correction. Default: ``"holm"``
+        ab_test: Names of two annotations to decide between with as few runs as possible. Instead of running every configuration ``runs`` times,
+            the configurations are profiled in batches of ``ab_batch_runs`` runs, in which the runs of both annotations are interleaved. After every
+            batch, a sequential test checks whether the two annotations differ significantly. A configuration stops being profiled as soon as they do,
+            or when it reached ``runs`` runs, which serves as a cap. The test is the mixture sequential probability ratio test, whose always-valid
+            p-value may be checked after every batch without increasing the rate of false positives, see
+            :func:`nsight.transformation.sequential_p_values`. The p-value is reported in ``SequentialPValue``, and ``NumRuns`` shows how many
+            runs were needed. Default: ``None``
+        ab_batch_runs: Number of runs of every configuration per NVIDIA Nsight Compute launch when profiling with ``ab_test``. Default: ``10``
+        noise_floor: Calibrates the noise floor of the metric, i.e. the value measured for an empty kernel, which is a fixed overhead that dominates
+            the measurements of very short kernels. The empty kernel is profiled with the same NVIDIA Nsight Compute settings, and the noise floor is
+            cached on disk per GPU, clocks, metric, cache control, clock control and replay mode, see :mod:`nsight.collection.calibration`. It is reported in ``NoiseFloor`` and ``NoiseFloorStdDev``,
+            and ``NearNoiseFloor`` flags the configurations whose average, before ``normalize_against``, is within ``noise_floor_sigmas`` standard deviations of it. Allowed values:
+
+            - ``"flag"``: Only flag the configurations near the noise floor.
+            - ``"subtract"``: Additionally subtract the noise floor from the metric value of every run.
+
+            Requires cuda-core and can't be combined with ``derive_metric``. Default: ``None``
+        noise_floor_sigmas: Number of standard deviations of the noise floor within which configurations are flagged. Default: ``3.0``
+        reference_clocks: Compute and memory clock in kHz, the unit of the ``ComputeClock`` and ``MemoryClock`` columns, to normalize time metrics to,
+            e.g. ``(1755000, 2619000)``. This makes timings of GPUs running at different clocks comparable. The time of every run is split into a part
+            bound by the compute clock and a part bound by the memory clock, estimated from the compute and memory throughputs, which are collected
+            automatically (see :data:`nsight.transformation.CLOCK_THROUGHPUT_METRICS`). Each part is scaled by the ratio of the measured to the reference
+            clock. The measured value is kept in ``OriginalValue`` and the scaling factor in ``ClockScale``, see
+            :func:`nsight.transformation.normalize_clocks`. Default: ``None``
+        store: Path of an SQLite database to append the processed results to, indexed by function name, configuration, annotation, metric, GPU, host
+            and ``revision``. Use :func:`nsight.store.compare_to_baseline` to detect regressions against the results of an earlier revision.
+            The results are stored without ``normalize_against``, in the unit of the metric. Default: ``None``
+        revision: Tag of the profiled revision stored with the results, e.g. a commit hash. Default: ``None``
+        telemetry_interval: Interval in seconds at which a background thread samples the power draw, temperature, SM and memory clocks and
+            clock throttle reasons of the GPU with NVML while profiling. Every run is summarized in the ``PowerW``, ``MaxTemperatureC``, ``SMClockMHz``,
+            ``MemoryClockMHz`` and ``ThrottleReasons`` columns, see :data:`nsight.telemetry.TELEMETRY_COLUMNS`. Values the GPU does not report are NaN.
+            The runs are replayed by NVIDIA Nsight Compute, so the samples cover the replays as well. Default: ``None``
+        energy: If True, measure the energy per call of every annotated region after every run, by reading the cumulative energy counter of the GPU
+            with NVML around the regions of a batch of calls which are not profiled, see :class:`nsight.telemetry.EnergyMeter`. The energy per call of
+            every run is reported in ``Energy_J``, and the processed data holds the calls per second per watt, i.e. calls per joule, in ``PerfPerWatt``.
+            Use :func:`nsight.transformation.select_metric` to aggregate and plot the energy like the profiled metric. Requires cuda-core.
+            Default: ``False``
+        energy_batch_calls: Maximum number of extra calls of the function after every run when measuring the energy with ``energy``. A batch of
+            calls stops once it lasts 0.1 seconds, as the energy counter is updated at a coarse interval. Every call runs the whole function,
+            including the code outside the annotated regions, so keep it small for functions with expensive setup. Default: ``10``
         output_csv: Controls whether to dump raw and processed profiling data to CSV files. Default: ``False``.
             When enabled, two CSV files are generated:
 
@@ -166,6 +303,17 @@ def kernel(
                 - ``Host``: Host machine name
                 - ``ComputeClock``: GPU compute clock frequency during profiling
                 - ``MemoryClock``: GPU memory clock frequency during profiling
+                - ``GridSize``, ``BlockSize``: Launch grid and block size of the kernel
+                - ``RegistersPerThread``: Registers allocated per thread
+                - ``StaticSharedMemoryPerBlock``, ``DynamicSharedMemoryPerBlock``: Shared memory per block in bytes
+                - ``WavesPerSM``: Number of waves per multiprocessor of the launch
+                - ``ComputeCapability``, ``NumSMs``: Compute capability and number of multiprocessors of the GPU
+                - ``ActiveBlocksPerSM``, ``TheoreticalOccupancyPct``, ``OccupancyLimiter``, ``PredictedWavesPerSM``: Theoretical occupancy estimated from the launch statistics, see :mod:`nsight.occupancy`
+                - ``SequentialPValue``: Always-valid p-value of the difference between the two ``ab_test`` annotations when profiling stopped, if ``ab_test`` is set
+                - ``OriginalValue``, ``ClockScale``: Metric value before rescaling to ``reference_clocks`` and the scaling factor, if ``reference_clocks`` is set
+                - ``NoiseFloor``, ``NoiseFloorStdDev``: Mean and standard deviation of the noise floor of the metric, if ``noise_floor`` is set
+                - ``PowerW``, ``MaxTemperatureC``, ``SMClockMHz``, ``MemoryClockMHz``, ``ThrottleReasons``: GPU telemetry of the run, if ``telemetry_interval`` is set
+                - ``Energy_J``: Energy per call of the annotated region, if ``energy`` is set
                 - ``<param_name>``: One column for each parameter of the decorated function
 
             **Processed Data CSV** (``processed_data-<function_name>-<run_id>.csv``): Contains aggregated statistics across multiple runs. Columns include:
@@ -177,8 +325,10 @@ def kernel(
                 - ``MinValue``: Minimum metric value observed
                 - ``MaxValue``: Maximum metric value observed
                 - ``NumRuns``: Number of runs used for aggregation
-                - ``CI95_Lower``: Lower bound of the 95% confidence interval
-                - ``CI95_Upper``: Upper bound of the 95% confidence interval
+                - ``MedianValue``, ``P<NN>Value``, ``TrimmedMeanValue``: Statistics requested with ``statistics``
+                - ``OutliersRemoved``: Number of runs excluded as outliers, if ``outlier_rejection`` is set
+                - ``CI95_Lower``: Lower bound of the 95% confidence interval, computed with ``ci_method``
+                - ``CI95_Upper``: Upper bound of the 95% confidence interval, computed with ``ci_method``
                 - ``RelativeStdDevPct``: Standard deviation as a percentage of the mean
                 - ``StableMeasurement``: Boolean indicating if the measurement is stable (low variance). The measurement is stable if ``RelativeStdDevPct`` < 2 % .
                 - ``Metric``: The metric being collected
@@ -188,6 +338,15 @@ def kernel(
                 - ``Host``: Host machine name
                 - ``ComputeClock``: GPU compute clock frequency
                 - ``MemoryClock``: GPU memory clock frequency
+                - ``GridSize``, ``BlockSize``, ``RegistersPerThread``, ``StaticSharedMemoryPerBlock``, ``DynamicSharedMemoryPerBlock``, ``WavesPerSM``: Launch statistics of the kernel. If an annotation launches several kernels with different launch statistics, the largest value is reported
+                - ``ComputeCapability``, ``NumSMs``: Compute capability and number of multiprocessors of the GPU
+                - ``ActiveBlocksPerSM``, ``TheoreticalOccupancyPct``, ``OccupancyLimiter``, ``PredictedWavesPerSM``: Theoretical occupancy estimated from the launch statistics, see :mod:`nsight.occupancy`
+                - ``SequentialPValue``: Always-valid p-value of the difference between the two ``ab_test`` annotations when profiling stopped
+                - ``OriginalValue``, ``ClockScale``: Average metric value before rescaling to ``reference_clocks`` and the average scaling factor, if ``reference_clocks`` is set
+                - ``NoiseFloor``, ``NoiseFloorStdDev``, ``NearNoiseFloor``: Noise floor of the metric and whether the average is within ``noise_floor_sigmas`` standard deviations of it, if ``noise_floor`` is set
+                - ``PowerW``, ``MaxTemperatureC``, ``SMClockMHz``, ``MemoryClockMHz``, ``ThrottleReasons``: GPU telemetry aggregated over the runs, if ``telemetry_interval`` is set
+                - ``Energy_J``, ``PerfPerWatt``: Average energy per call of the annotated region and its inverse, the calls per joule, if ``energy`` is set
+                - ``Speedup``, ``SpeedupCI95_Lower``, ``SpeedupCI95_Upper``, ``PValue``, ``PValueAdjusted``, ``Significant``: Comparison with the ``compare_against`` annotation, see :func:`nsight.transformation.compare_annotations`
     """
 
     def _create_profiler() -> collection.core.NsightProfiler:
@@ -195,6 +354,47 @@ def kernel(
         if output not in ("quiet", "progress", "verbose"):
             raise ValueError("output must be 'quiet', 'progress' or 'verbose'")
 
+        for statistic in statistics:
+            transformation.statistic_column(statistic)
+        if outlier_rejection not in (None, "mad", "iqr"):
+            raise ValueError("outlier_rejection must be None, 'mad' or 'iqr'")
+        if ci_method not in ("normal", "t", "bootstrap"):
+            raise ValueError("ci_method must be 'normal', 't' or 'bootstrap'")
+        if significance_test not in ("welch", "mannwhitney"):
+            raise ValueError("significance_test must be 'welch' or 'mannwhitney'")
+        if p_value_correction not in ("holm", "bonferroni", "fdr_bh", "none"):
+            raise ValueError(
+                "p_value_correction must be 'holm', 'bonferroni', 'fdr_bh' or 'none'"
+            )
+        if ab_test is not None:
+            if isinstance(ab_test, str) or len(set(ab_test)) != 2:
+                raise ValueError("ab_test must name two different annotations")
+            if ab_batch_runs < 2:
+                raise ValueError("ab_batch_runs must be at least 2")
+        if noise_floor is not None:
+            if noise_floor not in ("flag", "subtract"):
+                raise ValueError("noise_floor must be None, 'flag' or 'subtract'")
+            if derive_metric is not None:
+                raise ValueError("noise_floor can't be combined with derive_metric")
+            if not utils.CUDA_CORE_AVAILABLE:
+                raise ImportError(exceptions.CUDA_CORE_UNAVAILABLE_MSG)
+        if reference_clocks is not None and (
+            len(reference_clocks) != 2 or min(reference_clocks) <= 0
+        ):
+            raise ValueError(
+                "reference_clocks must be a positive compute and memory clock"
+            )
+        if telemetry_interval is not None and telemetry_interval <= 0:
+            raise ValueError("telemetry_interval must be positive")
+        if energy_batch_calls < 1:
+            raise ValueError("energy_batch_calls must be at least 1")
+        if energy and not utils.CUDA_CORE_AVAILABLE:
+            raise ImportError(exceptions.CUDA_CORE_UNAVAILABLE_MSG)
+        if (
+            ci_method == "t" or compare_against is not None
+        ) and not transformation.SCIPY_AVAILABLE:
+            raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+
         output_progress = output == "progress" or output == "verbose"
         output_detailed = output == "verbose"
 
@@ -219,14 +419,46 @@ def kernel(
             thermal_control=thermal_control,
             output_prefix=prefix,
             output_csv=output_csv,
+            roofline=roofline,
+            statistics=statistics,
+            outlier_rejection=outlier_rejection,
+            ci_method=ci_method,
+            compare_against=compare_against,
+            significance_test=significance_test,
+            p_value_correction=p_value_correction,
+            ab_test=ab_test,
+            ab_batch_runs=ab_batch_runs,
+            noise_floor=noise_floor,
+            noise_floor_sigmas=noise_floor_sigmas,
+            reference_clocks=reference_clocks,
+            store=store,
+            revision=revision,
+            telemetry_interval=telemetry_interval,
+            energy=energy,
+            energy_batch_calls=energy_batch_calls,
         )
+        metrics = [metric] if isinstance(metric, str) else list(metric)
+        if reference_clocks is not None:
+            metrics += [
+                m
+                for m in transformation.CLOCK_THROUGHPUT_METRICS.values()
+                if m not in metrics
+            ]
         ncu = collection.ncu.NCUCollector(
-            metric=metric,
+            metric=metrics,
             ignore_kernel_list=ignore_kernel_list,
             combine_kernel_metrics=combine_kernel_metrics,
             clock_control=clock_control,
             cache_control=cache_control,
             replay_mode=replay_mode,
+            devices=devices,
+            sections=sections,
+            section_set=section_set,
+            derived=(
+                {**transformation.ROOFLINE_DERIVED, **(derived or {})}
+                if roofline
+                else derived
+            ),
         )
         return collection.core.NsightProfiler(settings, ncu)
 
@@ -254,10 +486,15 @@ def plot(
     row_panels: Sequence[str] | None = None,
     col_panels: Sequence[str] | None = None,
     x_keys: Sequence[str] | None = None,
+    y_keys: Sequence[str] | None = None,
+    x_scale: str | None = None,
+    max_points: int | None = None,
+    error_bars: bool = False,
     print_data: bool = False,
     variant_fields: Sequence[str] | None = None,
     variant_annotations: Sequence[str] | None = None,
     plot_callback: Callable[[matplotlib.figure.Figure], None] | None = None,
+    background: bool = False,
 ) -> Callable[
     [Callable[..., collection.core.ProfileResults]],
     Callable[..., collection.core.ProfileResults],
@@ -291,7 +528,13 @@ def plot(
         show_aggregate: If “avg”, show the average value in the plot. If “geomean”, show the geometric mean value in the plot.
             Default: None
         plot_type: Type of plot to generate. Options are
-            'line' or 'bar'. Default: ``'line'``
+            'line', 'bar', 'roofline' or 'heatmap'. A roofline plot shows the attained FLOP/s of every configuration
+            against its arithmetic intensity on log-log axes, below the memory and compute ceilings of the GPU.
+            It requires profiling with ``roofline=True``. A heatmap shows the metric of every configuration as a
+            cell, with ``x_keys`` along the x-axis and ``y_keys`` along the y-axis, and one column of subplots per
+            annotation. With ``normalize_against``, the cells show the ratio to that annotation. 'box', 'violin'
+            and 'strip' plots show the distribution of the individual runs of every configuration, from
+            :meth:`ProfileResults.to_raw_dataframe`, in the units of the metric. Default: ``'line'``
         plot_width: Width of the plot in inches. Default: ``6``
         plot_height: Height of the plot in inches. Default: ``4``
         row_panels: Enables generating subplots along
@@ -305,10 +548,27 @@ def plot(
         x_keys: List of fields to use for the x-axis. By
             default, we use all parameters of the decorated function except those
             specified in `row_panels` and `col_panels`.
+        y_keys: List of fields to use for the y-axis of ``plot_type='heatmap'``.
+            Required for heatmaps. Default: ``None``
+        x_scale: ``'linear'`` or ``'log'`` to plot lines against the values of a
+            single numeric x-axis parameter instead of one category per
+            configuration, e.g. for long sweeps over sizes. Default: ``None``
+        max_points: Maximum number of points drawn per line. Longer lines are
+            downsampled with the largest-triangle-three-buckets algorithm, so the
+            render time and file size stay bounded for long sweeps.
+            Default: ``None``
+        error_bars: If True, draw the 95% confidence interval of every
+            configuration as error bars of line and bar plots, see ``ci_method``.
+            Default: ``False``
         print_data: If True, print the data used for plotting.
             Default: ``False``
         variant_fields: List of config fields to use as variant fields (lines).
         variant_annotations: List of annotated range names for which to apply variant splitting. The provided strings must each match one of the names defined using nsight.annotate.
+        background: If True, render the plot in a worker process and return the
+            results without waiting for the plot to be saved. Plots of several
+            decorated functions are then rendered in parallel. Call
+            :func:`nsight.visualization.wait_for_plots` to wait for them. A
+            ``plot_callback`` must be picklable. Default: ``False``
     """
     show_avg = show_aggregate == "avg"
     show_geomean = show_aggregate == "geomean"
@@ -319,11 +579,28 @@ def plot(
             result = func(*args, **kwargs)
 
             if "NSPY_NCU_PROFILE" not in os.environ:
-                visualization.visualize(
+                # matplotlib is not imported by the profiled child process
+                import nsight.visualization as visualization
+
+                render = (
+                    visualization.visualize_in_background
+                    if background
+                    else visualization.visualize
+                )
+                render(
                     result.to_dataframe(),
                     row_panels=row_panels,
                     col_panels=col_panels,
                     x_keys=x_keys,
+                    y_keys=y_keys,
+                    x_scale=x_scale,
+                    max_points=max_points,
+                    error_bars=error_bars,
+                    raw_df=(
+                        result.to_raw_dataframe()
+                        if plot_type in visualization.DISTRIBUTION_PLOT_TYPES
+                        else None
+                    ),
                     print_data=print_data,
                     title=title,
                     filename=filename,
@@ -4,13 +4,23 @@
 import functools
 import importlib.util
 from collections.abc import Callable
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import nvtx
 
 import nsight.utils as utils
 from nsight.exceptions import CUDA_CORE_UNAVAILABLE_MSG
 
+if TYPE_CHECKING:
+    from nsight import telemetry
+
+ENERGY_METER: "telemetry.EnergyMeter | None" = None
+"""
+Meter reading the energy of every annotated region, set while the energy of a batch
+of calls is measured with ``energy=True``. The regions of these calls are not NVTX
+ranges, so NVIDIA Nsight Compute does not profile and replay their kernels.
+"""
+
 
 class annotate(nvtx.annotate):  # type: ignore[misc]
     """
@@ -59,12 +69,21 @@ class annotate(nvtx.annotate):  # type: ignore[misc]
 
         super().__init__(name, domain=utils.NVTX_DOMAIN)
 
+    def __enter__(self) -> "annotate":
+        if ENERGY_METER is not None:
+            ENERGY_METER.start_region()
+            return self
+        return super().__enter__()  # type: ignore[no-any-return]
+
     def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> bool:
         try:
             if exc_type and self.ignore_failures:
                 utils.launch_dummy_kernel_module()
         finally:
-            super().__exit__(exc_type, exc_value, traceback)
+            if ENERGY_METER is not None:
+                ENERGY_METER.end_region(self.name)
+            else:
+                super().__exit__(exc_type, exc_value, traceback)
 
         if exc_type and not self.ignore_failures:
             return False  # propagate the exception
@@ -3,8 +3,10 @@
 
 import functools
 
+import nsight.collection.calibration as calibration
 import nsight.collection.core as core
 import nsight.collection.ncu as ncu
+import nsight.collection.planner as planner
 import nsight.utils as utils
 
-__all__ = ["ncu", "core"]
+__all__ = ["ncu", "core", "planner", "calibration"]
@@ -0,0 +1,195 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Calibration of the noise floor of a metric.
+
+Even an empty kernel has a measured duration, which is a fixed overhead of every
+measurement. For kernels of a few microseconds it is a large part of the measured
+value. The noise floor is measured by profiling an empty kernel with the same
+NVIDIA Nsight Compute settings as the profiled function, and is cached on disk per
+GPU, compute and memory clock, metric and cache control, clock control and replay
+mode of the collector in :func:`cache_path`. Delete the cache to calibrate again.
+"""
+
+from __future__ import annotations
+
+import copy
+import dataclasses
+import json
+import os
+from typing import TYPE_CHECKING, Any
+
+from nsight import annotation, utils
+from nsight.collection import core
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+KERNEL_NAME = "nspy_noise_floor"
+"""Name of the function and annotation profiled to measure the noise floor."""
+
+CALIBRATION_RUNS = 100
+"""Number of runs of the empty kernel."""
+
+NOISE_FLOOR_COLUMNS = ["NoiseFloor", "NoiseFloorStdDev"]
+"""Raw data columns holding the mean and standard deviation of the noise floor."""
+
+# Columns identifying the conditions a noise floor was measured in
+_KEY_COLUMNS = ["GPU", "ComputeClock", "MemoryClock", "Metric"]
+
+# Collector settings changing the overhead of a measurement
+_KEY_SETTINGS = ["cache_control", "clock_control", "replay_mode"]
+
+
+def cache_path() -> str:
+    """
+    Returns the path of the noise floor cache, in ``$XDG_CACHE_HOME/nsight-python``
+    or ``~/.cache/nsight-python``.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "nsight-python", "noise_floor.json")
+
+
+def _cache_key(values: tuple[Any, ...]) -> str:
+    return "|".join(str(value) for value in values)
+
+
+def load_cache() -> dict[str, dict[str, float]]:
+    """Returns the cached noise floors, mapping a key to ``mean`` and ``std``."""
+    try:
+        with open(cache_path()) as f:
+            cache: dict[str, dict[str, float]] = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache
+
+
+def save_cache(cache: dict[str, dict[str, float]]) -> None:
+    """Writes the cached noise floors."""
+    path = cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def nspy_noise_floor() -> None:
+    """Launches an empty kernel in the noise floor annotation."""
+    with annotation.annotate(KERNEL_NAME):
+        utils.launch_dummy_kernel_module(KERNEL_NAME)
+
+
+def measure_noise_floor(
+    collector: core.NsightCollector, settings: core.ProfileSettings
+) -> pd.DataFrame | None:
+    """
+    Profiles the empty kernel :data:`CALIBRATION_RUNS` times with the settings of
+    the collector.
+
+    When called in the process profiled for the calibration, the empty kernel is
+    run and the process exits.
+
+    Args:
+        collector: The collector of the profiled function.
+        settings: The settings of the profiled function.
+
+    Returns:
+        The raw profiling data of the empty kernel, or ``None`` in processes
+        profiled for another function.
+    """
+    settings = dataclasses.replace(
+        settings,
+        runs=CALIBRATION_RUNS,
+        derive_metric=None,
+        ab_test=None,
+        noise_floor=None,
+    )
+    # Derived metrics may refer to parameters, which the empty kernel lacks
+    collector = copy.copy(collector)
+    if getattr(collector, "derived", None):
+        collector.derived = {}  # type: ignore[attr-defined]
+
+    nspy_noise_floor._nspy_ncu_run_id = 0  # type: ignore[attr-defined]
+    return collector.collect(nspy_noise_floor, [()], settings)
+
+
+def noise_floor(
+    collector: core.NsightCollector,
+    settings: core.ProfileSettings,
+    raw_df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Returns the noise floor for the GPU, clocks and metric of every row of
+    profiling data and the settings of the collector, calibrating them first if
+    they are not cached.
+
+    Args:
+        collector: The collector of the profiled function.
+        settings: The settings of the profiled function.
+        raw_df: The raw profiling data.
+
+    Returns:
+        The ``NoiseFloor`` and ``NoiseFloorStdDev`` columns for the rows of
+        ``raw_df``, which are NaN where no noise floor could be measured.
+    """
+    import pandas as pd
+
+    collector_key = tuple(getattr(collector, name, None) for name in _KEY_SETTINGS)
+    keys = [
+        _cache_key((*row, *collector_key))
+        for row in raw_df[_KEY_COLUMNS].itertuples(index=False)
+    ]
+    cache = load_cache()
+
+    if not set(keys).issubset(cache):
+        if settings.output_progress:
+            print("[NSIGHT-PYTHON] Calibrating the noise floor")
+        calibration_df = measure_noise_floor(collector, settings)
+        if calibration_df is not None:
+            values = pd.to_numeric(calibration_df["Value"], errors="coerce")
+            stats = values.groupby(
+                [calibration_df[column] for column in _KEY_COLUMNS]
+            ).agg(["mean", "std"])
+            for key, row in stats.iterrows():
+                cache[_cache_key((*key, *collector_key))] = {
+                    "mean": row["mean"],
+                    "std": row["std"],
+                }
+            save_cache(cache)
+
+    floors = pd.DataFrame(
+        [cache.get(key, {}) for key in keys],
+        index=raw_df.index,
+        columns=["mean", "std"],
+        dtype=float,
+    )
+    return floors.set_axis(NOISE_FLOOR_COLUMNS, axis=1)
+
+
+def add_noise_floor(
+    raw_df: pd.DataFrame, floors: pd.DataFrame, num_args: int, subtract: bool
+) -> pd.DataFrame:
+    """
+    Adds the noise floor columns to raw profiling data, before the parameter
+    columns, and optionally subtracts the noise floor from the metric values.
+
+    Args:
+        raw_df: The raw profiling data.
+        floors: The noise floors of the rows, as returned by :func:`noise_floor`.
+        num_args: Number of parameters of the profiled function.
+        subtract: Whether to subtract the noise floor from ``Value``.
+    """
+    import pandas as pd
+
+    raw_df = utils.insert_run_columns(
+        raw_df,
+        {column: floors[column] for column in NOISE_FLOOR_COLUMNS},
+        {column: "first" for column in NOISE_FLOOR_COLUMNS},
+        num_args,
+    )
+    if subtract:
+        value = pd.to_numeric(raw_df["Value"], errors="coerce")
+        raw_df["Value"] = value - floors["NoiseFloor"].fillna(0)
+    return raw_df
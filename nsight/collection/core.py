@@ -1,6 +1,8 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+from __future__ import annotations
+
 import abc
 import dataclasses
 import functools
@@ -9,11 +11,12 @@ import inspect
 import os
 import time
 from collections.abc import Callable, Sequence
-from typing import Any
+from typing import TYPE_CHECKING, Any, Literal
 
-import pandas as pd
+from nsight import exceptions, utils
 
-from nsight import exceptions, thermovision, transformation, utils
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def _sanitize_configs(
@@ -132,6 +135,10 @@ def run_profile_session(
     output_progress: bool,
     output_detailed: bool,
     thermal_control: bool,
+    telemetry_interval: float | None = None,
+    telemetry_path: str | None = None,
+    energy_path: str | None = None,
+    energy_batch_calls: int | None = None,
 ) -> None:
 
     if output_progress:
@@ -139,6 +146,9 @@ def run_profile_session(
         print("")
 
     if thermal_control:
+        # Only import pynvml if it is needed
+        from nsight import thermovision
+
         thermovision_initialized = thermovision.init()
 
     total_configs = len(configs)
@@ -152,46 +162,80 @@ def run_profile_session(
     # overwrite flag: we do not overwrite when output mode is detailed
     overwrite_output = not output_detailed
 
-    for c in configs:
-        curr_config += 1
+    sampler = None
+    energy_meter = None
+    try:
+        # Sample the GPU telemetry of every run in the background
+        if telemetry_interval is not None and telemetry_path is not None:
+            from nsight import telemetry
 
-        if output_progress:
-            utils.print_config(total_configs, curr_config, c, overwrite_output)
+            sampler = telemetry.TelemetrySampler(telemetry_interval)
+            sampler.start()
 
-        for i in range(runs):
-            start_time = time.time()
-            curr_run += 1
-            if thermal_control:
-                if thermovision_initialized:
-                    thermovision.throttle_guard()
+        # Measure the energy per call of the annotated regions after every run
+        if energy_path is not None:
+            from nsight import telemetry
 
-            # Check if func supports the input configs
-            if len(inspect.signature(func).parameters) != len(c):
-                raise exceptions.ProfilerException(
-                    f"Function '{func.__name__}' does not support the input configuration"
-                )
+            energy_meter = telemetry.EnergyMeter(max_batch_calls=energy_batch_calls)
+            energy_meter.start()
 
-            # Run the function with the config
-            func(*c)
+        for c in configs:
+            curr_config += 1
 
-            elapsed_time = time.time() - start_time
-            if curr_run > 1:
-                total_time += elapsed_time
-                avg_time_per_run = total_time / curr_run
-            else:
-                avg_time_per_run = elapsed_time  # Use first run's time only
-
-            # Update time estimates every half second
-            if time.time() - progress_time > 0.5:
-                if output_progress:
-                    utils.print_progress_bar(
-                        total_runs,
-                        curr_run,
-                        bar_length,
-                        avg_time_per_run,
-                        overwrite_output,
+            if output_progress:
+                utils.print_config(total_configs, curr_config, c, overwrite_output)
+
+            for i in range(runs):
+                start_time = time.time()
+                curr_run += 1
+                if thermal_control:
+                    if thermovision_initialized:
+                        thermovision.throttle_guard()
+
+                # Check if func supports the input configs
+                if len(inspect.signature(func).parameters) != len(c):
+                    raise exceptions.ProfilerException(
+                        f"Function '{func.__name__}' does not support the input configuration"
                     )
-                progress_time = time.time()
+
+                # Run the function with the config
+                if sampler is not None:
+                    sampler.start_run()
+                func(*c)
+                if sampler is not None:
+                    sampler.end_run()
+                if energy_meter is not None:
+                    energy_meter.measure(func, c)
+
+                elapsed_time = time.time() - start_time
+                if curr_run > 1:
+                    total_time += elapsed_time
+                    avg_time_per_run = total_time / curr_run
+                else:
+                    avg_time_per_run = elapsed_time  # Use first run's time only
+
+                # Update time estimates every half second
+                if time.time() - progress_time > 0.5:
+                    if output_progress:
+                        utils.print_progress_bar(
+                            total_runs,
+                            curr_run,
+                            bar_length,
+                            avg_time_per_run,
+                            overwrite_output,
+                        )
+                    progress_time = time.time()
+    finally:
+        # Stop sampling even if the profiled function failed
+        if sampler is not None:
+            sampler.stop()
+
+    if sampler is not None:
+        assert telemetry_path is not None
+        sampler.save(telemetry_path)
+    if energy_meter is not None:
+        assert energy_path is not None
+        energy_meter.save(energy_path)
 
     # Update progress bar at end so it shows 100%
     if output_progress:
@@ -262,20 +306,126 @@ class ProfileSettings:
     Controls whether to output raw and processed profiling data to CSV files
     """
 
+    roofline: bool = False
+    """
+    Toggles whether to classify the configurations as memory or compute bound with
+    :func:`nsight.transformation.roofline`. The collector must provide the columns
+    of :data:`nsight.transformation.ROOFLINE_DERIVED`.
+    """
+
+    statistics: Sequence[str] = ()
+    """
+    Additional statistics of the metric values to report, e.g. ``"median"``,
+    ``"p90"`` or ``"trimmed_mean"``. See :func:`nsight.transformation.aggregate_data`.
+    """
+
+    outlier_rejection: Literal["mad", "iqr"] | None = None
+    """
+    Method to exclude outliers from the statistics, ``"mad"`` or ``"iqr"``.
+    """
+
+    ci_method: Literal["normal", "t", "bootstrap"] = "normal"
+    """
+    How the 95% confidence interval is computed: ``"normal"``, ``"t"`` or
+    ``"bootstrap"``.
+    """
+
+    compare_against: str | None = None
+    """
+    Annotation to compare all other annotations against with
+    :func:`nsight.transformation.compare_annotations`, or ``None`` to skip the
+    comparison.
+    """
+
+    significance_test: Literal["welch", "mannwhitney"] = "welch"
+    """
+    Test of the comparison, ``"welch"`` or ``"mannwhitney"``.
+    """
+
+    p_value_correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm"
+    """
+    Multiple comparison correction of the p-values of the comparison.
+    """
+
+    ab_test: Sequence[str] | None = None
+    """
+    Two annotations to profile sequentially: every configuration is profiled in
+    batches of ``ab_batch_runs`` runs until the annotations differ significantly, or
+    until ``runs`` runs are reached. ``None`` profiles ``runs`` runs at once.
+    """
+
+    ab_batch_runs: int = 10
+    """
+    Number of runs per batch when profiling sequentially with ``ab_test``.
+    """
+
+    noise_floor: Literal["flag", "subtract"] | None = None
+    """
+    Calibrates the noise floor of the metric with
+    :mod:`nsight.collection.calibration`. ``"flag"`` flags the configurations near
+    the noise floor, ``"subtract"`` additionally subtracts it from the metric values.
+    """
+
+    noise_floor_sigmas: float = 3.0
+    """
+    Configurations whose average is within this many standard deviations of the
+    noise floor are flagged.
+    """
+
+    reference_clocks: Sequence[float] | None = None
+    """
+    Compute and memory clock, in kHz, to rescale time metrics to with
+    :func:`nsight.transformation.normalize_clocks` before aggregating, or ``None``
+    to keep the measured times.
+    """
+
+    store: str | None = None
+    """
+    Path of a :class:`nsight.store.ResultsStore` database the processed results are
+    appended to, or ``None`` to not store them. The stored results are not
+    normalized against ``normalize_against``.
+    """
+
+    revision: str | None = None
+    """
+    Revision tag of the results appended to ``store``.
+    """
+
+    telemetry_interval: float | None = None
+    """
+    Interval in seconds at which the power draw, temperature, clocks and throttle
+    reasons of the GPU are sampled during every run, see :mod:`nsight.telemetry`,
+    or ``None`` to not sample them.
+    """
+
+    energy: bool = False
+    """
+    Measures the energy per call of every annotated region with the energy counter
+    of the GPU after every run, see :class:`nsight.telemetry.EnergyMeter`.
+    """
+
+    energy_batch_calls: int = 10
+    """
+    Maximum number of extra calls of the profiled function per run when measuring
+    the energy with ``energy``.
+    """
+
 
 class ProfileResults:
     """
     Class to hold profile results for Nsight Python
     """
 
-    def __init__(self, results: pd.DataFrame):
+    def __init__(self, results: pd.DataFrame, raw_results: pd.DataFrame | None = None):
         """
         Initialize a ProfileResults object.
 
         Args:
             results: Processed profiling results.
+            raw_results: Raw profiling results with one row per run.
         """
         self._results = results
+        self._raw_results = raw_results
 
     def to_dataframe(self) -> pd.DataFrame:
         """
@@ -296,8 +446,10 @@ class ProfileResults:
                 - ``MinValue``: Minimum metric value observed
                 - ``MaxValue``: Maximum metric value observed
                 - ``NumRuns``: Number of runs used for aggregation
-                - ``CI95_Lower``: Lower bound of the 95% confidence interval
-                - ``CI95_Upper``: Upper bound of the 95% confidence interval
+                - ``MedianValue``, ``P<NN>Value``, ``TrimmedMeanValue``: Statistics requested with ``statistics``
+                - ``OutliersRemoved``: Number of runs excluded as outliers, if ``outlier_rejection`` is set
+                - ``CI95_Lower``: Lower bound of the 95% confidence interval, computed with ``ci_method``
+                - ``CI95_Upper``: Upper bound of the 95% confidence interval, computed with ``ci_method``
                 - ``RelativeStdDevPct``: Standard deviation as a percentage of the mean
                 - ``StableMeasurement``: Boolean indicating if the measurement is stable (low variance). The measurement is stable if ``RelativeStdDevPct`` < 2 % .
                 - ``Metric``: The metric being collected
@@ -307,9 +459,36 @@ class ProfileResults:
                 - ``Host``: Host machine name
                 - ``ComputeClock``: GPU compute clock frequency
                 - ``MemoryClock``: GPU memory clock frequency
+                - ``GridSize``, ``BlockSize``, ``RegistersPerThread``, ``StaticSharedMemoryPerBlock``, ``DynamicSharedMemoryPerBlock``, ``WavesPerSM``: Launch statistics of the kernel. If an annotation launches several kernels with different launch statistics, the largest value is reported
+                - ``ComputeCapability``, ``NumSMs``: Compute capability and number of multiprocessors of the GPU
+                - ``ActiveBlocksPerSM``, ``TheoreticalOccupancyPct``, ``OccupancyLimiter``, ``PredictedWavesPerSM``: Theoretical occupancy estimated from the launch statistics, see :mod:`nsight.occupancy`
+                - ``SequentialPValue``: Always-valid p-value of the difference between the two ``ab_test`` annotations when profiling stopped
+                - ``OriginalValue``, ``ClockScale``: Average metric value before rescaling to ``reference_clocks`` and the average scaling factor, if ``reference_clocks`` is set
+                - ``NoiseFloor``, ``NoiseFloorStdDev``, ``NearNoiseFloor``: Noise floor of the metric and whether the average is within ``noise_floor_sigmas`` standard deviations of it, if ``noise_floor`` is set
+                - ``PowerW``, ``MaxTemperatureC``, ``SMClockMHz``, ``MemoryClockMHz``, ``ThrottleReasons``: GPU telemetry aggregated over the runs, if ``telemetry_interval`` is set
+                - ``Energy_J``, ``PerfPerWatt``: Average energy per call of the annotated region and its inverse, the calls per joule, if ``energy`` is set
+                - ``Speedup``, ``SpeedupCI95_Lower``, ``SpeedupCI95_Upper``, ``PValue``, ``PValueAdjusted``, ``Significant``: Comparison with the ``compare_against`` annotation, see :func:`nsight.transformation.compare_annotations`
         """
         return self._results
 
+    def to_raw_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the raw profiling data as a pandas DataFrame, with one row per run of
+        every configuration and annotation, e.g. to plot the distribution of the
+        runs with ``nsight.analyze.plot(plot_type="box")``.
+
+        The data is equivalent to what is written to the
+        ``profiled_data-<function_name>-<run_id>.csv`` file when ``output_csv=True``.
+        Its ``Value`` column holds the metric value of every run, the parameters of
+        the decorated function are the last columns.
+
+        Raises:
+            exceptions.ProfilerException: If the raw data was not kept.
+        """
+        if self._raw_results is None:
+            raise exceptions.ProfilerException("No raw profiling data available")
+        return self._raw_results
+
 
 class NsightCollector(abc.ABC):
     @abc.abstractmethod
@@ -382,12 +561,65 @@ class NsightProfiler:
             raw_df = self.collector.collect(func, configs, self.settings)
 
             if raw_df is not None:
+                # The results are only processed in the parent process
+                from nsight import store, transformation
+
+                if self.settings.reference_clocks is not None:
+                    raw_df = transformation.normalize_clocks(
+                        raw_df, func, *self.settings.reference_clocks
+                    )
+
                 processed = transformation.aggregate_data(
                     raw_df,
                     func,
                     self.settings.normalize_against,
                     self.settings.output_progress,
+                    statistics=self.settings.statistics,
+                    outlier_rejection=self.settings.outlier_rejection,
+                    ci_method=self.settings.ci_method,
                 )
+                if self.settings.roofline:
+                    processed = transformation.roofline(processed)
+                if self.settings.energy:
+                    from nsight import telemetry
+
+                    processed = telemetry.perf_per_watt(processed)
+                if self.settings.noise_floor is not None:
+                    processed = transformation.flag_noise_floor(
+                        processed,
+                        self.settings.noise_floor_sigmas,
+                        subtracted=self.settings.noise_floor == "subtract",
+                    )
+                if self.settings.compare_against is not None:
+                    processed = transformation.compare_annotations(
+                        raw_df,
+                        processed,
+                        func,
+                        self.settings.compare_against,
+                        test=self.settings.significance_test,
+                        correction=self.settings.p_value_correction,
+                    )
+
+                if self.settings.store is not None:
+                    # Every stored statistic keeps the unit of the metric
+                    stored = processed
+                    if self.settings.normalize_against is not None:
+                        stored = transformation.aggregate_data(
+                            raw_df,
+                            func,
+                            None,
+                            False,
+                            statistics=self.settings.statistics,
+                            outlier_rejection=self.settings.outlier_rejection,
+                            ci_method=self.settings.ci_method,
+                        )
+                    store.ResultsStore(self.settings.store).append(
+                        stored, func.__name__, self.settings.revision or ""
+                    )
+                    if self.settings.output_progress:
+                        print(
+                            f"[NSIGHT-PYTHON] Appended the processed profiling data to {self.settings.store}"
+                        )
 
                 # Save to CSV if enabled
                 if self.settings.output_csv:
@@ -417,7 +649,7 @@ class NsightProfiler:
 
                 func._nspy_ncu_run_id += 1  # type: ignore[attr-defined]
 
-                return ProfileResults(results=processed)
+                return ProfileResults(results=processed, raw_results=raw_df)
 
             return None
 
@@ -9,18 +9,33 @@ NCU is instructed to profile specific code sections marked by NVTX ranges - the
 Nsight Python annotations.
 """
 
+from __future__ import annotations
+
+import concurrent.futures
+import inspect
 import os
 import subprocess
 import sys
-from collections.abc import Callable, Sequence
-from typing import Any, Literal
-
-import pandas as pd
+from collections.abc import Callable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Literal
 
-from nsight import exceptions, extraction, utils
-from nsight.collection import core
+from nsight import derived as derived_metrics
+from nsight import exceptions, utils
+from nsight.collection import calibration, core, planner
 from nsight.exceptions import NCUErrorContext
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Environment variables restricting the profiled script to a batch of runs
+CONFIGS_ENV = "NSPY_NCU_CONFIGS"
+RUNS_ENV = "NSPY_NCU_RUNS"
+
+# Environment variables holding the paths the profiled script writes its telemetry
+# and the energy of the annotated regions to
+TELEMETRY_ENV = "NSPY_NCU_TELEMETRY"
+ENERGY_ENV = "NSPY_NCU_ENERGY"
+
 
 def launch_ncu(
     report_path: str,
@@ -30,17 +45,38 @@ def launch_ncu(
     clock_control: Literal["none", "base"],
     replay_mode: Literal["kernel", "range"],
     verbose: bool,
+    device: int | None = None,
+    sections: Sequence[str] | None = None,
+    section_set: str | None = None,
+    config_indices: Sequence[int] | None = None,
+    runs: int | None = None,
+    telemetry_path: str | None = None,
+    energy_path: str | None = None,
 ) -> str | None:
     """
     Launch NVIDIA Nsight Compute to profile the current script with specified options.
 
     Args:
         report_path: Path to write report file to.
-        metric: Specific metric to collect.
+        metric: Specific metric to collect. Multiple metrics are separated by commas.
         cache_control: Select cache control option
         clock_control: Select clock control option
         replay_mode: Select replay mode option
         verbose: If False, log is written to a file (ncu_log.txt)
+        device: If set, the profiled script only sees this GPU
+            (via ``CUDA_VISIBLE_DEVICES``). Default: ``None``
+        sections: Identifiers of sections to collect in addition to the metrics,
+            e.g. ``"SpeedOfLight"``. Default: ``None``
+        section_set: Identifier of a section set to collect in addition to the
+            metrics, e.g. ``"detailed"``. Default: ``None``
+        config_indices: If set, the profiled script only runs the configurations
+            with these indices. Default: ``None``
+        runs: If set, overrides the number of runs of every configuration.
+            Default: ``None``
+        telemetry_path: If set, the profiled script writes the GPU telemetry of
+            every run to this file, see :mod:`nsight.telemetry`. Default: ``None``
+        energy_path: If set, the profiled script writes the energy per call of the
+            annotated regions of every run to this file. Default: ``None``
 
     Raises:
         NCUNotAvailableError: If NCU is not available on the system.
@@ -59,6 +95,16 @@ def launch_ncu(
     # Set an environment variable to detect recursive calls
     env = os.environ.copy()
     env["NSPY_NCU_PROFILE"] = name
+    if device is not None:
+        env["CUDA_VISIBLE_DEVICES"] = str(device)
+    if config_indices is not None:
+        env[CONFIGS_ENV] = ",".join(str(i) for i in config_indices)
+    if runs is not None:
+        env[RUNS_ENV] = str(runs)
+    if telemetry_path is not None:
+        env[TELEMETRY_ENV] = telemetry_path
+    if energy_path is not None:
+        env[ENERGY_ENV] = energy_path
 
     if cache_control not in ("none", "all"):
         raise ValueError("cache_control must be 'none', or 'all'")
@@ -73,9 +119,12 @@ def launch_ncu(
     log_path = os.path.splitext(report_path)[0] + ".log"
     log = f"--log-file {log_path}"
     nvtx = f'--nvtx --nvtx-include "regex:{utils.NVTX_DOMAIN}@.+/"'
+    section_options = "".join(f" --section {section}" for section in sections or [])
+    if section_set is not None:
+        section_options += f" --set {section_set}"
 
     # Construct the ncu command
-    ncu_command = f"""ncu {log} {cache} {clocks} {replay} {nvtx} --metrics {metric} -f -o {report_path} {sys.executable} {script_path} {script_args}"""
+    ncu_command = f"""ncu {log} {cache} {clocks} {replay} {nvtx}{section_options} --metrics {metric} -f -o {report_path} {sys.executable} {script_path} {script_args}"""
 
     # Check if ncu is available on the system
     ncu_available = False
@@ -127,9 +176,12 @@ class NCUCollector(core.NsightCollector):
     NCU collector for Nsight Python.
 
     Args:
-        metric: Metric to collect from
+        metric: Metric or sequence of metrics to collect from
             NVIDIA Nsight Compute. By default we collect kernel runtimes in nanoseconds.
             A list of supported metrics can be found with ``ncu --list-metrics``.
+            If multiple metrics are given, the first one is the primary metric
+            reported in the ``Value`` column and the others are reported in a
+            column named after the metric.
         ignore_kernel_list: List of kernel names to ignore.
             If you call a library within a ``annotation`` context, you might not have
             precise control over which and how many kernels are being launched.
@@ -157,16 +209,39 @@ class NCUCollector(core.NsightCollector):
             For more details, see the NVIDIA Nsight Compute Profiling Guide:
             https://docs.nvidia.com/nsight-compute/ProfilingGuide/index.html#replay
             Default: ``kernel``
+        devices: GPUs to distribute the metric passes over. If more than one GPU is
+            given and the metrics need multiple replay passes, the passes are
+            collected by parallel NVIDIA Nsight Compute processes, one per GPU, and
+            their reports are merged by run index. See :mod:`nsight.collection.planner`.
+            Default: ``None``
+        sections: Identifiers of NVIDIA Nsight Compute sections to collect, e.g.
+            ``["SpeedOfLight", "MemoryWorkloadAnalysis", "Occupancy", "LaunchStats"]``.
+            Every numeric metric of these sections is extracted into a column named
+            after the metric. A list of available sections can be found with
+            ``ncu --list-sections``. Default: ``None``
+        section_set: Identifier of an NVIDIA Nsight Compute section set to collect,
+            e.g. ``"detailed"``. Every numeric metric of all collected sections is
+            extracted. A list of available sets can be found with ``ncu --list-sets``.
+            Default: ``None``
+        derived: Derived metrics computed from several collected metrics, given as a
+            mapping from column name to expression, e.g.
+            ``{"GBps": "dram__bytes.sum / gpu__time_duration.sum"}``. The metrics the
+            expressions refer to are collected automatically. See
+            :mod:`nsight.derived`. Default: ``None``
     """
 
     def __init__(
         self,
-        metric: str = "gpu__time_duration.sum",
+        metric: str | Sequence[str] = "gpu__time_duration.sum",
         ignore_kernel_list: Sequence[str] | None = None,
         combine_kernel_metrics: Callable[[float, float], float] | None = None,
         clock_control: Literal["base", "none"] = "none",
         cache_control: Literal["all", "none"] = "all",
         replay_mode: Literal["kernel", "range"] = "kernel",
+        devices: Sequence[int] | None = None,
+        sections: Sequence[str] | None = None,
+        section_set: str | None = None,
+        derived: Mapping[str, str] | None = None,
     ):
         if clock_control not in ("none", "base"):
             raise ValueError("clock_control must be 'none', or 'base'")
@@ -175,7 +250,16 @@ class NCUCollector(core.NsightCollector):
         if replay_mode not in ("kernel", "range"):
             raise ValueError("replay_mode must be 'kernel', or 'range'")
 
-        self.metric = metric
+        self.metrics = [metric] if isinstance(metric, str) else list(metric)
+        if len(self.metrics) == 0:
+            raise ValueError("metric must name at least one metric")
+        self.metric = self.metrics[0]
+        self.devices = devices
+        self.sections = list(sections or [])
+        self.section_set = section_set
+        self.derived = dict(derived or {})
+        # Validate the expressions before profiling
+        derived_metrics.evaluation_order(self.derived)
         self.ignore_kernel_list = ignore_kernel_list or []
         self.combine_kernel_metrics = combine_kernel_metrics
         self.clock_control = clock_control
@@ -204,65 +288,302 @@ class NCUCollector(core.NsightCollector):
         if "NSPY_NCU_PROFILE" not in os.environ:
 
             tag = f"{func.__name__}-{func._nspy_ncu_run_id}"  # type: ignore[attr-defined]
-            report_path = f"{settings.output_prefix}ncu-output-{tag}.ncu-rep"
-
-            # Launch NVIDIA Nsight Compute
-            log_path = launch_ncu(
-                report_path,
-                func.__name__,
-                self.metric,
-                self.cache_control,
-                self.clock_control,
-                self.replay_mode,
-                settings.output_detailed,
+
+            # The report reader is not needed by the profiled child process
+            from nsight import extraction
+
+            # Collect the metrics the derived metrics depend on
+            parameters = inspect.signature(func).parameters
+            metrics = list(
+                dict.fromkeys(
+                    self.metrics
+                    + derived_metrics.required_metrics(
+                        self.derived, parameters, extraction.DATA_COLUMNS
+                    )
+                )
             )
 
+            plan = planner.plan_metric_passes(metrics, self.devices)
             if settings.output_progress:
-                print("[NSIGHT-PYTHON] Profiling completed successfully !")
-                print(
-                    f"[NSIGHT-PYTHON] Refer to {report_path} for the NVIDIA Nsight Compute CLI report"
+                print(plan.summary(len(configs), settings.runs))
+
+            if settings.ab_test is None:
+                df = self._profile(
+                    func, configs, settings.runs, settings, tag, plan, metrics
                 )
-                print(
-                    f"[NSIGHT-PYTHON] Refer to {log_path} for the NVIDIA Nsight Compute CLI logs"
+            else:
+                df = self._profile_sequentially(
+                    func, configs, settings, tag, plan, metrics
                 )
 
-            # Extract raw data
-            df = extraction.extract_df_from_report(
-                report_path,
-                self.metric,
-                configs,  # type: ignore[arg-type]
-                settings.runs,
-                func,
-                settings.derive_metric,
-                self.ignore_kernel_list,  # type: ignore[arg-type]
-                settings.output_progress,
-                self.combine_kernel_metrics,
-            )
+            if settings.noise_floor is not None:
+                df = calibration.add_noise_floor(
+                    df,
+                    calibration.noise_floor(self, settings, df),
+                    len(parameters),
+                    subtract=settings.noise_floor == "subtract",
+                )
             return df
 
         else:
             # If NSPY_NCU_PROFILE is set, just run the function normally
             name = os.environ["NSPY_NCU_PROFILE"]
 
+            # The noise floor is calibrated in a process of its own
+            if name == calibration.KERNEL_NAME and settings.noise_floor is not None:
+                calibration.measure_noise_floor(self, settings)
+
             # If this is not the function we are profiling, stop
             if func.__name__ != name:
                 return None
 
+            # Sequential profiling runs a batch of the configurations at a time
+            runs = int(os.environ.get(RUNS_ENV, settings.runs))
+            if CONFIGS_ENV in os.environ:
+                configs = [configs[int(i)] for i in os.environ[CONFIGS_ENV].split(",")]
+
             if settings.output_progress:
                 utils.print_header(
                     f"Profiling {name}",
-                    f"{len(configs)} configurations, {settings.runs} runs each",
+                    f"{len(configs)} configurations, {runs} runs each",
                 )
 
             core.run_profile_session(
                 func,
                 configs,
-                settings.runs,
+                runs,
                 settings.output_progress,
                 settings.output_detailed,
                 settings.thermal_control,
+                settings.telemetry_interval,
+                os.environ.get(TELEMETRY_ENV),
+                os.environ.get(ENERGY_ENV),
+                settings.energy_batch_calls,
             )
 
             # Exit after profiling to prevent the rest of the script from running
             # Use os._exit() instead of sys.exit() to avoid pytest catching SystemExit
             os._exit(0)
+
+    def _profile(
+        self,
+        func: Callable[..., Any],
+        configs: Sequence[Sequence[Any]],
+        runs: int,
+        settings: core.ProfileSettings,
+        tag: str,
+        plan: planner.MetricPassPlan,
+        metrics: list[str],
+        config_indices: Sequence[int] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Profiles configurations with NVIDIA Nsight Compute and extracts the results.
+
+        Args:
+            func: The function to profile.
+            configs: The configurations to profile.
+            runs: Number of runs of every configuration.
+            settings: Profiling settings.
+            tag: Tag of the report files.
+            plan: Distribution of the metrics over NVIDIA Nsight Compute launches.
+            metrics: All metrics to collect, starting with the primary metric.
+            config_indices: Indices of ``configs`` among the configurations of the
+                profiled script, if only some of them are profiled.
+        """
+        # The report reader is not needed by the profiled child process
+        from nsight import extraction
+
+        report_paths = [f"{settings.output_prefix}ncu-output-{tag}.ncu-rep"]
+        report_paths += [
+            f"{settings.output_prefix}ncu-output-{tag}-part{i}.ncu-rep"
+            for i in range(1, len(plan.launches))
+        ]
+        # The telemetry and energy are recorded by the main launch only
+        telemetry_path = None
+        if settings.telemetry_interval is not None:
+            telemetry_path = f"{settings.output_prefix}telemetry-{tag}.json"
+        energy_path = None
+        if settings.energy:
+            energy_path = f"{settings.output_prefix}energy-{tag}.json"
+
+        # Launch NVIDIA Nsight Compute, one process per planned launch
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(plan.launches)
+        ) as executor:
+            # Sections and launch statistics are collected by the main launch only
+            launch_stats = list(extraction.LAUNCH_STATS_METRICS.values())
+            futures = [
+                executor.submit(
+                    launch_ncu,
+                    report_path,
+                    func.__name__,
+                    ",".join(
+                        dict.fromkeys(launch_metrics + (launch_stats if i == 0 else []))
+                    ),
+                    self.cache_control,
+                    self.clock_control,
+                    self.replay_mode,
+                    settings.output_detailed,
+                    device,
+                    self.sections if i == 0 else None,
+                    self.section_set if i == 0 else None,
+                    config_indices,
+                    None if config_indices is None else runs,
+                    telemetry_path if i == 0 else None,
+                    energy_path if i == 0 else None,
+                )
+                for i, (report_path, launch_metrics, device) in enumerate(
+                    zip(report_paths, plan.launches, plan.devices)
+                )
+            ]
+            log_paths = [future.result() for future in futures]
+
+        if settings.output_progress:
+            print("[NSIGHT-PYTHON] Profiling completed successfully !")
+            for report_path, log_path in zip(report_paths, log_paths):
+                print(
+                    f"[NSIGHT-PYTHON] Refer to {report_path} for the NVIDIA Nsight Compute CLI report"
+                )
+                print(
+                    f"[NSIGHT-PYTHON] Refer to {log_path} for the NVIDIA Nsight Compute CLI logs"
+                )
+
+        # Extract raw data
+        df = extraction.extract_df_from_report(
+            report_paths[0],
+            self.metric,
+            configs,  # type: ignore[arg-type]
+            runs,
+            func,
+            settings.derive_metric,
+            self.ignore_kernel_list,  # type: ignore[arg-type]
+            settings.output_progress,
+            self.combine_kernel_metrics,
+            extra_metrics=metrics[1:],
+            partial_reports=list(zip(report_paths[1:], plan.launches[1:])),
+            sections=self.sections,
+            all_sections=self.section_set is not None,
+            derived=self.derived,
+            config_indices=config_indices,
+        )
+        num_args = len(inspect.signature(func).parameters)
+        if telemetry_path is not None or energy_path is not None:
+            from nsight import telemetry
+
+            if telemetry_path is not None:
+                df = telemetry.add_telemetry_columns(
+                    df, telemetry.load_records(telemetry_path), num_args
+                )
+            if energy_path is not None:
+                df = telemetry.add_energy_columns(
+                    df, telemetry.load_records(energy_path), num_args
+                )
+        return df
+
+    def _profile_sequentially(
+        self,
+        func: Callable[..., Any],
+        configs: Sequence[Sequence[Any]],
+        settings: core.ProfileSettings,
+        tag: str,
+        plan: planner.MetricPassPlan,
+        metrics: list[str],
+    ) -> pd.DataFrame:
+        """
+        Profiles configurations in batches of ``settings.ab_batch_runs`` runs until
+        the two annotations of ``settings.ab_test`` differ significantly or
+        ``settings.runs`` runs are reached, separately for every configuration.
+
+        After every batch, the always-valid p-value of
+        :func:`nsight.transformation.sequential_p_values` is updated, which remains
+        valid however often it is checked. Its mixture variance is fixed from the
+        first batch in which the variances of both annotations of a configuration are
+        known. The smallest p-value of a configuration is reported in the
+        ``SequentialPValue`` column.
+        """
+        import numpy as np
+        import pandas as pd
+
+        from nsight import extraction, transformation
+
+        assert settings.ab_test is not None
+        first, second = settings.ab_test
+        p_values = np.ones(len(configs))
+        mixture_variances = np.full(len(configs), np.nan)
+        active = list(range(len(configs)))
+        runs_done = 0
+        frames: list[pd.DataFrame] = []
+
+        while active:
+            runs = min(settings.ab_batch_runs, settings.runs - runs_done)
+            df = self._profile(
+                func,
+                [configs[i] for i in active],
+                runs,
+                settings,
+                f"{tag}-batch{len(frames)}",
+                plan,
+                metrics,
+                config_indices=active,
+            )
+            frames.append(df)
+            runs_done += runs
+
+            combined = pd.concat(frames, ignore_index=True)
+            values = pd.to_numeric(combined["Value"], errors="coerce")
+            stats = values.groupby(
+                [combined["Annotation"], combined[extraction.CONFIG_INDEX_COLUMN]]
+            ).agg(["mean", "var", "count"])
+            for annotation in (first, second):
+                if annotation not in stats.index.get_level_values(0):
+                    raise exceptions.ProfilerException(
+                        f"Annotation '{annotation}' of ab_test was not profiled"
+                    )
+            a = stats.loc[first].reindex(active)
+            b = stats.loc[second].reindex(active)
+            # The mixture variance must not change between the checks
+            variances = (a["var"] + b["var"]).to_numpy()
+            unknown = np.isnan(mixture_variances[active])
+            mixture_variances[np.array(active)[unknown]] = variances[unknown]
+            p_values[active] = np.minimum(
+                p_values[active],
+                transformation.sequential_p_values(
+                    a["mean"].to_numpy(),
+                    a["var"].to_numpy(),
+                    a["count"].to_numpy(),
+                    b["mean"].to_numpy(),
+                    b["var"].to_numpy(),
+                    b["count"].to_numpy(),
+                    mixture_variances[active],
+                ),
+            )
+
+            active = [
+                i
+                for i in active
+                if p_values[i] > transformation.SIGNIFICANCE_LEVEL
+                and runs_done < settings.runs
+            ]
+            if settings.output_progress:
+                print(
+                    f"[NSIGHT-PYTHON] {runs_done} runs: {len(configs) - len(active)} of "
+                    f"{len(configs)} configurations decided"
+                )
+
+        # Restore the order of the rows, by annotation, configuration and batch
+        combined = pd.concat(frames, ignore_index=True)
+        annotation_order = {a: i for i, a in enumerate(combined["Annotation"].unique())}
+        combined["_annotation"] = combined["Annotation"].map(annotation_order)
+        combined = combined.sort_values(
+            ["_annotation", extraction.CONFIG_INDEX_COLUMN], kind="stable"
+        ).reset_index(drop=True)
+        config_index = combined.pop(extraction.CONFIG_INDEX_COLUMN).to_numpy()
+        combined = combined.drop(columns="_annotation")
+
+        combined.attrs = frames[0].attrs
+        return utils.insert_run_columns(
+            combined,
+            {"SequentialPValue": p_values[config_index]},
+            {"SequentialPValue": "first"},
+            len(inspect.signature(func).parameters),
+        )
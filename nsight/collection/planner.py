@@ -0,0 +1,168 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Metric pass planning for NVIDIA Nsight Compute collection.
+
+Collecting many hardware metrics requires NVIDIA Nsight Compute to replay every
+profiled kernel once per counter pass, so the profiling time grows with the number
+of passes. This module groups the requested metrics into passes of compatible
+metrics, estimates the resulting replay cost and, when several GPUs are available,
+distributes the passes across separate NVIDIA Nsight Compute processes that run in
+parallel. The partial reports are merged back by run index during extraction.
+
+The pass estimate is a heuristic: metrics of the same hardware unit (the part of the
+metric name before ``__``) are assumed to share counters, and launch, device and
+duration metrics are assumed to be collected without an additional pass.
+"""
+
+import dataclasses
+import math
+from collections.abc import Sequence
+
+from nsight import utils
+
+# Metrics that NVIDIA Nsight Compute collects without dedicating a counter pass
+FREE_METRIC_PREFIXES = ("launch__", "device__", "gpu__time_duration")
+
+# Upper bound of hardware metrics of the same unit scheduled into one pass
+MAX_METRICS_PER_PASS = 4
+
+
+@dataclasses.dataclass
+class MetricPassPlan:
+    """
+    The planned metric passes and their assignment to NVIDIA Nsight Compute launches.
+
+    Attributes:
+        passes: Metrics grouped into estimated replay passes. The primary metric
+            is always the first metric of the first pass.
+        launches: Metrics collected by each NVIDIA Nsight Compute process.
+        devices: The GPU each launch runs on, or ``None`` to use the default device.
+    """
+
+    passes: list[list[str]]
+    launches: list[list[str]]
+    devices: list[int | None]
+
+    @property
+    def num_passes(self) -> int:
+        """Estimated number of replay passes per kernel."""
+        return len(self.passes)
+
+    def estimated_replays(self, num_kernels: int) -> int:
+        """
+        Estimated total number of kernel replays across all launches.
+
+        Args:
+            num_kernels: Number of profiled kernels per launch.
+        """
+        return self.num_passes * num_kernels
+
+    def estimated_critical_path(self, num_kernels: int) -> int:
+        """
+        Estimated number of kernel replays of the slowest launch, i.e. the replay
+        cost when all launches run in parallel.
+
+        Args:
+            num_kernels: Number of profiled kernels per launch.
+        """
+        passes_per_launch = math.ceil(self.num_passes / len(self.launches))
+        return passes_per_launch * num_kernels
+
+    def summary(self, num_configs: int, runs: int) -> str:
+        """
+        Human readable description of the plan and its estimated replay cost. The
+        number of kernels launched by a run is only known after profiling, so the
+        replays are counted for every kernel launched by a run, over all runs.
+
+        Args:
+            num_configs: Number of profiled configurations.
+            runs: Number of runs of every configuration.
+        """
+        devices = ", ".join(
+            "default" if device is None else str(device) for device in self.devices
+        )
+        num_runs = num_configs * runs
+        return (
+            f"[NSIGHT-PYTHON] Metric plan: {self.num_passes} estimated pass(es) for "
+            f"{sum(len(p) for p in self.passes)} metric(s), "
+            f"{self.estimated_replays(num_runs)} replay(s) per kernel of a run over "
+            f"{num_runs} run(s), {self.estimated_critical_path(num_runs)} on the "
+            f"critical path across {len(self.launches)} NVIDIA Nsight Compute "
+            f"process(es) (GPU: {devices})"
+        )
+
+
+def _metric_unit(metric: str) -> str:
+    return metric.split("__", 1)[0]
+
+
+def plan_metric_passes(
+    metrics: Sequence[str],
+    devices: Sequence[int] | None = None,
+    max_metrics_per_pass: int = MAX_METRICS_PER_PASS,
+) -> MetricPassPlan:
+    """
+    Groups metrics into estimated replay passes and assigns the passes to launches.
+
+    Args:
+        metrics: The metrics to collect. The first metric is the primary metric.
+        devices: GPUs available for collection. If more than one is given, the
+            passes are distributed round-robin over up to ``len(devices)``
+            NVIDIA Nsight Compute processes. Default: ``None``
+        max_metrics_per_pass: Maximum number of hardware metrics of the same unit
+            assumed to fit into one pass. Default: ``MAX_METRICS_PER_PASS``
+
+    Returns:
+        The planned passes and launches.
+    """
+    if len(metrics) == 0:
+        raise ValueError("At least one metric must be requested")
+
+    # Remove duplicates while keeping the primary metric first
+    metrics = list(dict.fromkeys(metrics))
+
+    free_metrics = [m for m in metrics if m.startswith(FREE_METRIC_PREFIXES)]
+    by_unit: dict[str, list[str]] = {}
+    for m in metrics:
+        if m not in free_metrics:
+            by_unit.setdefault(_metric_unit(m), []).append(m)
+
+    passes: list[list[str]] = []
+    for unit_metrics in by_unit.values():
+        passes.extend(
+            list(batch) for batch in utils.batched(unit_metrics, max_metrics_per_pass)
+        )
+
+    # Free metrics ride along with the first pass
+    if passes:
+        passes[0] = free_metrics + passes[0]
+    else:
+        passes = [free_metrics]
+
+    # Keep the primary metric first in the first pass
+    primary = metrics[0]
+    primary_pass = next(i for i, p in enumerate(passes) if primary in p)
+    passes.insert(0, passes.pop(primary_pass))
+    passes[0].remove(primary)
+    passes[0].insert(0, primary)
+
+    if devices is None or len(devices) <= 1 or len(passes) == 1:
+        device = None if not devices else devices[0]
+        return MetricPassPlan(
+            passes=passes,
+            launches=[[m for p in passes for m in p]],
+            devices=[device],
+        )
+
+    num_launches = min(len(devices), len(passes))
+    launches: list[list[str]] = [[] for _ in range(num_launches)]
+    for i, p in enumerate(passes):
+        launches[i % num_launches].extend(p)
+
+    return MetricPassPlan(
+        passes=passes,
+        launches=launches,
+        devices=list(devices[:num_launches]),
+    )
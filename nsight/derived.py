@@ -0,0 +1,269 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Derived metrics combining several collected metrics.
+
+Derived metrics are declared as a mapping from a column name to an arithmetic
+expression, for example::
+
+    derived = {
+        "Seconds": "gpu__time_duration.sum * 1e-9",
+        "GBps": "dram__bytes.sum / Seconds / 1e9",
+    }
+
+Names in an expression refer, in this order, to another derived metric, a parameter
+of the profiled function, or a NVIDIA Nsight Compute metric. Derived metrics may
+depend on each other as long as there is no cycle. The metrics an expression refers
+to are added to the collected metrics automatically, and the expressions are
+evaluated on whole columns of the extracted profiling data, once per run.
+
+Expressions support numbers, ``+``, ``-``, ``*``, ``/``, ``//``, ``%``, ``**`` and
+the functions listed in :data:`FUNCTIONS`. Divisions by zero result in ``inf`` or
+NaN, and failed runs are NaN.
+"""
+
+from __future__ import annotations
+
+import ast
+import graphlib
+from collections.abc import Iterable, Mapping
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FUNCTIONS: dict[str, str] = {
+    "abs": "abs",
+    "sqrt": "sqrt",
+    "exp": "exp",
+    "log": "log",
+    "log2": "log2",
+    "log10": "log10",
+    "min": "minimum",
+    "max": "maximum",
+}
+"""
+Functions that can be called in derived metric expressions, mapped to the name of
+the NumPy function evaluating them.
+"""
+
+# NumPy functions evaluating the operators, imported only when evaluating
+_BINARY_OPERATORS: dict[type[ast.operator], str] = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "true_divide",
+    ast.FloorDiv: "floor_divide",
+    ast.Mod: "mod",
+    ast.Pow: "power",
+}
+
+_UNARY_OPERATORS: dict[type[ast.unaryop], str] = {
+    ast.USub: "negative",
+    ast.UAdd: "positive",
+}
+
+
+def _dotted_name(node: ast.expr) -> str | None:
+    """
+    Rebuilds dotted metric names like ``dram__bytes.sum.per_second``, which Python
+    parses as attribute accesses, or returns ``None`` if ``node`` is not a name.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted_name(node.value)
+        return None if base is None else f"{base}.{node.attr}"
+    return None
+
+
+def parse_expression(expression: str) -> ast.expr:
+    """
+    Parses and validates a derived metric expression.
+
+    Args:
+        expression: The expression to parse.
+
+    Returns:
+        The syntax tree of the expression.
+
+    Raises:
+        ValueError: If the expression is not valid Python or uses unsupported syntax.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid derived metric expression '{expression}'") from e
+
+    def validate(node: ast.expr) -> None:
+        if _dotted_name(node) is not None:
+            return
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            validate(node.left)
+            validate(node.right)
+            return
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            validate(node.operand)
+            return
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in FUNCTIONS
+            and not node.keywords
+        ):
+            for arg in node.args:
+                validate(arg)
+            return
+        raise ValueError(
+            f"Unsupported syntax '{ast.unparse(node)}' in derived metric expression "
+            f"'{expression}'"
+        )
+
+    validate(tree)
+    return tree
+
+
+def expression_names(expression: str) -> list[str]:
+    """
+    Returns the names an expression refers to, in order of appearance.
+
+    Args:
+        expression: The derived metric expression.
+    """
+    names: list[str] = []
+
+    def visit(node: ast.expr) -> None:
+        name = _dotted_name(node)
+        if name is not None:
+            names.append(name)
+        elif isinstance(node, ast.BinOp):
+            visit(node.left)
+            visit(node.right)
+        elif isinstance(node, ast.UnaryOp):
+            visit(node.operand)
+        elif isinstance(node, ast.Call):
+            for arg in node.args:
+                visit(arg)
+
+    visit(parse_expression(expression))
+    return list(dict.fromkeys(names))
+
+
+def evaluation_order(derived: Mapping[str, str]) -> list[str]:
+    """
+    Sorts derived metrics so that every metric comes after the derived metrics it
+    depends on.
+
+    Args:
+        derived: Mapping from derived metric name to expression.
+
+    Raises:
+        ValueError: If the derived metrics depend on each other in a cycle.
+    """
+    graph = {
+        name: [dep for dep in expression_names(expr) if dep in derived]
+        for name, expr in derived.items()
+    }
+    try:
+        return list(graphlib.TopologicalSorter(graph).static_order())
+    except graphlib.CycleError as e:
+        raise ValueError(
+            f"Derived metrics depend on each other in a cycle: {' -> '.join(e.args[1])}"
+        ) from e
+
+
+def required_metrics(
+    derived: Mapping[str, str],
+    parameters: Iterable[str] = (),
+    columns: Iterable[str] = (),
+) -> list[str]:
+    """
+    Returns the NVIDIA Nsight Compute metrics needed to evaluate derived metrics.
+
+    Args:
+        derived: Mapping from derived metric name to expression.
+        parameters: Names of the parameters of the profiled function, which are not
+            metrics.
+        columns: Names of the other columns of the profiling data which are not
+            metrics, e.g. :data:`nsight.extraction.DATA_COLUMNS`.
+    """
+    excluded = set(derived) | set(parameters) | set(columns)
+    evaluation_order(derived)
+    return list(
+        dict.fromkeys(
+            name
+            for expr in derived.values()
+            for name in expression_names(expr)
+            if name not in excluded
+        )
+    )
+
+
+def _evaluate(node: ast.expr, columns: Mapping[str, Any]) -> Any:
+    import numpy as np
+
+    name = _dotted_name(node)
+    if name is not None:
+        return columns[name]
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.BinOp):
+        return getattr(np, _BINARY_OPERATORS[type(node.op)])(
+            _evaluate(node.left, columns), _evaluate(node.right, columns)
+        )
+    if isinstance(node, ast.UnaryOp):
+        return getattr(np, _UNARY_OPERATORS[type(node.op)])(
+            _evaluate(node.operand, columns)
+        )
+    assert isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+    return getattr(np, FUNCTIONS[node.func.id])(
+        *(_evaluate(arg, columns) for arg in node.args)
+    )
+
+
+def evaluate_derived_metrics(
+    derived: Mapping[str, str], columns: Mapping[str, Any], num_rows: int
+) -> dict[str, np.ndarray]:
+    """
+    Evaluates derived metrics on whole columns.
+
+    Args:
+        derived: Mapping from derived metric name to expression.
+        columns: The metric and parameter columns the expressions refer to, e.g. a
+            DataFrame. Values that are not numeric are treated as NaN.
+        num_rows: Number of rows of the columns.
+
+    Returns:
+        One array per derived metric, in evaluation order.
+
+    Raises:
+        ValueError: If an expression refers to a column that is not available.
+    """
+    import numpy as np
+    import pandas as pd
+
+    numeric: dict[str, Any] = {}
+    results: dict[str, np.ndarray] = {}
+    for name in evaluation_order(derived):
+        expression = derived[name]
+        for dep in expression_names(expression):
+            if dep in results or dep in numeric:
+                continue
+            if dep not in columns:
+                raise ValueError(
+                    f"Derived metric '{name}' refers to '{dep}', which is neither a "
+                    "collected metric nor a parameter"
+                )
+            numeric[dep] = pd.to_numeric(
+                pd.Series(columns[dep]), errors="coerce"
+            ).to_numpy(dtype=float)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            value = _evaluate(parse_expression(expression), {**numeric, **results})
+        results[name] = np.broadcast_to(
+            np.asarray(value, dtype=float), (num_rows,)
+        ).copy()
+    return results
@@ -32,7 +32,9 @@ class NCUNotAvailableError(Exception):
     pass
 
 
-CUDA_CORE_UNAVAILABLE_MSG = "cuda-core is required for ignore_failures functionality.\n Install it with:\n  - pip install nsight-python[cu12]  (if you have CUDA 12.x)\n  - pip install nsight-python[cu13]  (if you have CUDA 13.x)"
+CUDA_CORE_UNAVAILABLE_MSG = "cuda-core is required for ignore_failures, noise floor calibration and energy measurement.\n Install it with:\n  - pip install nsight-python[cu12]  (if you have CUDA 12.x)\n  - pip install nsight-python[cu13]  (if you have CUDA 13.x)"
+
+SCIPY_UNAVAILABLE_MSG = "scipy is required for t-distribution confidence intervals and significance tests.\n Install it with:\n  - pip install nsight-python[stats]"
 
 
 @dataclass
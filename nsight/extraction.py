@@ -8,47 +8,240 @@ This module provides functionality to load `.ncu-rep` reports, extract performan
 and transform it into structured pandas DataFrames for further analysis.
 
 Functions:
-    extract_ncu_action_data(action, metric):
+    extract_ncu_action_data(action, metric, extra_metrics=(), sections=None, all_sections=False):
         Extracts performance data for a specific kernel action from an NVIDIA Nsight Compute report.
 
-    extract_df_from_report(metric, configs, iterations, func, derive_metric, ignore_kernel_list, verbose, combine_kernel_metrics=None):
+    extract_section_metrics(action, sections=None, all_sections=False):
+        Extracts all numeric metrics of the collected sections of a kernel action.
+
+    extract_df_from_report(metric, configs, iterations, func, derive_metric, ignore_kernel_list, verbose, combine_kernel_metrics=None, extra_metrics=None, partial_reports=None, sections=None, all_sections=False):
         Processes the full NVIDIA Nsight Compute report and returns a pandas DataFrame containing performance metrics.
 """
 
 import functools
 import inspect
+import numbers
 import socket
-from collections.abc import Callable
+from collections.abc import Callable, Mapping, Sequence
 from typing import Any, List, Tuple
 
 import ncu_report
 import pandas as pd
 
-from nsight import exceptions, utils
+from nsight import derived as derived_metrics
+from nsight import exceptions, occupancy, transformation, utils
+
+# Launch statistics reported for every kernel, keyed by their column name
+LAUNCH_STATS_METRICS = {
+    "GridSize": "launch__grid_size",
+    "BlockSize": "launch__block_size",
+    "RegistersPerThread": "launch__registers_per_thread",
+    "StaticSharedMemoryPerBlock": "launch__shared_mem_per_block_static",
+    "DynamicSharedMemoryPerBlock": "launch__shared_mem_per_block_dynamic",
+    "WavesPerSM": "launch__waves_per_multiprocessor",
+}
+
+# Device attributes reported for every kernel, needed to estimate its occupancy
+DEVICE_ATTRIBUTE_COLUMNS = ["ComputeCapability", "NumSMs"]
+
+# Column holding the index of the configuration of every row, if requested
+CONFIG_INDEX_COLUMN = "ConfigIndex"
+
+# Columns of the extracted data which are not metrics, but which derived metrics
+# may refer to
+DATA_COLUMNS = [
+    "Annotation",
+    "Value",
+    "Metric",
+    "Transformed",
+    "Kernel",
+    "GPU",
+    "Host",
+    "ComputeClock",
+    "MemoryClock",
+    *LAUNCH_STATS_METRICS,
+    *DEVICE_ATTRIBUTE_COLUMNS,
+]
+
+
+def _metric_value(action: Any, metric: str) -> Any:
+    """Returns the value of ``metric`` or ``None`` if the action does not contain it."""
+    ncu_metric = action.metric_by_name(metric)
+    return None if ncu_metric is None else ncu_metric.value()
+
+
+def extract_section_metrics(
+    action: Any,
+    sections: Sequence[str] | None = None,
+    all_sections: bool = False,
+) -> dict[str, Any]:
+    """
+    Extracts the numeric metrics of the sections collected for a kernel action.
 
+    Args:
+        action: The NVIDIA Nsight Compute action object.
+        sections: Identifiers of the sections to extract, e.g. ``"SpeedOfLight"``.
+        all_sections: If True, extract the metrics of all sections in the action.
 
-def extract_ncu_action_data(action: Any, metric: str) -> utils.NCUActionData:
+    Returns:
+        Metric values keyed by metric name, in section order.
+    """
+    section_metrics: dict[str, Any] = {}
+    if not sections and not all_sections:
+        return section_metrics
+
+    for section in action.sections():
+        if not all_sections and section.identifier() not in sections:  # type: ignore[operator]
+            continue
+        for ncu_metric in [*section.header_metrics(), *section.body_metrics()]:
+            value = ncu_metric.value()
+            # Tables and string metrics cannot be aggregated across runs
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                section_metrics.setdefault(ncu_metric.name(), value)
+
+    return section_metrics
+
+
+def extract_ncu_action_data(
+    action: Any,
+    metric: str,
+    extra_metrics: Sequence[str] = (),
+    sections: Sequence[str] | None = None,
+    all_sections: bool = False,
+) -> utils.NCUActionData:
     """
     Extracts performance data from an NVIDIA Nsight Compute kernel action.
 
     Args:
         action: The NVIDIA Nsight Compute action object.
         metric: The metric name to extract from the action.
+        extra_metrics: Additional metric names to extract from the action.
+            Metrics missing from the action are reported as ``None``.
+        sections: Identifiers of sections whose metrics are extracted as well.
+        all_sections: If True, extract the metrics of all collected sections.
 
     Returns:
-        A data container with extracted metric, clock rates, and GPU name.
+        A data container with extracted metrics, launch statistics, clock rates,
+        and GPU name.
     """
+    failed = "dummy_kernel_failure" in action.name()
+    metrics = {
+        name: None if failed else _metric_value(action, name) for name in extra_metrics
+    }
+    for name, value in extract_section_metrics(action, sections, all_sections).items():
+        if name != metric:
+            metrics.setdefault(name, None if failed else value)
+
     return utils.NCUActionData(
         name=action.name(),
-        value=(
-            None if "dummy_kernel_failure" in action.name() else action[metric].value()
-        ),
+        value=None if failed else action[metric].value(),
         compute_clock=action["device__attribute_clock_rate"].value(),
         memory_clock=action["device__attribute_memory_clock_rate"].value(),
         gpu=action["device__attribute_display_name"].value(),
+        metrics=metrics,
+        launch_stats={
+            **{
+                column: None if failed else _metric_value(action, name)
+                for column, name in LAUNCH_STATS_METRICS.items()
+            },
+            "ComputeCapability": _compute_capability(action),
+            "NumSMs": _metric_value(action, "device__attribute_multiprocessor_count"),
+        },
     )
 
 
+def _compute_capability(action: Any) -> str | None:
+    """Returns the compute capability of the GPU, e.g. ``"8.0"``, if it is reported."""
+    major = _metric_value(action, "device__attribute_compute_capability_major")
+    minor = _metric_value(action, "device__attribute_compute_capability_minor")
+    if major is None or minor is None:
+        return None
+    return f"{major}.{minor}"
+
+
+def _load_report(report_path: str) -> Any:
+    try:
+        return ncu_report.load_report(report_path)
+    except FileNotFoundError:
+        raise exceptions.ProfilerException(
+            "No NVIDIA Nsight Compute report found. Please run nsight-python with `@nsight.analyze.kernel(output='verbose')`"
+            "to identify the issue."
+        )
+
+
+def _extract_profiling_data(
+    report: Any,
+    metric: str,
+    extra_metrics: Sequence[str],
+    ignore_kernel_list: List[str] | None,
+    sections: Sequence[str] | None = None,
+    all_sections: bool = False,
+) -> dict[str, list[utils.NCUActionData]]:
+    """
+    Collects the action data of all Nsight Python annotations in a report,
+    keyed by annotation and ordered by launch.
+    """
+    profiling_data: dict[str, list[utils.NCUActionData]] = {}
+    for range_idx in range(report.num_ranges()):
+        current_range = report.range_by_idx(range_idx)
+        for action_idx in range(current_range.num_actions()):
+            action = current_range.action_by_idx(action_idx)
+            state = action.nvtx_state()
+
+            for domain_idx in state.domains():
+                domain = state.domain_by_id(domain_idx)
+
+                # ignore actions not in the nsight-python nvtx domain
+                if domain.name() != utils.NVTX_DOMAIN:
+                    continue
+                # ignore kernels in ignore_kernel_list
+                if ignore_kernel_list and action.name() in ignore_kernel_list:
+                    continue
+
+                annotation = domain.push_pop_ranges()[0]
+                data = extract_ncu_action_data(
+                    action, metric, extra_metrics, sections, all_sections
+                )
+
+                if annotation not in profiling_data:
+                    profiling_data[annotation] = []
+                profiling_data[annotation].append(data)
+
+    return profiling_data
+
+
+def _merge_partial_data(
+    profiling_data: dict[str, list[utils.NCUActionData]],
+    partial_data: dict[str, list[utils.NCUActionData]],
+    partial_metrics: Sequence[str],
+) -> None:
+    """
+    Merges the metrics of a partial report into ``profiling_data`` by run index.
+    Both reports were produced by the same script, so the n-th action of an
+    annotation refers to the same kernel launch in both of them.
+    """
+    if partial_data.keys() != profiling_data.keys():
+        raise exceptions.ProfilerException(
+            "Partial NVIDIA Nsight Compute reports contain different annotations: "
+            f"{sorted(profiling_data.keys())} vs. {sorted(partial_data.keys())}"
+        )
+
+    for annotation, annotation_data in profiling_data.items():
+        partial_annotation_data = partial_data[annotation]
+        if len(partial_annotation_data) != len(annotation_data):
+            raise exceptions.ProfilerException(
+                f"Partial NVIDIA Nsight Compute reports contain a different number of "
+                f"kernels for annotation '{annotation}': {len(annotation_data)} vs. "
+                f"{len(partial_annotation_data)}"
+            )
+        for data, partial in zip(annotation_data, partial_annotation_data):
+            assert data.name == partial.name
+            partial_values = {partial_metrics[0]: partial.value, **partial.metrics}
+            for name in data.metrics:
+                if name in partial_values:
+                    data.metrics[name] = partial_values[name]
+
+
 def extract_df_from_report(
     report_path: str,
     metric: str,
@@ -59,6 +252,12 @@ def extract_df_from_report(
     ignore_kernel_list: List[str] | None,
     output_progress: bool,
     combine_kernel_metrics: Callable[[float, float], float] | None = None,
+    extra_metrics: Sequence[str] | None = None,
+    partial_reports: Sequence[Tuple[str, Sequence[str]]] | None = None,
+    sections: Sequence[str] | None = None,
+    all_sections: bool = False,
+    derived: Mapping[str, str] | None = None,
+    config_indices: Sequence[int] | None = None,
 ) -> pd.DataFrame:
     """
     Extracts and aggregates profiling results from an NVIDIA Nsight Compute report.
@@ -70,9 +269,28 @@ def extract_df_from_report(
         iterations: Number of times each configuration was run.
         func: Function representing the kernel launch with parameter signature.
         derive_metric: Function to transform the raw metric value with config values.
+            If it is wrapped with :class:`nsight.transformation.vectorized`, it is
+            evaluated once over the whole ``Value`` column instead of once per row.
         ignore_kernel_list: Kernel names to ignore in the analysis.
         combine_kernel_metrics: Function to merge multiple kernel metrics.
         verbose: Toggles the printing of extraction progress
+        extra_metrics: Additional metrics to extract. Each one becomes a column
+            named after the metric, which is averaged when aggregating the runs.
+        partial_reports: Additional reports of the same profiling session, given as
+            ``(report_path, metrics)`` pairs, which hold some of the ``extra_metrics``.
+            They are merged into the main report by run index.
+        sections: Identifiers of sections in the main report whose numeric metrics
+            are extracted. Like ``extra_metrics``, each metric becomes a column named
+            after the metric, which is averaged when aggregating the runs.
+        all_sections: If True, extract the numeric metrics of all sections in the
+            main report, e.g. when a section set was collected.
+        derived: Derived metrics to evaluate, given as a mapping from column name to
+            expression, see :mod:`nsight.derived`. Each one becomes a column which is
+            averaged when aggregating the runs. The expressions are evaluated on the
+            untransformed metric values.
+        config_indices: Indices identifying the ``configs``. If given, they are
+            stored in the ``CONFIG_INDEX_COLUMN`` column before the parameter
+            columns, e.g. to match rows of several profiling sessions.
 
     Returns:
         A DataFrame containing the extracted and transformed performance data.
@@ -83,16 +301,13 @@ def extract_df_from_report(
     """
     if output_progress:
         print("[NSIGHT-PYTHON] Loading profiled data")
-    try:
-        report = ncu_report.load_report(report_path)
-    except FileNotFoundError:
-        raise exceptions.ProfilerException(
-            "No NVIDIA Nsight Compute report found. Please run nsight-python with `@nsight.analyze.kernel(output='verbose')`"
-            "to identify the issue."
-        )
+    report = _load_report(report_path)
+
+    extra_metrics = [m for m in extra_metrics or [] if m != metric]
 
     annotations: List[str] = []
     values: List[float | None] = []
+    raw_values: List[float | None] = []
     kernel_names: List[str] = []
     gpus: List[str] = []
     compute_clocks: List[int] = []
@@ -100,6 +315,13 @@ def extract_df_from_report(
     metrics: List[str] = []
     transformed_metrics: List[str | bool] = []
     hostnames: List[str] = []
+    # Position in ``configs`` of the configuration of every row
+    config_positions: List[int] = []
+    # One dict per row holding the additional and section metrics
+    metric_rows: List[dict[str, Any]] = []
+    launch_stats: dict[str, list[Any]] = {
+        name: [] for name in [*LAUNCH_STATS_METRICS, *DEVICE_ATTRIBUTE_COLUMNS]
+    }
 
     sig = inspect.signature(func)
 
@@ -109,29 +331,17 @@ def extract_df_from_report(
     # Extract all profiling data
     if output_progress:
         print(f"Extracting profiling data")
-    profiling_data: dict[str, list[utils.NCUActionData]] = {}
-    for range_idx in range(report.num_ranges()):
-        current_range = report.range_by_idx(range_idx)
-        for action_idx in range(current_range.num_actions()):
-            action = current_range.action_by_idx(action_idx)
-            state = action.nvtx_state()
-
-            for domain_idx in state.domains():
-                domain = state.domain_by_id(domain_idx)
-
-                # ignore actions not in the nsight-python nvtx domain
-                if domain.name() != utils.NVTX_DOMAIN:
-                    continue
-                # ignore kernels in ignore_kernel_list
-                if ignore_kernel_list and action.name() in ignore_kernel_list:
-                    continue
-
-                annotation = domain.push_pop_ranges()[0]
-                data = extract_ncu_action_data(action, metric)
-
-                if annotation not in profiling_data:
-                    profiling_data[annotation] = []
-                profiling_data[annotation].append(data)
+    profiling_data = _extract_profiling_data(
+        report, metric, extra_metrics, ignore_kernel_list, sections, all_sections
+    )
+    for partial_report_path, partial_metrics in partial_reports or []:
+        partial_data = _extract_profiling_data(
+            _load_report(partial_report_path),
+            partial_metrics[0],
+            partial_metrics[1:],
+            ignore_kernel_list,
+        )
+        _merge_partial_data(profiling_data, partial_data, partial_metrics)
 
     for annotation, annotation_data in profiling_data.items():
         if output_progress:
@@ -177,28 +387,37 @@ def extract_df_from_report(
                 )
             )
 
-        for conf, data in zip(configs_repeated, action_data):
+        positions_repeated = [i for i in range(len(configs)) for _ in range(iterations)]
+        for position, conf, data in zip(
+            positions_repeated, configs_repeated, action_data
+        ):
             compute_clocks.append(data.compute_clock)
             memory_clocks.append(data.memory_clock)
             gpus.append(data.gpu)
             kernel_names.append(data.name)
+            for name, stat in data.launch_stats.items():
+                launch_stats[name].append(stat)
 
             # evaluate the measured metric
             value = data.value
             if derive_metric is not None:
-                derived_metric = None if value is None else derive_metric(value, *conf)
-                value = derived_metric
+                # Vectorized functions are evaluated once the DataFrame is built
+                if not isinstance(derive_metric, transformation.vectorized):
+                    value = None if value is None else derive_metric(value, *conf)
                 derive_metric_name = derive_metric.__name__
                 transformed_metrics.append(derive_metric_name)
             else:
                 transformed_metrics.append(False)
 
             values.append(value)
+            raw_values.append(data.value)
+            metric_rows.append(data.metrics)
 
             # gather remaining required data
             annotations.append(annotation)
             metrics.append(metric)
             hostnames.append(socket.gethostname())
+            config_positions.append(position)
             # Add a field for every config argument
             bound_args = sig.bind(*conf)
             for name, val in bound_args.arguments.items():
@@ -215,10 +434,48 @@ def extract_df_from_report(
         "Host": hostnames,
         "ComputeClock": compute_clocks,
         "MemoryClock": memory_clocks,
+        **launch_stats,
     }
 
+    # Add a column for every additional and section metric. Section metrics
+    # are discovered per action, rows lacking a metric are filled with None.
+    metric_names = list(
+        dict.fromkeys([*extra_metrics, *(name for row in metric_rows for name in row)])
+    )
+    for name in metric_names:
+        df_data[name] = [row.get(name) for row in metric_rows]
+
+    # Evaluate the derived metrics on whole columns
+    derived = derived or {}
+    derived_data = derived_metrics.evaluate_derived_metrics(
+        derived,
+        {metric: raw_values, **df_data, **arg_arrays},
+        len(raw_values),
+    )
+    for name in derived:
+        if name in df_data or name in arg_arrays:
+            raise ValueError(f"Derived metric '{name}' clashes with an existing column")
+        df_data[name] = derived_data[name]
+
+    if config_indices is not None:
+        df_data[CONFIG_INDEX_COLUMN] = [config_indices[i] for i in config_positions]
+
     # Add each array in arg_arrays to the DataFrame
     for arg_name, arg_values in arg_arrays.items():
         df_data[arg_name] = arg_values
 
-    return pd.DataFrame(df_data)
+    # Estimate the theoretical occupancy from the launch statistics
+    df = occupancy.add_occupancy_columns(pd.DataFrame(df_data))
+
+    if isinstance(derive_metric, transformation.vectorized):
+        df = transformation.apply_vectorized_metric(
+            df, derive_metric, list(arg_arrays.keys())
+        )
+
+    # Launch statistics are missing for failed runs, so take the first valid one
+    df.attrs[utils.AGGREGATIONS_ATTR] = {
+        **{name: "first" for name in LAUNCH_STATS_METRICS},
+        **{name: "first" for name in occupancy.OCCUPANCY_COLUMNS},
+        **{name: "mean" for name in [*metric_names, *derived]},
+    }
+    return df
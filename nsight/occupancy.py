@@ -0,0 +1,229 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Offline theoretical occupancy calculator.
+
+This module estimates the theoretical occupancy of kernel launches from their launch
+parameters and the resource limits of the GPU architecture, in the same way as the
+CUDA occupancy calculator. It does not need a GPU, so it can be used standalone to
+prune a configuration space before profiling, and it is applied to the launch
+statistics extracted from NVIDIA Nsight Compute reports.
+
+All functions are vectorized: launch parameters may be scalars, NumPy arrays or
+pandas Series, and are broadcast against each other.
+"""
+
+import dataclasses
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+@dataclasses.dataclass(frozen=True)
+class ArchitectureLimits:
+    """
+    Per-multiprocessor resource limits of a GPU architecture.
+
+    Shared memory limits assume the maximum shared memory carveout.
+    """
+
+    max_threads_per_sm: int
+    max_blocks_per_sm: int
+    max_registers_per_sm: int
+    register_allocation_unit: int
+    max_shared_memory_per_sm: int
+    shared_memory_allocation_unit: int
+    reserved_shared_memory_per_block: int
+    warp_size: int = 32
+
+
+ARCHITECTURE_LIMITS: dict[str, ArchitectureLimits] = {
+    "7.0": ArchitectureLimits(2048, 32, 65536, 256, 98304, 256, 0),
+    "7.2": ArchitectureLimits(2048, 32, 65536, 256, 98304, 256, 0),
+    "7.5": ArchitectureLimits(1024, 16, 65536, 256, 65536, 256, 0),
+    "8.0": ArchitectureLimits(2048, 32, 65536, 256, 167936, 128, 1024),
+    "8.6": ArchitectureLimits(1536, 16, 65536, 256, 102400, 128, 1024),
+    "8.7": ArchitectureLimits(2048, 32, 65536, 256, 167936, 128, 1024),
+    "8.9": ArchitectureLimits(1536, 24, 65536, 256, 102400, 128, 1024),
+    "9.0": ArchitectureLimits(2048, 32, 65536, 256, 233472, 128, 1024),
+    "10.0": ArchitectureLimits(2048, 32, 65536, 256, 233472, 128, 1024),
+    "12.0": ArchitectureLimits(1536, 32, 65536, 256, 102400, 128, 1024),
+}
+"""Resource limits keyed by compute capability, e.g. ``"8.0"``."""
+
+# Columns added by theoretical_occupancy
+OCCUPANCY_COLUMNS = [
+    "ActiveBlocksPerSM",
+    "TheoreticalOccupancyPct",
+    "OccupancyLimiter",
+    "PredictedWavesPerSM",
+]
+
+# Names of the resources that can limit the number of active blocks, in the order
+# used to break ties
+LIMITERS = np.array(["Blocks", "Warps", "Registers", "SharedMemory"])
+
+
+def _architecture_limits(compute_capability: str) -> ArchitectureLimits | None:
+    """
+    Returns the limits of a compute capability, falling back to the first minor
+    version of the same major version, or ``None`` if the architecture is unknown.
+    """
+    if compute_capability in ARCHITECTURE_LIMITS:
+        return ARCHITECTURE_LIMITS[compute_capability]
+    major = compute_capability.split(".")[0]
+    return ARCHITECTURE_LIMITS.get(f"{major}.0")
+
+
+def _limits_array(compute_capability: np.ndarray, field: str) -> np.ndarray:
+    lookup = {
+        cc: getattr(limits, field) if limits is not None else np.nan
+        for cc in set(compute_capability)
+        for limits in [_architecture_limits(cc)]
+    }
+    return np.array([lookup[cc] for cc in compute_capability], dtype=float)
+
+
+def _ceil_to(value: np.ndarray, unit: np.ndarray) -> np.ndarray:
+    return np.asarray(np.ceil(value / unit) * unit)
+
+
+def theoretical_occupancy(
+    block_size: Any,
+    registers_per_thread: Any = 0,
+    shared_memory_per_block: Any = 0,
+    compute_capability: Any = "8.0",
+    grid_size: Any = None,
+    num_sms: Any = None,
+) -> pd.DataFrame:
+    """
+    Computes the theoretical occupancy of kernel launches.
+
+    Args:
+        block_size: Number of threads per block.
+        registers_per_thread: Registers allocated per thread. Default: ``0``
+        shared_memory_per_block: Static and dynamic shared memory per block in bytes.
+            Default: ``0``
+        compute_capability: Compute capability of the GPU, e.g. ``"8.0"``. See
+            :data:`ARCHITECTURE_LIMITS` for the supported values. Unknown minor
+            versions use the limits of the first minor version of their major
+            version. Default: ``"8.0"``
+        grid_size: Number of blocks of the launch. Required for ``PredictedWavesPerSM``.
+            Default: ``None``
+        num_sms: Number of multiprocessors of the GPU. Required for
+            ``PredictedWavesPerSM``. Default: ``None``
+
+    Returns:
+        One row per launch with the following columns:
+
+            - ``ActiveBlocksPerSM``: Maximum number of blocks resident on a multiprocessor
+            - ``TheoreticalOccupancyPct``: Active warps as a percentage of the maximum warps per multiprocessor
+            - ``OccupancyLimiter``: The resource limiting the number of active blocks, one of ``"Blocks"``, ``"Warps"``, ``"Registers"`` or ``"SharedMemory"``
+            - ``PredictedWavesPerSM``: Number of waves needed to execute the grid, or NaN if ``grid_size`` or ``num_sms`` is not given
+
+        Launches with missing or invalid parameters or an unknown architecture are
+        reported as NaN.
+    """
+
+    def numeric(values: Any) -> np.ndarray:
+        if values is None:
+            return np.array([np.nan])
+        return np.asarray(
+            pd.to_numeric(np.atleast_1d(values), errors="coerce"), dtype=float
+        )
+
+    block, registers, shared_memory, grid, sms, capability = np.broadcast_arrays(
+        numeric(block_size),
+        numeric(registers_per_thread),
+        numeric(shared_memory_per_block),
+        numeric(grid_size),
+        numeric(num_sms),
+        np.atleast_1d(np.asarray(compute_capability, dtype=str)),
+    )
+
+    def limit(field: str) -> np.ndarray:
+        return _limits_array(capability, field)
+
+    warp_size = limit("warp_size")
+    max_warps = limit("max_threads_per_sm") / warp_size
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        warps_per_block = np.ceil(block / warp_size)
+
+        by_blocks = limit("max_blocks_per_sm")
+        by_warps = np.floor(max_warps / warps_per_block)
+
+        registers_per_warp = _ceil_to(
+            registers * warp_size, limit("register_allocation_unit")
+        )
+        by_registers = np.where(
+            registers > 0,
+            np.floor(
+                np.floor(limit("max_registers_per_sm") / registers_per_warp)
+                / warps_per_block
+            ),
+            np.inf,
+        )
+
+        shared_memory_per_block = _ceil_to(
+            shared_memory + limit("reserved_shared_memory_per_block"),
+            limit("shared_memory_allocation_unit"),
+        )
+        by_shared_memory = np.where(
+            shared_memory_per_block > 0,
+            np.floor(limit("max_shared_memory_per_sm") / shared_memory_per_block),
+            np.inf,
+        )
+
+        candidates = np.stack([by_blocks, by_warps, by_registers, by_shared_memory])
+        active_blocks = candidates.min(axis=0)
+        limiter = LIMITERS[candidates.argmin(axis=0)]
+
+        occupancy = 100 * active_blocks * warps_per_block / max_warps
+        waves = grid / (active_blocks * sms)
+
+    invalid = np.isnan(block) | np.isnan(registers) | np.isnan(shared_memory)
+    invalid |= np.isnan(max_warps) | (block <= 0)
+    return pd.DataFrame(
+        {
+            "ActiveBlocksPerSM": np.where(invalid, np.nan, active_blocks),
+            "TheoreticalOccupancyPct": np.where(invalid, np.nan, occupancy),
+            "OccupancyLimiter": np.where(invalid, None, limiter),
+            "PredictedWavesPerSM": np.where(invalid, np.nan, waves),
+        }
+    )
+
+
+def add_occupancy_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the theoretical occupancy for every row of a DataFrame holding launch
+    statistics, e.g. the raw data returned by
+    :func:`nsight.extraction.extract_df_from_report`.
+
+    Args:
+        df: DataFrame with the columns ``BlockSize``, ``RegistersPerThread``,
+            ``StaticSharedMemoryPerBlock``, ``DynamicSharedMemoryPerBlock``,
+            ``GridSize``, ``ComputeCapability`` and ``NumSMs``.
+
+    Returns:
+        A copy of ``df`` with the columns of :func:`theoretical_occupancy` inserted
+        after the ``NumSMs`` column.
+    """
+    occupancy = theoretical_occupancy(
+        df["BlockSize"],
+        df["RegistersPerThread"],
+        pd.to_numeric(df["StaticSharedMemoryPerBlock"], errors="coerce")
+        + pd.to_numeric(df["DynamicSharedMemoryPerBlock"], errors="coerce"),
+        df["ComputeCapability"],
+        df["GridSize"],
+        df["NumSMs"],
+    )
+    occupancy.index = df.index
+
+    df = df.copy()
+    position = df.columns.get_loc("NumSMs") + 1
+    for offset, column in enumerate(occupancy.columns):
+        df.insert(position + offset, column, occupancy[column])
+    return df
@@ -0,0 +1,426 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Database of profiling results for tracking performance across revisions.
+
+A :class:`ResultsStore` is an SQLite database holding the aggregated results of
+every profiled configuration, indexed by function name, configuration, annotation,
+metric, GPU, host and a revision tag, e.g. a commit hash. Results are appended
+automatically when profiling with ``nsight.analyze.kernel(store=..., revision=...)``
+and can be checked for regressions with :func:`compare_to_baseline`::
+
+    store = nsight.store.ResultsStore("benchmarks.db")
+    results = benchmark(configs=configs)
+    regressions = nsight.store.compare_to_baseline(
+        store, results.to_dataframe(), "benchmark", baseline_revision="v1.0"
+    )
+
+:func:`detect_regressions` flags the changes between consecutive revisions of a
+stored history, and :func:`nsight.visualization.visualize_history` plots it.
+
+Only the summary statistics of the runs are stored, which suffice to test whether
+the results differ significantly.
+"""
+
+import contextlib
+import json
+import sqlite3
+import time
+from collections.abc import Iterator, Sequence
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+
+from nsight import exceptions, transformation
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    function TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    annotation TEXT NOT NULL,
+    config TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    gpu TEXT NOT NULL,
+    host TEXT NOT NULL,
+    avg_value REAL,
+    std_dev REAL,
+    min_value REAL,
+    max_value REAL,
+    num_runs INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (
+    function, metric, gpu, host, revision, annotation, config
+);
+"""
+
+# Columns of the processed data stored for every configuration
+_VALUE_COLUMNS = {
+    "AvgValue": "avg_value",
+    "StdDev": "std_dev",
+    "MinValue": "min_value",
+    "MaxValue": "max_value",
+    "NumRuns": "num_runs",
+}
+
+# Columns of loaded results and the fields they are stored in
+_COLUMNS = {
+    "Revision": "revision",
+    "Timestamp": "timestamp",
+    "Annotation": "annotation",
+    "Config": "config",
+    "Metric": "metric",
+    "GPU": "gpu",
+    "Host": "host",
+    **_VALUE_COLUMNS,
+}
+
+
+def _config_fields(results: pd.DataFrame) -> list[str]:
+    """Returns the parameter columns of processed profiling data."""
+    columns: list[str] = results.columns.tolist()
+    return columns[1 : columns.index("AvgValue")]
+
+
+def _config_keys(results: pd.DataFrame, fields: Sequence[str]) -> list[str]:
+    """Serializes the parameter values of every row into a JSON object."""
+    return [
+        json.dumps(dict(zip(fields, values)), sort_keys=True, default=str)
+        for values in results[list(fields)].itertuples(index=False, name=None)
+    ]
+
+
+def _text_column(results: pd.DataFrame, column: str) -> pd.Series:
+    if column not in results.columns:
+        return pd.Series("", index=results.index)
+    return results[column].fillna("").astype(str)
+
+
+class ResultsStore:
+    """
+    SQLite database of aggregated profiling results.
+
+    Args:
+        path: Path of the database file, which is created if it does not exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Opens a connection that commits on success and is closed afterwards."""
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def append(
+        self,
+        results: pd.DataFrame,
+        function: str,
+        revision: str,
+        timestamp: float | None = None,
+    ) -> None:
+        """
+        Stores processed profiling results.
+
+        Args:
+            results: Processed profiling results, as returned by
+                :meth:`nsight.collection.core.ProfileResults.to_dataframe`.
+            function: Name of the profiled function.
+            revision: Tag of the revision that was profiled, e.g. a commit hash.
+            timestamp: Time of the profiling session in seconds since the epoch.
+                Default: the current time.
+        """
+        fields = _config_fields(results)
+        rows = pd.DataFrame(
+            {
+                "function": function,
+                "revision": revision,
+                "timestamp": time.time() if timestamp is None else timestamp,
+                "annotation": results["Annotation"].astype(str).to_numpy(),
+                "config": _config_keys(results, fields),
+                "metric": _text_column(results, "Metric").to_numpy(),
+                "gpu": _text_column(results, "GPU").to_numpy(),
+                "host": _text_column(results, "Host").to_numpy(),
+                **{
+                    name: pd.to_numeric(results[column], errors="coerce").to_numpy()
+                    for column, name in _VALUE_COLUMNS.items()
+                },
+            }
+        )
+        rows = rows.astype(object).where(rows.notna(), None)
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO results ({', '.join(rows.columns)}) "
+                f"VALUES ({', '.join('?' * len(rows.columns))})",
+                rows.itertuples(index=False, name=None),
+            )
+
+    def revisions(self, function: str) -> list[str]:
+        """
+        Returns the stored revisions of a function, from the oldest to the newest.
+
+        Args:
+            function: Name of the profiled function.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT revision FROM results WHERE function = ? "
+                "GROUP BY revision ORDER BY MAX(timestamp)",
+                (function,),
+            ).fetchall()
+        return [revision for (revision,) in rows]
+
+    def load(
+        self,
+        function: str,
+        revision: str | None = None,
+        metric: str | None = None,
+        gpu: str | None = None,
+        host: str | None = None,
+        last: int | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Loads stored results, optionally filtered by revision, metric, GPU and host.
+        If a configuration was stored several times for a revision, the latest
+        results are returned.
+
+        Args:
+            function: Name of the profiled function.
+            revision: Only load the results of this revision. Default: all.
+            metric: Only load the results of this metric. Default: all.
+            gpu: Only load the results of this GPU. Default: all.
+            host: Only load the results of this host. Default: all.
+            last: Only load the results of the most recently stored revisions.
+                Default: all.
+            columns: Only load these columns, which is faster for long histories.
+                Default: all.
+
+        Returns:
+            One row per revision, annotation, configuration, metric, GPU and host with
+            the columns ``Revision``, ``Timestamp``, ``Annotation``, ``Config`` (the
+            parameter values as a JSON object), ``Metric``, ``GPU``, ``Host``,
+            ``AvgValue``, ``StdDev``, ``MinValue``, ``MaxValue`` and ``NumRuns``.
+        """
+        filters = {"function": function, "revision": revision}
+        filters.update(metric=metric, gpu=gpu, host=host)
+        conditions = [
+            (name, value) for name, value in filters.items() if value is not None
+        ]
+        where = " AND ".join(f"{name} = ?" for name, _ in conditions)
+        values: list[Any] = [value for _, value in conditions]
+        keys = "revision, annotation, config, metric, gpu, host"
+        if last is not None:
+            where += """ AND revision IN (
+                SELECT revision FROM results WHERE function = ?
+                GROUP BY revision ORDER BY MAX(timestamp) DESC LIMIT ?
+            )"""
+            values += [function, last]
+
+        selected = [
+            name
+            for column, name in _COLUMNS.items()
+            if columns is None or column in columns
+        ]
+        query = f"""
+            SELECT {', '.join(selected)}
+            FROM results
+            WHERE {where} AND rowid IN (
+                SELECT MAX(rowid) FROM results WHERE {where} GROUP BY {keys}
+            )
+            ORDER BY rowid
+        """
+        with self._connect() as connection:
+            df = pd.read_sql_query(query, connection, params=values * 2)
+        return df.rename(columns={name: column for column, name in _COLUMNS.items()})
+
+
+def compare_to_baseline(
+    store: ResultsStore,
+    results: pd.DataFrame,
+    function: str,
+    baseline_revision: str | None = None,
+    higher_is_better: bool = False,
+    min_change_pct: float = 0.0,
+    correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm",
+) -> pd.DataFrame:
+    """
+    Tests whether profiling results regressed against the stored results of a
+    baseline revision.
+
+    Every configuration and annotation is compared with Welch's t-test on the
+    summary statistics of the runs, so only the results of the baseline revision
+    with the same metric, GPU and host are loaded from the store.
+
+    Args:
+        store: The store holding the baseline results.
+        results: Processed profiling results, as returned by
+            :meth:`nsight.collection.core.ProfileResults.to_dataframe`.
+        function: Name of the profiled function.
+        baseline_revision: Revision to compare against. Default: the most recently
+            stored revision.
+        higher_is_better: Whether larger metric values are better, e.g. for
+            throughputs. Default: ``False``, as for timings.
+        min_change_pct: Minimum relative change in percent for a significant
+            difference to count as a regression. Default: ``0.0``
+        correction: Correction of the p-values for testing many configurations, see
+            :func:`nsight.transformation.compare_annotations`. Default: ``"holm"``
+
+    Returns:
+        ``results`` with the columns ``BaselineValue``, ``ChangePct``, ``PValue``,
+        ``PValueAdjusted`` and ``Regression`` added. Configurations without baseline
+        results have NaN values and are no regressions.
+
+    Raises:
+        ImportError: If scipy is not installed.
+        exceptions.ProfilerException: If the store holds no results of the function
+            or of ``baseline_revision``.
+    """
+    if not transformation.SCIPY_AVAILABLE:
+        raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+
+    if baseline_revision is None:
+        revisions = store.revisions(function)
+        if not revisions:
+            raise exceptions.ProfilerException(
+                f"No results of '{function}' found in {store.path}"
+            )
+        baseline_revision = revisions[-1]
+
+    metrics = _text_column(results, "Metric").unique().tolist()
+    gpus = _text_column(results, "GPU").unique().tolist()
+    hosts = _text_column(results, "Host").unique().tolist()
+    baseline = pd.concat(
+        [
+            store.load(function, baseline_revision, metric, gpu, host)
+            for metric in metrics
+            for gpu in gpus
+            for host in hosts
+        ],
+        ignore_index=True,
+    )
+    if baseline.empty:
+        raise exceptions.ProfilerException(
+            f"No results of '{function}' at revision '{baseline_revision}' found "
+            f"in {store.path}"
+        )
+
+    # Match the configurations of both results
+    keys = ["Annotation", "Config", "Metric", "GPU", "Host"]
+    current = pd.DataFrame(
+        {
+            "Annotation": results["Annotation"].astype(str).to_numpy(),
+            "Config": _config_keys(results, _config_fields(results)),
+            "Metric": _text_column(results, "Metric").to_numpy(),
+            "GPU": _text_column(results, "GPU").to_numpy(),
+            "Host": _text_column(results, "Host").to_numpy(),
+        }
+    )
+    index = pd.MultiIndex.from_frame(baseline[keys]).get_indexer(
+        pd.MultiIndex.from_frame(current)
+    )
+    matched = baseline.reindex(np.where(index >= 0, index, len(baseline)))
+
+    results = results.copy()
+    results["BaselineValue"] = matched["AvgValue"].to_numpy(dtype=float)
+    return _add_regressions(
+        results, matched, higher_is_better, min_change_pct, correction
+    )
+
+
+def _add_regressions(
+    results: pd.DataFrame,
+    baseline: pd.DataFrame,
+    higher_is_better: bool,
+    min_change_pct: float,
+    correction: str,
+) -> pd.DataFrame:
+    """
+    Adds the columns ``ChangePct``, ``PValue``, ``PValueAdjusted`` and
+    ``Regression`` comparing every row of results with the same row of baseline
+    results, with Welch's t-test on their summary statistics.
+    """
+
+    def column(df: pd.DataFrame, name: str) -> np.ndarray:
+        return np.asarray(pd.to_numeric(df[name], errors="coerce"), dtype=float)
+
+    mean, mean_b = column(results, "AvgValue"), column(baseline, "AvgValue")
+    std, std_b = column(results, "StdDev"), column(baseline, "StdDev")
+    n, n_b = column(results, "NumRuns"), column(baseline, "NumRuns")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = (mean - mean_b) / mean_b * 100
+    p_values = transformation.welch_p_values(mean, std**2, n, mean_b, std_b**2, n_b)
+
+    results["ChangePct"] = change_pct
+    results["PValue"] = p_values
+    results["PValueAdjusted"] = transformation._adjust_p_values(p_values, correction)
+    worse = (
+        change_pct < -min_change_pct
+        if higher_is_better
+        else change_pct > min_change_pct
+    )
+    results["Regression"] = (
+        results["PValueAdjusted"] < transformation.SIGNIFICANCE_LEVEL
+    ) & worse
+    return results
+
+
+def detect_regressions(
+    history: pd.DataFrame,
+    higher_is_better: bool = False,
+    min_change_pct: float = 0.0,
+    correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm",
+) -> pd.DataFrame:
+    """
+    Tests whether stored results regressed against the previous revision of the
+    same annotation and configuration, like :func:`compare_to_baseline`.
+
+    Args:
+        history: Stored results, as returned by :meth:`ResultsStore.load`, with at
+            least the columns ``Revision``, ``Timestamp``, ``Annotation``,
+            ``Config``, ``AvgValue``, ``StdDev`` and ``NumRuns``.
+        higher_is_better: Whether larger metric values are better, e.g. for
+            throughputs. Default: ``False``, as for timings.
+        min_change_pct: Minimum relative change in percent for a significant
+            difference to count as a regression. Default: ``0.0``
+        correction: Correction of the p-values for testing many revisions and
+            configurations. Default: ``"holm"``
+
+    Returns:
+        ``history`` in the order the revisions were stored, with the columns
+        ``ChangePct``, ``PValue``, ``PValueAdjusted`` and ``Regression`` added. The
+        first revision of every configuration has NaN values and is no regression.
+
+    Raises:
+        ImportError: If scipy is not installed.
+    """
+    if not transformation.SCIPY_AVAILABLE:
+        raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+
+    # Revisions are ordered by the time they were last stored
+    order = history.groupby("Revision")["Timestamp"].max().rank(method="first")
+    keys = [
+        column
+        for column in ["Annotation", "Config", "Metric", "GPU", "Host"]
+        if column in history.columns
+    ]
+    history = history.assign(_order=history["Revision"].map(order))
+    history = history.sort_values(["_order", *keys], kind="stable")
+    previous = history.groupby(keys, sort=False)[
+        ["AvgValue", "StdDev", "NumRuns"]
+    ].shift()
+
+    history = _add_regressions(
+        history, previous, higher_is_better, min_change_pct, correction
+    )
+    return history.drop(columns="_order").reset_index(drop=True)
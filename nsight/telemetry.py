@@ -0,0 +1,511 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Background sampling of GPU telemetry with NVML while profiling.
+
+NVIDIA Nsight Compute measures the profiled kernels, but not the state of the GPU
+around them. A :class:`TelemetrySampler` polls the power draw, temperature, clocks
+and clock throttle reasons of the GPU from a background thread into a ring buffer,
+and summarizes the samples of every run of the profiled function. An
+:class:`EnergyMeter` measures the energy per call of every annotated region, in
+batches of calls which are not profiled. The profiled process writes the summaries
+and energies to files, from which the parent process adds them to the raw profiling
+data as the :data:`TELEMETRY_COLUMNS` and :data:`ENERGY_COLUMNS`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from nsight import exceptions, utils
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Guard NVML imports
+try:
+    from pynvml import (
+        NVML_CLOCK_MEM,
+        NVML_CLOCK_SM,
+        NVML_TEMPERATURE_GPU,
+        NVMLError,
+        nvmlDeviceGetClockInfo,
+        nvmlDeviceGetCurrentClocksThrottleReasons,
+        nvmlDeviceGetHandleByIndex,
+        nvmlDeviceGetPowerUsage,
+        nvmlDeviceGetTemperature,
+        nvmlInit,
+    )
+
+    PYNVML_AVAILABLE = True
+except ImportError:
+    PYNVML_AVAILABLE = False
+
+
+def combine_throttle_reasons(reasons: pd.Series) -> float:
+    """Returns the bitwise OR of the throttle reasons of several runs."""
+    valid = reasons.dropna().to_numpy(dtype=np.int64)
+    return float(np.bitwise_or.reduce(valid)) if len(valid) else np.nan
+
+
+TELEMETRY_COLUMNS: dict[str, str | Callable[[pd.Series], float]] = {
+    "PowerW": "mean",
+    "MaxTemperatureC": "max",
+    "SMClockMHz": "mean",
+    "MemoryClockMHz": "mean",
+    "ThrottleReasons": combine_throttle_reasons,
+}
+"""
+Columns added to the raw profiling data, mapped to their aggregation over the runs
+of a configuration:
+
+- ``PowerW``: Mean power draw of the GPU during the run in watts. NVML may report
+  the power averaged over a longer period, depending on the GPU.
+- ``MaxTemperatureC``: Maximum GPU temperature during the run in degrees Celsius
+- ``SMClockMHz``, ``MemoryClockMHz``: Mean SM and memory clock during the run
+- ``ThrottleReasons``: Bitwise OR of the NVML clock throttle reasons during the run,
+  e.g. ``nvmlClocksThrottleReasonSwThermalSlowdown``
+"""
+
+DEFAULT_CAPACITY = 4096
+"""Number of samples kept by a :class:`TelemetrySampler` by default."""
+
+
+def visible_device() -> int:
+    """
+    Returns the NVML index of the GPU the profiled process runs on, the first one
+    listed in ``CUDA_VISIBLE_DEVICES``.
+    """
+    device = os.environ.get("CUDA_VISIBLE_DEVICES", "0").split(",")[0].strip()
+    return int(device) if device.isdigit() else 0
+
+
+def _nvml_handle(device: int) -> Any:
+    """Returns the NVML handle of a GPU, or ``None`` if NVML is not available."""
+    if not PYNVML_AVAILABLE:
+        return None
+    try:
+        nvmlInit()
+        return nvmlDeviceGetHandleByIndex(device)
+    except NVMLError:
+        return None
+
+
+def _nvml_reader(device: int) -> Callable[[], list[float]]:
+    """
+    Returns a function reading one sample of the telemetry of a GPU with NVML.
+    Values the GPU does not support are NaN.
+    """
+    handle = _nvml_handle(device)
+    if handle is None:
+        return lambda: [np.nan] * len(TELEMETRY_COLUMNS)
+    queries: list[Callable[[], float] | None] = [
+        lambda: nvmlDeviceGetPowerUsage(handle) / 1000,
+        lambda: nvmlDeviceGetTemperature(handle, NVML_TEMPERATURE_GPU),
+        lambda: nvmlDeviceGetClockInfo(handle, NVML_CLOCK_SM),
+        lambda: nvmlDeviceGetClockInfo(handle, NVML_CLOCK_MEM),
+        lambda: nvmlDeviceGetCurrentClocksThrottleReasons(handle),
+    ]
+
+    def read() -> list[float]:
+        values = []
+        for i, query in enumerate(queries):
+            value = np.nan
+            if query is not None:
+                try:
+                    value = float(query())
+                except NVMLError:
+                    # Stop querying values which are not supported
+                    queries[i] = None
+            values.append(value)
+        return values
+
+    return read
+
+
+class TelemetrySampler:
+    """
+    Samples GPU telemetry from a background thread and summarizes the samples of
+    every run.
+
+    Example usage::
+
+        with TelemetrySampler(0.01) as sampler:
+            for config in configs:
+                sampler.start_run()
+                func(*config)
+                sampler.end_run()
+        sampler.save(path)
+
+    Args:
+        interval: Time between two samples in seconds.
+        device: NVML index of the GPU. Default: :func:`visible_device`
+        capacity: Number of samples kept in the ring buffer. Runs are summarized
+            when they end, so only the samples of one run need to fit.
+            Default: :data:`DEFAULT_CAPACITY`
+        read: Function returning one sample, with one value per column of
+            :data:`TELEMETRY_COLUMNS`. Default: query the GPU with NVML
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        device: int | None = None,
+        capacity: int = DEFAULT_CAPACITY,
+        read: Callable[[], Sequence[float]] | None = None,
+    ):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.device = visible_device() if device is None else device
+        self.summaries: list[dict[str, float]] = []
+        self._read = read
+        # Every row holds the time of a sample followed by its values
+        self._samples = np.full((capacity, len(TELEMETRY_COLUMNS) + 1), np.nan)
+        self._num_samples = 0
+        self._run_start = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> TelemetrySampler:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Starts sampling in a background thread."""
+        if self._read is None:
+            self._read = _nvml_reader(self.device)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the background thread to exit."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self) -> None:
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval)
+
+    def sample(self) -> None:
+        """Reads one sample into the ring buffer."""
+        assert self._read is not None, "The sampler was not started"
+        values = self._read()
+        now = time.perf_counter()
+        with self._lock:
+            row = self._num_samples % len(self._samples)
+            self._samples[row] = [now, *values]
+            self._num_samples += 1
+
+    def start_run(self) -> None:
+        """Marks the start of a run."""
+        self._run_start = time.perf_counter()
+
+    def end_run(self) -> dict[str, float]:
+        """
+        Marks the end of a run and summarizes the samples taken since its start.
+        A sample is read at the end of every run, so even runs shorter than the
+        interval have one.
+
+        Returns:
+            The summary of the run, with one value per column of
+            :data:`TELEMETRY_COLUMNS`, which is also appended to ``summaries``.
+        """
+        self.sample()
+        with self._lock:
+            samples = self._samples[: min(self._num_samples, len(self._samples))]
+            samples = samples[samples[:, 0] >= self._run_start]
+
+        power, temperature, sm_clock, memory_clock, reasons = samples[:, 1:].T
+        summary = {
+            "PowerW": _nan_reduce(np.mean, power),
+            "MaxTemperatureC": _nan_reduce(np.max, temperature),
+            "SMClockMHz": _nan_reduce(np.mean, sm_clock),
+            "MemoryClockMHz": _nan_reduce(np.mean, memory_clock),
+            "ThrottleReasons": _nan_reduce(
+                lambda r: np.bitwise_or.reduce(r.astype(np.int64)), reasons
+            ),
+        }
+        self.summaries.append(summary)
+        return summary
+
+    def save(self, path: str) -> None:
+        """Writes the summaries of the runs to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.summaries, f)
+
+
+def _nan_reduce(reduce: Callable[[np.ndarray], Any], values: np.ndarray) -> float:
+    """Reduces the values which are not NaN, or returns NaN if there are none."""
+    values = values[~np.isnan(values)]
+    return float(reduce(values)) if len(values) else np.nan
+
+
+def load_records(path: str) -> Any:
+    """
+    Reads the records written by :meth:`TelemetrySampler.save` or
+    :meth:`EnergyMeter.save`.
+
+    Raises:
+        exceptions.ProfilerException: If the file does not exist.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise exceptions.ProfilerException(
+            f"No telemetry was recorded in {path}. Please run nsight-python with "
+            "`@nsight.analyze.kernel(output='verbose')` to identify the issue."
+        )
+
+
+def add_telemetry_columns(
+    raw_df: pd.DataFrame, summaries: Sequence[dict[str, float]], num_args: int
+) -> pd.DataFrame:
+    """
+    Adds the :data:`TELEMETRY_COLUMNS` to raw profiling data, before the parameter
+    columns.
+
+    Args:
+        raw_df: The raw profiling data. The rows of every annotation are ordered by
+            run, like the summaries.
+        summaries: The summaries of the runs, see :meth:`TelemetrySampler.end_run`.
+        num_args: Number of parameters of the profiled function.
+
+    Raises:
+        exceptions.ProfilerException: If the number of runs does not match.
+    """
+    run = raw_df.groupby("Annotation", sort=False).cumcount().to_numpy()
+    if len(raw_df) and run.max() >= len(summaries):
+        raise exceptions.ProfilerException(
+            f"Telemetry was recorded for {len(summaries)} runs, but the profiling "
+            f"data has {run.max() + 1} runs"
+        )
+
+    columns = {
+        column: np.array([summary[column] for summary in summaries], dtype=float)[run]
+        for column in TELEMETRY_COLUMNS
+    }
+    return utils.insert_run_columns(raw_df, columns, TELEMETRY_COLUMNS, num_args)
+
+
+ENERGY_COLUMNS: dict[str, str | Callable[[pd.Series], float]] = {
+    "Energy_J": "mean",
+}
+"""
+Columns added to the raw profiling data when profiling with ``energy=True``, mapped
+to their aggregation over the runs of a configuration:
+
+- ``Energy_J``: Energy consumed by the GPU per call of the annotated region in
+  joules, measured by an :class:`EnergyMeter` after every run. NaN where no energy
+  was measured.
+
+Use :func:`nsight.transformation.select_metric` to aggregate and plot it as the
+metric, and :func:`perf_per_watt` to add the calls per joule of the aggregated data.
+"""
+
+ENERGY_MIN_BATCH_SECONDS = 0.1
+"""
+Minimum duration of a batch of calls whose energy is measured by an
+:class:`EnergyMeter`, so that the coarse updates of the energy counter average out.
+"""
+
+ENERGY_MAX_BATCH_CALLS = 10
+"""
+Default maximum number of calls of a batch measured by an :class:`EnergyMeter`.
+Every call runs the whole profiled function, including the code outside the
+annotated regions.
+"""
+
+
+class EnergyMeter:
+    """
+    Measures the energy per call of every annotated region of a function, by
+    reading the cumulative energy counter of the GPU around the regions of a batch
+    of calls. The regions are not NVTX ranges while measuring, so NVIDIA Nsight
+    Compute does not profile and replay their kernels. The GPU is synchronized
+    before every read.
+
+    Short functions are called repeatedly, until the batch lasts
+    :data:`ENERGY_MIN_BATCH_SECONDS` or ``max_batch_calls`` calls were made, as the
+    counter is updated at a coarse interval.
+
+    Example usage::
+
+        meter = EnergyMeter()
+        meter.start()
+        for config in configs:
+            func(*config)  # profiled
+            meter.measure(func, config)
+        meter.save(path)
+
+    Args:
+        device: NVML index of the GPU. Default: :func:`visible_device`
+        read: Function returning the energy counter in joules, or ``None`` if it
+            is not supported. Default: :func:`nsight.thermovision.get_gpu_energy`
+        synchronize: Function waiting for the work of the GPU to complete.
+            Default: :func:`nsight.utils.synchronize_device`
+        max_batch_calls: Maximum number of calls of a batch.
+            Default: :data:`ENERGY_MAX_BATCH_CALLS`
+    """
+
+    def __init__(
+        self,
+        device: int | None = None,
+        read: Callable[[], float | None] | None = None,
+        synchronize: Callable[[], None] | None = None,
+        max_batch_calls: int | None = None,
+    ):
+        self.device = visible_device() if device is None else device
+        self.max_batch_calls = max_batch_calls or ENERGY_MAX_BATCH_CALLS
+        self.records: list[tuple[str, float]] = []
+        self._read = read
+        self._synchronize = synchronize or utils.synchronize_device
+        self._start: float | None = None
+        # Total energy and number of the regions of every annotation in a batch
+        self._totals: dict[str, list[float]] = {}
+
+    def start(self) -> None:
+        """Initializes NVML, if the energy counter is read with NVML."""
+        if self._read is None:
+            from nsight import thermovision
+
+            handle = _nvml_handle(self.device)
+            self._read = lambda: (
+                None if handle is None else thermovision.get_gpu_energy(handle)
+            )
+
+    def measure(self, func: Callable[..., Any], args: Sequence[Any]) -> None:
+        """
+        Calls a function in a batch and records the average energy per call of
+        every annotated region, in order of the first call of the regions.
+        """
+        from nsight import annotation
+
+        self._totals = {}
+        batch_start = time.perf_counter()
+        annotation.ENERGY_METER = self
+        try:
+            for _ in range(self.max_batch_calls):
+                func(*args)
+                if time.perf_counter() - batch_start >= ENERGY_MIN_BATCH_SECONDS:
+                    break
+        finally:
+            annotation.ENERGY_METER = None
+
+        for name, (total, count) in self._totals.items():
+            self.records.append((name, total / count))
+
+    def start_region(self) -> None:
+        """Reads the energy counter at the start of an annotated region."""
+        assert self._read is not None, "The meter was not started"
+        self._synchronize()
+        self._start = self._read()
+
+    def end_region(self, annotation: str) -> None:
+        """
+        Reads the energy counter at the end of an annotated region and adds the
+        energy consumed since its start to the total of the annotation.
+        """
+        assert self._read is not None, "The meter was not started"
+        self._synchronize()
+        end = self._read()
+        energy = np.nan if self._start is None or end is None else end - self._start
+        total = self._totals.setdefault(annotation, [0.0, 0])
+        total[0] += energy
+        total[1] += 1
+        self._start = None
+
+    def save(self, path: str) -> None:
+        """Writes the energy of the regions to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.records, f)
+
+
+def add_energy_columns(
+    raw_df: pd.DataFrame, records: Sequence[Sequence[Any]], num_args: int
+) -> pd.DataFrame:
+    """
+    Adds the :data:`ENERGY_COLUMNS` to raw profiling data, before the parameter
+    columns.
+
+    Args:
+        raw_df: The raw profiling data. The rows of every annotation are ordered by
+            run, like the records of the annotation.
+        records: The annotation and energy per call of every run, see
+            :attr:`EnergyMeter.records`.
+        num_args: Number of parameters of the profiled function.
+
+    Raises:
+        exceptions.ProfilerException: If the number of records of an annotation
+            does not match its number of runs.
+    """
+    energies: dict[str, list[float]] = {}
+    for annotation, energy in records:
+        energies.setdefault(annotation, []).append(energy)
+
+    energy = np.full(len(raw_df), np.nan)
+    for annotation, rows in raw_df.groupby("Annotation", sort=False).indices.items():
+        values = energies.get(annotation, [])
+        if len(values) != len(rows):
+            raise exceptions.ProfilerException(
+                f"Energy was recorded for {len(values)} runs of annotation "
+                f"'{annotation}', but the profiling data has {len(rows)} runs"
+            )
+        energy[rows] = values
+
+    return utils.insert_run_columns(
+        raw_df, {"Energy_J": energy}, ENERGY_COLUMNS, num_args
+    )
+
+
+def perf_per_watt(
+    agg_df: pd.DataFrame, energy_column: str = "Energy_J"
+) -> pd.DataFrame:
+    """
+    Adds the ``PerfPerWatt`` column to aggregated profiling data: the calls per
+    second per watt, i.e. calls per joule, the inverse of the aggregated energy per
+    call. It is NaN where no energy was measured.
+
+    Args:
+        agg_df: The aggregated profiling data.
+        energy_column: The column holding the energy per call in joules, e.g.
+            ``"AvgValue"`` if ``Energy_J`` was made the metric with
+            :func:`nsight.transformation.select_metric`.
+
+    Returns:
+        A copy of ``agg_df`` with the ``PerfPerWatt`` column inserted after
+        ``energy_column``.
+
+    Raises:
+        ValueError: If there is no such column.
+    """
+    import pandas as pd
+
+    if energy_column not in agg_df.columns:
+        raise ValueError(f"Aggregated profiling data has no column '{energy_column}'")
+
+    energy = pd.to_numeric(agg_df[energy_column], errors="coerce").to_numpy(dtype=float)
+    with np.errstate(divide="ignore"):
+        calls_per_joule = np.where(energy > 0, 1 / energy, np.nan)
+
+    agg_df = agg_df.copy()
+    position = agg_df.columns.get_loc(energy_column) + 1
+    agg_df.insert(position, "PerfPerWatt", calls_per_joule)
+    return agg_df
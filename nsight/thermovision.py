@@ -19,6 +19,7 @@ try:
         nvmlDeviceGetHandleByIndex,
         nvmlDeviceGetMarginTemperature,
         nvmlDeviceGetTemperature,
+        nvmlDeviceGetTotalEnergyConsumption,
         nvmlInit,
     )
 
@@ -111,5 +112,16 @@ def get_gpu_tlimit(handle: Any) -> int | None:
         raise e
 
 
+def get_gpu_energy(handle: Any) -> float | None:
+    """
+    Returns the energy consumed by the GPU since the driver was loaded in joules,
+    or ``None`` if the GPU does not support energy counters.
+    """
+    try:
+        return nvmlDeviceGetTotalEnergyConsumption(handle) / 1000  # type: ignore[no-any-return]
+    except NVMLError_NotSupported:
+        return None
+
+
 def get_gpu_temp(handle: Any) -> int:
     return nvmlDeviceGetTemperature(handle, NVML_TEMPERATURE_GPU)  # type: ignore[no-any-return]
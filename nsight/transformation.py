@@ -8,12 +8,396 @@ This module contains functions that process raw profiling results, aggregate met
 normalize them, and prepare the data for visualization or further statistical analysis.
 """
 
+from __future__ import annotations
+
+import functools
+import importlib.util
 import inspect
-from collections.abc import Callable
-from typing import Any
+import numbers
+import re
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING, Any, Literal
+
+from nsight import exceptions, utils
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+    import pandas as pd
+
+# Check for scipy (optional dependency), which is imported when it is used
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+
+class vectorized:
+    """
+    Marks a ``derive_metric`` function as vectorized.
+
+    Instead of being called once per run with the scalar metric value and the
+    configuration arguments, a vectorized function is called once with NumPy arrays:
+    the ``Value`` column followed by one array per parameter of the profiled
+    function. It must return an array of the same length. Failed runs are passed
+    as NaN.
+
+    Example usage::
+
+        @nsight.vectorized
+        def tflops(t, m, n, k):
+            return 2 * m * n * k / (t / 1e9) / 1e12
+
+        @nsight.analyze.kernel(configs=configs, derive_metric=tflops)
+        def benchmark(m, n, k):
+            ...
+
+    Args:
+        func: The vectorized function.
+    """
+
+    def __init__(self, func: Callable[..., Any]):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args: Any) -> Any:
+        return self.func(*args)
+
+
+def apply_vectorized_metric(
+    df: pd.DataFrame, derive_metric: vectorized, func_fields: list[str]
+) -> pd.DataFrame:
+    """
+    Evaluates a vectorized ``derive_metric`` over the ``Value`` column of raw
+    profiling data in a single call.
+
+    Args:
+        df: The raw profiling results.
+        derive_metric: The vectorized function computing the derived metric.
+        func_fields: Names of the parameter columns passed to ``derive_metric``.
+
+    Returns:
+        The DataFrame with the derived metric in the ``Value`` column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = pd.to_numeric(df["Value"], errors="coerce").to_numpy(dtype=float)
+    derived = derive_metric(values, *(df[field].to_numpy() for field in func_fields))
 
-import numpy as np
-import pandas as pd
+    derived = np.asarray(derived, dtype=float)
+    if derived.shape != values.shape:
+        raise ValueError(
+            f"Vectorized derive_metric '{derive_metric.func.__name__}' returned shape "
+            f"{derived.shape}, expected {values.shape}"
+        )
+
+    df["Value"] = derived
+    return df
+
+
+def select_metric(raw_df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    Makes another per-run column of raw profiling data the metric, e.g. ``Energy_J``
+    or an additional metric, so that :func:`aggregate_data` and
+    :func:`nsight.visualization.visualize` process it like the profiled metric.
+
+    Args:
+        raw_df: The raw profiling data, e.g. from
+            :meth:`nsight.collection.core.ProfileResults.to_raw_dataframe`.
+        column: The column holding the new metric.
+
+    Returns:
+        A copy of the data with the values of ``column`` in ``Value`` and its name in
+        ``Metric``. The column itself is dropped.
+
+    Raises:
+        ValueError: If there is no such column.
+    """
+    import pandas as pd
+
+    if column not in raw_df.columns or column in ("Annotation", "Value"):
+        raise ValueError(f"Raw profiling data has no per-run column '{column}'")
+
+    df = raw_df.copy()
+    df["Value"] = pd.to_numeric(df.pop(column), errors="coerce")
+    if "Metric" in df.columns:
+        df["Metric"] = column
+    if "Transformed" in df.columns:
+        df["Transformed"] = False
+    aggregations = raw_df.attrs.get(utils.AGGREGATIONS_ATTR, {})
+    df.attrs = {
+        **raw_df.attrs,
+        utils.AGGREGATIONS_ATTR: {k: v for k, v in aggregations.items() if k != column},
+    }
+    return df
+
+
+# Fraction of the values cut from each end of a group for the trimmed mean
+TRIM_PROPORTION = 0.1
+
+# Outliers are values whose modified z-score exceeds this threshold with MAD
+# rejection, or that lie more than this many interquartile ranges outside the
+# quartiles with IQR rejection
+MAD_THRESHOLD = 3.5
+IQR_FACTOR = 1.5
+
+# Number of resamples of the bootstrap confidence interval
+BOOTSTRAP_RESAMPLES = 1000
+
+# Maximum number of values drawn at once when bootstrapping
+_BOOTSTRAP_BATCH_SIZE = 10_000_000
+
+
+def statistic_column(statistic: str) -> str:
+    """
+    Returns the name of the column holding a statistic requested from
+    :func:`aggregate_data`.
+
+    Args:
+        statistic: ``"median"``, ``"trimmed_mean"`` or a percentile like ``"p90"``.
+
+    Raises:
+        ValueError: If the statistic is not supported.
+    """
+    if statistic == "median":
+        return "MedianValue"
+    if statistic == "trimmed_mean":
+        return "TrimmedMeanValue"
+    if re.fullmatch(r"p(100|[1-9]?[0-9])(\.[0-9]+)?", statistic):
+        return f"P{statistic[1:]}Value"
+    raise ValueError(
+        f"Unsupported statistic '{statistic}'. "
+        "Use 'median', 'trimmed_mean' or a percentile like 'p90'"
+    )
+
+
+def _sort_by_group(
+    codes: np.ndarray, values: np.ndarray, num_groups: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sorts the non-missing values by group and value.
+
+    Returns:
+        The sorted values, the offset of the first value of every group and the
+        number of values of every group.
+    """
+    import numpy as np
+
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    counts = np.bincount(codes, minlength=num_groups)
+    starts = np.cumsum(counts) - counts
+    return values[order], starts, counts
+
+
+def _group_quantile(
+    sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float
+) -> np.ndarray:
+    """
+    Computes a quantile of every group of sorted values with linear interpolation,
+    like ``numpy.quantile``. Empty groups are NaN.
+    """
+    import numpy as np
+
+    if len(sorted_values) == 0:
+        return np.full(len(counts), np.nan)
+
+    position = np.maximum(counts - 1, 0) * q
+    lower = np.floor(position).astype(int)
+    upper = np.ceil(position).astype(int)
+    last = len(sorted_values) - 1
+    lower_values = sorted_values[np.minimum(starts + lower, last)]
+    upper_values = sorted_values[np.minimum(starts + upper, last)]
+    result = lower_values + (upper_values - lower_values) * (position - lower)
+    return np.where(counts > 0, result, np.nan)
+
+
+def _group_trimmed_mean(
+    sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray
+) -> np.ndarray:
+    """
+    Computes the mean of every group of sorted values after cutting
+    ``TRIM_PROPORTION`` of the values from each end, like
+    ``scipy.stats.trim_mean``.
+    """
+    import numpy as np
+
+    cut = np.floor(counts * TRIM_PROPORTION).astype(int)
+    kept = counts - 2 * cut
+    cumulative = np.concatenate([[0.0], np.cumsum(sorted_values)])
+    total = cumulative[starts + counts - cut] - cumulative[starts + cut]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(kept > 0, total / kept, np.nan)
+
+
+def _outliers(
+    codes: np.ndarray, values: np.ndarray, num_groups: int, method: str
+) -> np.ndarray:
+    """
+    Flags the outliers of every group of values.
+
+    Args:
+        codes: The group of every value.
+        values: The values.
+        num_groups: The number of groups.
+        method: ``"mad"`` to flag values whose modified z-score, based on the median
+            absolute deviation, exceeds ``MAD_THRESHOLD``, or ``"iqr"`` to flag
+            values more than ``IQR_FACTOR`` interquartile ranges outside the
+            quartiles.
+
+    Returns:
+        A boolean mask of the outliers. Missing values are never outliers.
+    """
+    import numpy as np
+
+    sorted_values, starts, counts = _sort_by_group(codes, values, num_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "mad":
+            median = _group_quantile(sorted_values, starts, counts, 0.5)[codes]
+            deviation = np.abs(values - median)
+            sorted_deviations, starts, counts = _sort_by_group(
+                codes, deviation, num_groups
+            )
+            mad = _group_quantile(sorted_deviations, starts, counts, 0.5)[codes]
+            # 0.6745 is the 75th percentile of the standard normal distribution
+            score = 0.6745 * deviation / mad
+            return np.asarray((mad > 0) & (score > MAD_THRESHOLD))
+
+        lower = _group_quantile(sorted_values, starts, counts, 0.25)[codes]
+        upper = _group_quantile(sorted_values, starts, counts, 0.75)[codes]
+        spread = IQR_FACTOR * (upper - lower)
+        return np.asarray((values < lower - spread) | (values > upper + spread))
+
+
+def _bootstrap_ci(
+    sorted_values: np.ndarray,
+    starts: np.ndarray,
+    counts: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes a percentile bootstrap 95% confidence interval of the mean of every
+    group of values. All groups are resampled at once, in batches of resamples.
+    """
+    import numpy as np
+
+    num_groups = len(counts)
+    num_values = len(sorted_values)
+    means = np.full((BOOTSTRAP_RESAMPLES, num_groups), np.nan)
+    nonempty = counts > 0
+    if num_values == 0:
+        return means[0], means[0]
+
+    # Draw every value of a resample from the values of the same group
+    value_starts = np.repeat(starts, counts)
+    value_counts = np.repeat(counts, counts)
+
+    rng = np.random.default_rng(0)
+    batch_size = max(1, _BOOTSTRAP_BATCH_SIZE // num_values)
+    for first in range(0, BOOTSTRAP_RESAMPLES, batch_size):
+        size = min(batch_size, BOOTSTRAP_RESAMPLES - first)
+        draws = rng.random((size, num_values)) * value_counts
+        resamples = sorted_values[value_starts + draws.astype(int)]
+        sums = np.add.reduceat(resamples, starts[nonempty], axis=1)
+        means[first : first + size, nonempty] = sums / counts[nonempty]
+
+    lower, upper = np.quantile(means, [0.025, 0.975], axis=0)
+    return lower, upper
+
+
+def _is_sortable(column: pd.Series) -> bool:
+    """
+    Checks whether the values of a column can be sorted, i.e. compared with each
+    other, ignoring missing values.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not pd.api.types.is_object_dtype(column.dtype):
+        return True
+
+    values = column.dropna()
+    types = set(map(type, values))
+    if len(types) <= 1 and types <= {str, bytes}:
+        return True
+    if all(issubclass(t, (numbers.Real, np.bool_)) for t in types):
+        return True
+
+    # Mixed or compound values, such as tuples, are only sortable if all their
+    # elements can be compared
+    try:
+        sorted(values)
+    except TypeError:
+        return False
+    return True
+
+
+def _merge_previous(
+    previous: pd.DataFrame,
+    current: pd.DataFrame,
+    group_fields: list[str],
+    statistics: Sequence[str],
+    mean_fields: list[str],
+) -> pd.DataFrame:
+    """
+    Merges the aggregated data of new runs into the aggregated data of earlier
+    runs, see the ``previous`` argument of :func:`aggregate_data`.
+    """
+    import pandas as pd
+
+    from nsight import aggregates
+
+    combined = pd.concat(
+        [previous.reindex(columns=current.columns), current], ignore_index=True
+    )
+    mean_fields = [col for col in mean_fields if col in current.columns]
+    weights = {}
+    for col in mean_fields:
+        combined[col] = pd.to_numeric(combined[col], errors="coerce")
+        weights[col] = combined["NumRuns"].where(combined[col].notna(), 0)
+        combined[col] *= combined["NumRuns"]
+    grouped = combined.groupby(group_fields, sort=False, dropna=False)
+
+    def merge_states(states: pd.Series) -> aggregates.AggregateState:
+        return functools.reduce(
+            aggregates.AggregateState.merge, states, aggregates.AggregateState()
+        )
+
+    named_aggs: dict[str, Any] = {
+        col: (col, "last") for col in current.columns if col not in group_fields
+    }
+    named_aggs[aggregates.STATE_COLUMN] = (aggregates.STATE_COLUMN, merge_states)
+    if "OutliersRemoved" in current.columns:
+        named_aggs["OutliersRemoved"] = ("OutliersRemoved", "sum")
+    for col in mean_fields:
+        named_aggs[col] = (col, "sum")
+    merged = grouped.agg(**named_aggs).reset_index()[current.columns]
+
+    # Additional metrics are averaged weighted by the number of runs
+    states = merged[aggregates.STATE_COLUMN]
+    merged["NumRuns"] = [state.count for state in states]
+    for col in mean_fields:
+        total_weight = (
+            weights[col]
+            .groupby(
+                [combined[field] for field in group_fields], sort=False, dropna=False
+            )
+            .sum()
+        )
+        merged[col] /= total_weight.to_numpy()
+
+    # Recompute the statistics of the metric values from the merged states
+    merged["AvgValue"] = [state.mean for state in states]
+    merged["StdDev"] = [state.std for state in states]
+    merged["MinValue"] = [state.min for state in states]
+    merged["MaxValue"] = [state.max for state in states]
+    for statistic in statistics:
+        if statistic == "trimmed_mean":
+            result = [state.trimmed_mean(TRIM_PROPORTION) for state in states]
+        else:
+            q = 0.5 if statistic == "median" else float(statistic[1:]) / 100
+            result = [state.quantile(q) for state in states]
+        merged[statistic_column(statistic)] = result
+    return merged
 
 
 def aggregate_data(
@@ -21,6 +405,11 @@ def aggregate_data(
     func: Callable[..., Any],
     normalize_against: str | None,
     output_progress: bool,
+    statistics: Sequence[str] = (),
+    outlier_rejection: Literal["mad", "iqr"] | None = None,
+    ci_method: Literal["normal", "t", "bootstrap"] = "normal",
+    keep_state: bool = False,
+    previous: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     """
     Groups and aggregates profiling data by configuration and annotation.
@@ -30,13 +419,57 @@ def aggregate_data(
         func: Function representing kernel configuration parameters.
         normalize_against: Name of the annotation to normalize against.
         output_progress: Toggles the display of data processing logs
+        statistics: Additional statistics of the metric values of every group.
+            ``"median"`` adds ``MedianValue``, ``"trimmed_mean"`` adds
+            ``TrimmedMeanValue`` (the mean without the lowest and highest
+            ``TRIM_PROPORTION`` of the values), and percentiles like ``"p90"`` or
+            ``"p99"`` add ``P90Value`` or ``P99Value``.
+        outlier_rejection: Excludes outliers from all statistics, including
+            ``AvgValue``. ``"mad"`` rejects values whose modified z-score, based on
+            the median absolute deviation, exceeds ``MAD_THRESHOLD``. ``"iqr"``
+            rejects values more than ``IQR_FACTOR`` interquartile ranges outside the
+            quartiles. The number of rejected values is reported in
+            ``OutliersRemoved``.
+        ci_method: How the 95% confidence interval of the mean is computed.
+            ``"normal"`` uses the normal approximation, ``"t"`` uses the
+            t-distribution, which is accurate for few runs and requires scipy, and
+            ``"bootstrap"`` uses a percentile bootstrap with ``BOOTSTRAP_RESAMPLES``
+            resamples, which makes no assumption on the distribution.
+        keep_state: If True, add an ``AggregateState`` column holding a mergeable
+            :class:`nsight.aggregates.AggregateState` of the metric values of every
+            group, so that the result can be passed as ``previous`` later.
+        previous: Aggregated data of earlier runs, returned by this function with
+            ``keep_state=True``. The runs of ``df`` are merged into it, without the
+            raw data of the earlier runs: the statistics of the metric values are
+            recomputed from the merged states, the counts of outliers are summed,
+            additional metrics are averaged weighted by the number of runs, and the
+            other columns are taken from ``df`` when it has the configuration.
+            Cannot be combined with ``ci_method="bootstrap"``.
 
     Returns:
         Aggregated DataFrame and the (possibly normalized) metric name.
     """
+    import numpy as np
+    import pandas as pd
+
+    from nsight import aggregates
+
     if output_progress:
         print("[NSIGHT-PYTHON] Processing profiled data")
 
+    if previous is not None and ci_method == "bootstrap":
+        raise ValueError("Bootstrap confidence intervals require all raw values")
+    if previous is not None and aggregates.STATE_COLUMN not in previous.columns:
+        raise ValueError(
+            f"previous must have an '{aggregates.STATE_COLUMN}' column, "
+            "aggregate it with keep_state=True"
+        )
+    keep_state = keep_state or previous is not None
+
+    # Per-run columns besides "Value" which are aggregated rather than expected
+    # to be invariant within a group, e.g. additional metrics
+    aggregations = df.attrs.get(utils.AGGREGATIONS_ATTR, {})
+
     # Get the number of arguments in the signature of func
     num_args = len(inspect.signature(func).parameters)
 
@@ -44,19 +477,10 @@ def aggregate_data(
     # Note: When num_args=0, we need an empty list (not all columns via [-0:])
     func_fields = df.columns[-num_args:].tolist() if num_args > 0 else []
 
-    # Function to convert non-sortable columns to strings
-    def convert_non_sortable_columns(dframe: pd.DataFrame) -> pd.DataFrame:
-        for col in dframe.columns:
-            # Try sorting the column to check if it's sortable
-            try:
-                sorted(dframe[col].dropna())
-            except TypeError:
-                # If sorting fails, convert the column to string
-                dframe[col] = dframe[col].astype(str)
-        return dframe
-
-    # Convert non-sortable columns before grouping
-    df = convert_non_sortable_columns(df)
+    # Convert non-sortable columns to strings before grouping
+    for col in df.columns:
+        if not _is_sortable(df[col]):
+            df[col] = df[col].astype(str)
 
     # Preserve original order by adding an index column
     df = df.reset_index(drop=True)
@@ -75,42 +499,114 @@ def aggregate_data(
         ),  # Use min to preserve first occurrence
     }
 
-    # Add assertion-based unique selection for remaining fields
+    # Remaining fields are either aggregated or expected to be invariant per group
     remaining_fields = [
         col
         for col in df.columns
         if col not in ["Value", "Annotation", "_original_order"] + func_fields
     ]
+    invariant_fields = [
+        col for col in remaining_fields if col not in aggregations and col != "Kernel"
+    ]
 
     for col in remaining_fields:
-        if col == "Kernel":
-            named_aggs[col] = (col, "first")
-        else:
-            named_aggs[col] = (  # type: ignore[assignment]
-                col,
-                (
-                    lambda colname: lambda x: (
-                        x.unique()[0]
-                        if len(x.unique()) == 1
-                        else (_ for _ in ()).throw(
-                            AssertionError(
-                                f"Column '{colname}' has multiple values in group: {x.unique()}"
-                            )
-                        )
-                    )
-                )(col),
+        # Invariant fields have a single value, possibly NaN, so "first" picks it
+        named_aggs[col] = (col, aggregations.get(col, "first"))
+
+    # Group by categorical keys, which are cheaper to hash than object columns
+    group_fields = ["Annotation"] + func_fields
+    key_dtypes = df[group_fields].dtypes
+    df[group_fields] = df[group_fields].astype("category")
+    grouped = df.groupby(group_fields, observed=True)
+
+    # The order-based statistics share one sort of the values by group
+    robust_stats: dict[str, np.ndarray] = {}
+    if (
+        statistics
+        or outlier_rejection is not None
+        or ci_method != "normal"
+        or keep_state
+    ):
+        codes = grouped.ngroup().to_numpy()
+        num_groups = grouped.ngroups
+        values = pd.to_numeric(df["Value"], errors="coerce").to_numpy(dtype=float)
+
+        if outlier_rejection is not None:
+            outliers = _outliers(codes, values, num_groups, outlier_rejection)
+            values = np.where(outliers, np.nan, values)
+            df["Value"] = values
+            grouped = df.groupby(group_fields, observed=True)
+
+        sorted_values, starts, counts = _sort_by_group(codes, values, num_groups)
+        for statistic in statistics:
+            if statistic == "trimmed_mean":
+                result = _group_trimmed_mean(sorted_values, starts, counts)
+            else:
+                q = 0.5 if statistic == "median" else float(statistic[1:]) / 100
+                result = _group_quantile(sorted_values, starts, counts, q)
+            robust_stats[statistic_column(statistic)] = result
+        if outlier_rejection is not None:
+            robust_stats["OutliersRemoved"] = np.bincount(
+                codes[outliers], minlength=num_groups
+            )
+        if ci_method == "bootstrap":
+            bootstrap_ci = _bootstrap_ci(sorted_values, starts, counts)
+        if keep_state:
+            states = np.empty(num_groups, dtype=object)
+            states[:] = [
+                aggregates.AggregateState.from_values(
+                    sorted_values[start : start + count]
+                )
+                for start, count in zip(starts, counts)
+            ]
+            robust_stats[aggregates.STATE_COLUMN] = states
+
+    # Check the invariant fields in a single pass
+    if invariant_fields:
+        num_unique = grouped[invariant_fields].nunique(dropna=False)
+        varying = (num_unique > 1).any()
+        if varying.any():
+            col = varying.idxmax()
+            group = num_unique.index[num_unique[col].to_numpy() > 1][0]
+            values = grouped.get_group(group)[col].unique()
+            raise AssertionError(
+                f"Column '{col}' has multiple values in group: {values}"
             )
 
     # Apply aggregation with named aggregation
-    agg_df = df.groupby(["Annotation"] + func_fields).agg(**named_aggs).reset_index()
+    agg_df = grouped.agg(**named_aggs).reset_index()
+    agg_df[group_fields] = agg_df[group_fields].astype(key_dtypes)
 
-    # Compute 95% confidence intervals
-    agg_df["CI95_Lower"] = agg_df["AvgValue"] - 1.96 * (
-        agg_df["StdDev"] / np.sqrt(agg_df["NumRuns"])
-    )
-    agg_df["CI95_Upper"] = agg_df["AvgValue"] + 1.96 * (
-        agg_df["StdDev"] / np.sqrt(agg_df["NumRuns"])
-    )
+    # Insert the additional statistics after the number of runs
+    position = agg_df.columns.get_loc("NumRuns") + 1
+    for offset, (col, result) in enumerate(robust_stats.items()):
+        agg_df.insert(position + offset, col, result)
+    if ci_method == "bootstrap":
+        agg_df["CI95_Lower"], agg_df["CI95_Upper"] = bootstrap_ci
+
+    # Sort by original order to preserve user-provided configuration order
+    agg_df = agg_df.sort_values("_original_order").reset_index(drop=True)
+    agg_df = agg_df.drop("_original_order", axis=1)  # Remove the helper column
+
+    if previous is not None:
+        mean_fields = [col for col, agg in aggregations.items() if agg == "mean"]
+        agg_df = _merge_previous(
+            previous, agg_df, group_fields, statistics, mean_fields
+        )
+
+    # Compute 95% confidence intervals, unless they were bootstrapped by group
+    if ci_method != "bootstrap":
+        if ci_method == "t":
+            if not SCIPY_AVAILABLE:
+                raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+            import scipy.stats
+
+            critical_value = scipy.stats.t.ppf(0.975, agg_df["NumRuns"] - 1)
+        else:
+            critical_value = 1.96
+        margin = critical_value * (agg_df["StdDev"] / np.sqrt(agg_df["NumRuns"]))
+        agg_df["CI95_Lower"] = agg_df["AvgValue"] - margin
+        agg_df["CI95_Upper"] = agg_df["AvgValue"] + margin
 
     # Compute relative standard deviation as a percentage
     agg_df["RelativeStdDevPct"] = (agg_df["StdDev"] / agg_df["AvgValue"]) * 100
@@ -121,10 +617,6 @@ def aggregate_data(
     # Flatten the multi-index columns
     agg_df.columns = [col if isinstance(col, str) else col[0] for col in agg_df.columns]
 
-    # Sort by original order to preserve user-provided configuration order
-    agg_df = agg_df.sort_values("_original_order").reset_index(drop=True)
-    agg_df = agg_df.drop("_original_order", axis=1)  # Remove the helper column
-
     do_normalize = normalize_against is not None
     if do_normalize:
 
@@ -151,18 +643,528 @@ def aggregate_data(
             agg_df["Metric"].astype(str) + f" relative to {normalize_against}"
         )
 
-    # Calculate geometric mean for each annotation
-    geomean_values = {}
-    for annotation in agg_df["Annotation"].unique():
-        annotation_data = agg_df[agg_df["Annotation"] == annotation]
-        valid_values = annotation_data["AvgValue"].dropna()
-        if not valid_values.empty:
-            geomean = np.exp(np.mean(np.log(valid_values)))
-            geomean_values[annotation] = geomean
+    # Calculate the geometric mean of each annotation, ignoring missing values and
+    # the undefined logarithms of negative values. Every annotation is averaged by
+    # Series.mean, which sums in another order than a groupby mean.
+    log_values = np.log(agg_df["AvgValue"].dropna())
+    geomeans = log_values.groupby(agg_df["Annotation"], sort=False, observed=True).agg(
+        lambda values: np.exp(values.mean())
+    )
+    agg_df["Geomean"] = agg_df["Annotation"].map(geomeans).astype(float)
+
+    # Keep the states last, out of the way of the statistics
+    if keep_state:
+        agg_df[aggregates.STATE_COLUMN] = agg_df.pop(aggregates.STATE_COLUMN)
+
+    return agg_df
+
+
+# Derived metrics needed for the roofline analysis, see nsight.derived. FLOPs are
+# counted from single precision instructions, an FFMA counts as two operations.
+ROOFLINE_DERIVED = {
+    "FLOP": (
+        "2 * sm__sass_thread_inst_executed_op_ffma_pred_on.sum"
+        " + sm__sass_thread_inst_executed_op_fadd_pred_on.sum"
+        " + sm__sass_thread_inst_executed_op_fmul_pred_on.sum"
+    ),
+    "ArithmeticIntensity": "FLOP / dram__bytes.sum",
+    "AttainedFLOPs": "FLOP / (gpu__time_duration.sum * 1e-9)",
+    "PeakFLOPs": (
+        "2 * sm__sass_thread_inst_executed_op_ffma_pred_on.sum.peak_sustained"
+        " * sm__cycles_elapsed.avg.per_second"
+    ),
+    "PeakBandwidth": (
+        "dram__bytes.sum.peak_sustained * dram__cycles_elapsed.avg.per_second"
+    ),
+}
+
+
+def roofline(agg_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classifies every configuration of aggregated profiling data as memory or
+    compute bound according to the roofline model.
+
+    Args:
+        agg_df: Aggregated profiling data with the columns of
+            :data:`ROOFLINE_DERIVED`, as returned by :func:`aggregate_data` when
+            profiling with ``roofline=True``.
+
+    Returns:
+        The DataFrame with the following columns added:
+
+            - ``RidgePoint``: Arithmetic intensity in FLOP/byte at which the memory and compute ceilings meet
+            - ``Bound``: ``"Memory"`` if the arithmetic intensity is below the ridge point, ``"Compute"`` otherwise
+            - ``RooflineFLOPs``: Attainable FLOP/s at the arithmetic intensity of the configuration
+            - ``RooflineEfficiencyPct``: Attained FLOP/s as a percentage of ``RooflineFLOPs``
+    """
+    import numpy as np
+    import pandas as pd
+
+    missing = [col for col in ROOFLINE_DERIVED if col not in agg_df.columns]
+    if missing:
+        raise exceptions.ProfilerException(
+            f"Roofline analysis requires the columns {missing}. "
+            "Profile with roofline=True to collect them."
+        )
+
+    agg_df = agg_df.copy()
+    intensity = agg_df["ArithmeticIntensity"]
+
+    agg_df["RidgePoint"] = agg_df["PeakFLOPs"] / agg_df["PeakBandwidth"]
+    agg_df["Bound"] = pd.Series(
+        np.where(intensity < agg_df["RidgePoint"], "Memory", "Compute"),
+        index=agg_df.index,
+    ).where(intensity.notna())
+    agg_df["RooflineFLOPs"] = np.minimum(
+        agg_df["PeakFLOPs"], intensity * agg_df["PeakBandwidth"]
+    )
+    agg_df["RooflineEfficiencyPct"] = (
+        agg_df["AttainedFLOPs"] / agg_df["RooflineFLOPs"] * 100
+    )
+    return agg_df
+
+
+# Throughput metrics, in percent of the peak, from which normalize_clocks estimates
+# how much of the time of a kernel is bound by the compute and the memory clock
+CLOCK_THROUGHPUT_METRICS = {
+    "compute": "sm__throughput.avg.pct_of_peak_sustained_elapsed",
+    "memory": "gpu__compute_memory_throughput.avg.pct_of_peak_sustained_elapsed",
+}
+
+
+def _is_time_metric(metric: str) -> bool:
+    """Returns whether a NVIDIA Nsight Compute metric measures a duration."""
+    return "time_duration" in metric or metric.startswith("gpu__time")
+
+
+def normalize_clocks(
+    raw_df: pd.DataFrame,
+    func: Callable[..., Any],
+    reference_compute_clock: float,
+    reference_memory_clock: float,
+    default_compute_fraction: float = 1.0,
+) -> pd.DataFrame:
+    """
+    Rescales time metrics measured at different clocks to reference clocks, so that
+    the results of GPUs running at different clocks can be compared and pooled.
+
+    The time of a kernel is split into a part bound by the compute clock and a part
+    bound by the memory clock, in proportion to the compute and memory throughputs of
+    :data:`CLOCK_THROUGHPUT_METRICS`. Each part is scaled by the ratio of the
+    measured to the reference clock::
+
+        scale = a * ComputeClock / reference_compute_clock
+              + (1 - a) * MemoryClock / reference_memory_clock
+
+    with ``a = compute / (compute + memory)``. Only untransformed time metrics in
+    ``Value`` are rescaled, other rows keep their value and a scale of 1.
+
+    Args:
+        raw_df: Raw profiling data with the ``ComputeClock`` and ``MemoryClock``
+            columns.
+        func: Function representing kernel configuration parameters.
+        reference_compute_clock: Compute clock to normalize to, in the unit of the
+            ``ComputeClock`` column (kHz).
+        reference_memory_clock: Memory clock to normalize to, in the unit of the
+            ``MemoryClock`` column (kHz).
+        default_compute_fraction: Compute bound fraction ``a`` of runs without
+            throughput metrics. Default: ``1.0``, i.e. time scales with the
+            compute clock only.
+
+    Returns:
+        ``raw_df`` with ``Value`` rescaled, and the ``OriginalValue`` and
+        ``ClockScale`` columns added before the parameter columns. Both are averaged
+        across runs when aggregating.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if reference_compute_clock <= 0 or reference_memory_clock <= 0:
+        raise ValueError("Reference clocks must be positive")
+    if not 0 <= default_compute_fraction <= 1:
+        raise ValueError("default_compute_fraction must be between 0 and 1")
+
+    def column(name: str) -> pd.Series:
+        if name not in raw_df.columns:
+            return pd.Series(np.nan, index=raw_df.index)
+        return pd.to_numeric(raw_df[name], errors="coerce")
+
+    compute = column(CLOCK_THROUGHPUT_METRICS["compute"])
+    memory = column(CLOCK_THROUGHPUT_METRICS["memory"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        compute_fraction = (compute / (compute + memory)).fillna(
+            default_compute_fraction
+        )
+    scale = (
+        compute_fraction * column("ComputeClock") / reference_compute_clock
+        + (1 - compute_fraction) * column("MemoryClock") / reference_memory_clock
+    )
+
+    is_time = raw_df["Metric"].astype(str).map(_is_time_metric)
+    if "Transformed" in raw_df.columns:
+        is_time &= raw_df["Transformed"].eq(False)
+    scale = scale.where(is_time & scale.notna(), 1.0)
+
+    # Insert the audit columns before the parameter columns at the end
+    value = pd.to_numeric(raw_df["Value"], errors="coerce")
+    raw_df = utils.insert_run_columns(
+        raw_df,
+        {"OriginalValue": value, "ClockScale": scale},
+        {"OriginalValue": "mean", "ClockScale": "mean"},
+        len(inspect.signature(func).parameters),
+    )
+    raw_df["Value"] = value * scale
+    return raw_df
+
+
+# Significance level of compare_annotations and of sequential A/B profiling
+SIGNIFICANCE_LEVEL = 0.05
+
+
+def _adjust_p_values(p_values: np.ndarray, correction: str) -> np.ndarray:
+    """
+    Adjusts p-values for multiple comparisons. Missing p-values are ignored.
+
+    Args:
+        p_values: The p-values.
+        correction: ``"holm"``, ``"bonferroni"``, ``"fdr_bh"`` (Benjamini-Hochberg)
+            or ``"none"``.
+    """
+    import numpy as np
+
+    adjusted = np.full(len(p_values), np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if m == 0 or correction == "none":
+        adjusted[valid] = p
+        return adjusted
+
+    if correction == "bonferroni":
+        adjusted[valid] = np.minimum(p * m, 1)
+        return adjusted
+
+    order = np.argsort(p)
+    ranked = p[order]
+    if correction == "holm":
+        steps = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif correction == "fdr_bh":
+        steps = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(
+            f"Unsupported correction '{correction}'. "
+            "Use 'holm', 'bonferroni', 'fdr_bh' or 'none'"
+        )
+    result = np.empty(m)
+    result[order] = np.minimum(steps, 1)
+    adjusted[valid] = result
+    return adjusted
+
+
+def welch_p_values(
+    mean_a: npt.ArrayLike,
+    var_a: npt.ArrayLike,
+    count_a: npt.ArrayLike,
+    mean_b: npt.ArrayLike,
+    var_b: npt.ArrayLike,
+    count_b: npt.ArrayLike,
+) -> np.ndarray:
+    """
+    Computes the two-sided p-values of Welch's t-test from the summary statistics
+    of pairs of samples, for many pairs at once.
+
+    Args:
+        mean_a: Means of the first samples.
+        var_a: Sample variances of the first samples.
+        count_a: Sizes of the first samples.
+        mean_b: Means of the second samples.
+        var_b: Sample variances of the second samples.
+        count_b: Sizes of the second samples.
+
+    Returns:
+        The p-values, which are NaN for samples of less than two values.
+
+    Raises:
+        ImportError: If scipy is not installed.
+    """
+    import numpy as np
+
+    if not SCIPY_AVAILABLE:
+        raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+    import scipy.stats
+
+    error_a = np.asarray(var_a, dtype=float) / np.asarray(count_a, dtype=float)
+    error_b = np.asarray(var_b, dtype=float) / np.asarray(count_b, dtype=float)
+    error = error_a + error_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (np.asarray(mean_a, dtype=float) - np.asarray(mean_b, dtype=float)) / (
+            np.sqrt(error)
+        )
+        dof = error**2 / (
+            error_a**2 / (np.asarray(count_a, dtype=float) - 1)
+            + error_b**2 / (np.asarray(count_b, dtype=float) - 1)
+        )
+        return np.asarray(2 * scipy.stats.t.sf(np.abs(t), dof), dtype=float)
+
+
+def compare_annotations(
+    raw_df: pd.DataFrame,
+    agg_df: pd.DataFrame,
+    func: Callable[..., Any],
+    baseline: str,
+    test: Literal["welch", "mannwhitney"] = "welch",
+    correction: Literal["holm", "bonferroni", "fdr_bh", "none"] = "holm",
+) -> pd.DataFrame:
+    """
+    Tests for every configuration whether the metric of each annotation differs
+    significantly from the metric of a baseline annotation.
+
+    All configurations and annotations are compared at once from the per-run
+    metric values.
+
+    Args:
+        raw_df: The raw profiling results.
+        agg_df: The aggregated profiling results of ``raw_df``, as returned by
+            :func:`aggregate_data`.
+        func: Function representing kernel configuration parameters.
+        baseline: Name of the annotation to compare against.
+        test: ``"welch"`` for Welch's t-test, which compares the means, or
+            ``"mannwhitney"`` for the Mann-Whitney U test, which makes no assumption
+            on the distribution of the metric. The U test uses the normal
+            approximation with tie correction.
+        correction: Correction of the p-values for testing many configurations and
+            annotations: ``"holm"`` (Holm-Bonferroni), ``"bonferroni"``,
+            ``"fdr_bh"`` (Benjamini-Hochberg false discovery rate) or ``"none"``.
+
+    Returns:
+        ``agg_df`` with the following columns added, which are NaN for the rows of
+        the baseline annotation:
+
+            - ``Speedup``: Mean metric of the baseline divided by the mean metric of the annotation, i.e. larger is faster for timings
+            - ``SpeedupCI95_Lower``, ``SpeedupCI95_Upper``: 95% confidence interval of the speedup, propagated from the variances of both means with the delta method
+            - ``PValue``: p-value of the test
+            - ``PValueAdjusted``: p-value adjusted with ``correction``
+            - ``Significant``: Whether ``PValueAdjusted`` is below ``SIGNIFICANCE_LEVEL``
+
+    Raises:
+        ImportError: If scipy is not installed.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not SCIPY_AVAILABLE:
+        raise ImportError(exceptions.SCIPY_UNAVAILABLE_MSG)
+    if test not in ("welch", "mannwhitney"):
+        raise ValueError("test must be 'welch' or 'mannwhitney'")
+    if baseline not in raw_df["Annotation"].values:
+        raise ValueError(f"Annotation '{baseline}' not found in data.")
+
+    num_args = len(inspect.signature(func).parameters)
+    func_fields = raw_df.columns[-num_args:].tolist() if num_args > 0 else []
+
+    # Without parameters, all runs of an annotation share one configuration
+    df = raw_df[["Annotation"] + func_fields].copy()
+    if not func_fields:
+        df["_config"] = 0
+        func_fields = ["_config"]
+    keys = ["Annotation"] + func_fields
+    for col in func_fields:
+        if not _is_sortable(df[col]):
+            df[col] = df[col].astype(str)
+    df["Value"] = pd.to_numeric(raw_df["Value"], errors="coerce")
+    df = df.dropna(subset=["Value"])
+
+    # Statistics of every annotation next to those of the baseline
+    stats = df.groupby(keys, sort=False)["Value"].agg(["mean", "var", "count"])
+    stats = stats.reset_index()
+    is_baseline = stats["Annotation"] == baseline
+    comparison = stats[~is_baseline].merge(
+        stats[is_baseline].drop(columns="Annotation"),
+        on=func_fields,
+        how="left",
+        suffixes=("", "_baseline"),
+    )
+
+    mean, var, n = comparison["mean"], comparison["var"], comparison["count"]
+    mean_b = comparison["mean_baseline"]
+    var_b, n_b = comparison["var_baseline"], comparison["count_baseline"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speedup = mean_b / mean
+        relative_error = np.sqrt(var_b / (n_b * mean_b**2) + var / (n * mean**2))
+        comparison["Speedup"] = speedup
+        comparison["SpeedupCI95_Lower"] = speedup * (1 - 1.96 * relative_error)
+        comparison["SpeedupCI95_Upper"] = speedup * (1 + 1.96 * relative_error)
+
+        if test == "welch":
+            p_values = welch_p_values(mean, var, n, mean_b, var_b, n_b)
         else:
-            geomean_values[annotation] = np.nan
+            p_values = _mann_whitney(df, baseline, func_fields, comparison)
+    comparison["PValue"] = np.asarray(p_values, dtype=float)
+
+    comparison["PValueAdjusted"] = _adjust_p_values(
+        comparison["PValue"].to_numpy(), correction
+    )
+    comparison["Significant"] = comparison["PValueAdjusted"] < SIGNIFICANCE_LEVEL
+
+    columns = [
+        "Speedup",
+        "SpeedupCI95_Lower",
+        "SpeedupCI95_Upper",
+        "PValue",
+        "PValueAdjusted",
+        "Significant",
+    ]
+    agg_df = agg_df.drop(columns=[c for c in columns if c in agg_df.columns])
+    agg_df = agg_df.reset_index(drop=True)
+
+    # Match the rows of both frames by annotation and configuration
+    agg_keys = agg_df.reindex(columns=keys, fill_value=0).astype(str)
+    index = pd.MultiIndex.from_frame(comparison[keys].astype(str)).get_indexer(
+        pd.MultiIndex.from_frame(agg_keys)
+    )
+    for col in columns:
+        values = comparison[col].to_numpy()
+        agg_df[col] = np.where(
+            index >= 0, values[index], False if col == "Significant" else np.nan
+        )
+    return agg_df
+
+
+def _mann_whitney(
+    df: pd.DataFrame,
+    baseline: str,
+    func_fields: list[str],
+    comparison: pd.DataFrame,
+) -> np.ndarray:
+    """
+    Computes the p-values of Mann-Whitney U tests of every annotation of
+    ``comparison`` against the baseline, using the normal approximation with tie
+    and continuity correction.
+    """
+    import numpy as np
+    import pandas as pd
+    import scipy.stats
+
+    # Pair the values of every annotation with the baseline values of the config
+    is_baseline = df["Annotation"] == baseline
+    others = df[~is_baseline].assign(Pair=df["Annotation"], InSample=True)
+    pairs = others[["Pair"] + func_fields].drop_duplicates()
+    baselines = df[is_baseline].merge(pairs, on=func_fields, how="inner")
+    combined = pd.concat([others, baselines.assign(InSample=False)])
+    group_keys = ["Pair"] + func_fields
+
+    grouped = combined.groupby(group_keys, sort=False)
+    combined["Rank"] = grouped["Value"].rank(method="average")
+    sizes = grouped.size()
+    rank_sums = (
+        combined[combined["InSample"]].groupby(group_keys, sort=False)["Rank"].sum()
+    )
+    ties = combined.groupby(group_keys + ["Value"], sort=False).size()
+    tie_sums = (ties**3 - ties).groupby(level=list(range(len(group_keys)))).sum()
+
+    index = pd.MultiIndex.from_frame(
+        comparison[["Annotation"] + func_fields].rename(columns={"Annotation": "Pair"})
+    )
+    n = comparison["count"].to_numpy(dtype=float)
+    total = sizes.reindex(index).to_numpy(dtype=float)
+    n_b = total - n
+
+    u = rank_sums.reindex(index).to_numpy(dtype=float) - n * (n + 1) / 2
+    mu = n * n_b / 2
+    tie_term = tie_sums.reindex(index).to_numpy(dtype=float) / (total * (total - 1))
+    sigma = np.sqrt(n * n_b / 12 * ((total + 1) - tie_term))
+    z = (np.abs(u - mu) - 0.5) / sigma
+    return np.asarray(np.minimum(2 * scipy.stats.norm.sf(z), 1))
+
+
+def sequential_p_values(
+    mean_a: npt.ArrayLike,
+    var_a: npt.ArrayLike,
+    count_a: npt.ArrayLike,
+    mean_b: npt.ArrayLike,
+    var_b: npt.ArrayLike,
+    count_b: npt.ArrayLike,
+    mixture_variance: npt.ArrayLike,
+) -> np.ndarray:
+    """
+    Computes always-valid p-values for the difference of the means of two samples,
+    for many pairs of samples at once.
+
+    Unlike the p-value of a t-test, an always-valid p-value may be checked after
+    every batch of runs, and profiling stopped as soon as it is below the
+    significance level, without inflating the rate of false positives. The p-values
+    are those of the mixture sequential probability ratio test (mSPRT) with a normal
+    mixture of variance ``mixture_variance``. The guarantee only holds if the
+    mixture variance is the same at every check, so it has to be fixed before the
+    sequential checks start, for example from the variance of the difference of a
+    single pair of runs in the first batch. The running minimum over all checks is
+    a valid p-value as well.
 
-    # Add geomean values to the DataFrame
-    agg_df["Geomean"] = agg_df["Annotation"].map(geomean_values)
+    Args:
+        mean_a: Means of the first samples.
+        var_a: Sample variances of the first samples.
+        count_a: Sizes of the first samples.
+        mean_b: Means of the second samples.
+        var_b: Sample variances of the second samples.
+        count_b: Sizes of the second samples.
+        mixture_variance: Variance of the normal mixture over the difference of
+            the means, fixed for all checks.
+
+    Returns:
+        The p-values, which are 1 for samples of less than two values or an unknown
+        mixture variance.
+    """
+    import numpy as np
+
+    difference = np.asarray(mean_b, dtype=float) - np.asarray(mean_a, dtype=float)
+    error = np.asarray(var_a, dtype=float) / np.asarray(count_a, dtype=float)
+    error += np.asarray(var_b, dtype=float) / np.asarray(count_b, dtype=float)
+    mixture = np.asarray(mixture_variance, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        log_ratio = 0.5 * np.log(
+            error / (error + mixture)
+        ) + mixture * difference**2 / (2 * error * (error + mixture))
+        p_values = np.minimum(np.exp(-log_ratio), 1)
+    # Runs without any variance are decided by whether they differ at all
+    p_values = np.where(error == 0, np.where(difference != 0, 0.0, 1.0), p_values)
+    return np.asarray(np.where(np.isnan(p_values), 1.0, p_values))
+
+
+def flag_noise_floor(
+    agg_df: pd.DataFrame, sigmas: float = 3.0, subtracted: bool = False
+) -> pd.DataFrame:
+    """
+    Flags the configurations whose average metric is indistinguishable from the
+    noise floor of the measurement, see :mod:`nsight.collection.calibration`.
+    Normalized results are compared in the unit of the metric, by undoing the
+    normalization with ``NormalizationValue``.
+
+    Args:
+        agg_df: Aggregated profiling results with the ``NoiseFloor`` and
+            ``NoiseFloorStdDev`` columns.
+        sigmas: A configuration is flagged if its average is within this many
+            standard deviations of the noise floor.
+        subtracted: Whether the noise floor was subtracted from the metric values.
+
+    Returns:
+        ``agg_df`` with a ``NearNoiseFloor`` column added, which is False where the
+        noise floor is unknown.
+
+    Raises:
+        exceptions.ProfilerException: If the noise floor columns are missing.
+    """
+    if "NoiseFloor" not in agg_df.columns or "NoiseFloorStdDev" not in agg_df.columns:
+        raise exceptions.ProfilerException(
+            "Flagging results near the noise floor requires the NoiseFloor and "
+            "NoiseFloorStdDev columns."
+        )
 
+    agg_df = agg_df.copy()
+    average = agg_df["AvgValue"]
+    if "NormalizationValue" in agg_df.columns:
+        average = agg_df["NormalizationValue"] / average
+    excess = average - (0 if subtracted else agg_df["NoiseFloor"])
+    agg_df["NearNoiseFloor"] = excess <= sigmas * agg_df["NoiseFloorStdDev"]
     return agg_df
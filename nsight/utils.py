@@ -1,37 +1,37 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+from __future__ import annotations
+
 import functools
+import importlib.util
+import math
+import numbers
 import re
 import subprocess
 import sys
-from dataclasses import dataclass
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
 from itertools import islice
-from typing import Any, Iterator
+from typing import TYPE_CHECKING, Any, Iterator
 
 from nsight.exceptions import CUDA_CORE_UNAVAILABLE_MSG, NCUErrorContext
 
-# Try to import cuda-core (optional dependency)
-try:
-    from cuda.core.experimental import (
-        Device,
-        LaunchConfig,
-        Program,
-        ProgramOptions,
-        launch,
-    )
+if TYPE_CHECKING:
+    import pandas as pd
 
-    CUDA_CORE_AVAILABLE = True
+# Check for cuda-core (optional dependency), which is imported when it is used
+try:
+    CUDA_CORE_AVAILABLE = importlib.util.find_spec("cuda.core") is not None
 except ImportError:
     CUDA_CORE_AVAILABLE = False
-    Device = None
-    LaunchConfig = None
-    Program = None
-    ProgramOptions = None
-    launch = None
 
 NVTX_DOMAIN = "nsight-python"
 
+# Key under ``DataFrame.attrs`` mapping per-run columns to the aggregation
+# applied to them when the raw data is grouped by configuration.
+AGGREGATIONS_ATTR = "nspy_aggregations"
+
 
 class row_panel:
     pass
@@ -65,7 +65,7 @@ def purple(msg: str) -> str:  # pragma: no cover
 
 
 @functools.lru_cache
-def get_dummy_kernel_module() -> Any:
+def get_dummy_kernel_module(name: str = "dummy_kernel_failure") -> Any:
     """
     Returns a dummy kernel that does nothing.  In case a provider fails for some, reason, but we
     want to keep benchmarking we launch this dummy kernel such that during our later analysis of the
@@ -74,36 +74,63 @@ def get_dummy_kernel_module() -> Any:
     The measured runtime of this kernel is ignored and the final result of the failed run will be
     reported as NaN.
 
+    Args:
+        name: Name of the kernel. Kernels with other names than the default are
+            measured like any other kernel, e.g. to calibrate the noise floor.
+
     Raises:
         ImportError: If cuda-core is not installed.
     """
     if not CUDA_CORE_AVAILABLE:
         raise ImportError(CUDA_CORE_UNAVAILABLE_MSG)
-    code = "__global__ void dummy_kernel_failure() {}"
+    from cuda.core.experimental import Program, ProgramOptions
+
+    code = f"__global__ void {name}() {{}}"
     program_options = ProgramOptions(std="c++17")
     prog = Program(code, code_type="c++", options=program_options)
-    return prog.compile("cubin", name_expressions=("dummy_kernel_failure",))
+    return prog.compile("cubin", name_expressions=(name,))
 
 
-def launch_dummy_kernel_module() -> None:
+def launch_dummy_kernel_module(name: str = "dummy_kernel_failure") -> None:
     """
     Launch a dummy kernel module.
 
+    Args:
+        name: Name of the kernel, see :func:`get_dummy_kernel_module`.
+
     Raises:
         ImportError: If cuda-core is not installed.
     """
     if not CUDA_CORE_AVAILABLE:
         raise ImportError(CUDA_CORE_UNAVAILABLE_MSG)
+    from cuda.core.experimental import Device, LaunchConfig, launch
+
     dev = Device()
     dev.set_current()
     stream = dev.create_stream()
-    mod = get_dummy_kernel_module()
-    kernel = mod.get_kernel("dummy_kernel_failure")
+    mod = get_dummy_kernel_module(name)
+    kernel = mod.get_kernel(name)
     config = LaunchConfig(grid=1, block=256)
     launch(stream, config, kernel)
     stream.sync()
 
 
+def synchronize_device() -> None:
+    """
+    Waits for all work on the current GPU to complete.
+
+    Raises:
+        ImportError: If cuda-core is not installed.
+    """
+    if not CUDA_CORE_AVAILABLE:
+        raise ImportError(CUDA_CORE_UNAVAILABLE_MSG)
+    from cuda.core.experimental import Device
+
+    dev = Device()
+    dev.set_current()
+    dev.sync()
+
+
 def format_time(seconds: float) -> str:
     """Convert ``seconds`` into ``HH:MM:SS`` format"""
     hours, remainder = divmod(int(seconds), 3600)
@@ -127,14 +154,30 @@ class NCUActionData:
     compute_clock: int
     memory_clock: int
     gpu: str
+    metrics: dict[str, Any] = field(default_factory=dict)
+    launch_stats: dict[str, Any] = field(default_factory=dict)
 
     @staticmethod
     def combine(value_reduce_op: Any) -> Any:
         """
         Combines two NCUActionData objects into a new one by applying the
-        value_reduce_op to their values.
+        value_reduce_op to their values and to each of their additional metrics.
+        Metrics reported for only one of the kernels are NaN for the other one.
+        Numeric launch statistics that differ between the kernels keep their
+        maximum, other launch statistics keep their first reported value.
         """
 
+        def _combine_stat(lhs_stat: Any, rhs_stat: Any) -> Any:
+            if lhs_stat is None:
+                return rhs_stat
+            if rhs_stat is None:
+                return lhs_stat
+            if isinstance(lhs_stat, numbers.Real) and isinstance(
+                rhs_stat, numbers.Real
+            ):
+                return max(lhs_stat, rhs_stat)
+            return lhs_stat
+
         def _combine(lhs: "NCUActionData", rhs: "NCUActionData") -> "NCUActionData":
             assert lhs.compute_clock == rhs.compute_clock
             assert lhs.memory_clock == rhs.memory_clock
@@ -145,6 +188,19 @@ class NCUActionData:
                 compute_clock=lhs.compute_clock,
                 memory_clock=lhs.memory_clock,
                 gpu=lhs.gpu,
+                metrics={
+                    name: value_reduce_op(
+                        lhs.metrics.get(name, math.nan),
+                        rhs.metrics.get(name, math.nan),
+                    )
+                    for name in {**lhs.metrics, **rhs.metrics}
+                },
+                launch_stats={
+                    name: _combine_stat(
+                        lhs.launch_stats.get(name), rhs.launch_stats.get(name)
+                    )
+                    for name in {**lhs.launch_stats, **rhs.launch_stats}
+                },
             )
 
         return _combine
@@ -231,6 +287,36 @@ def batched(iterable: Any, n: int) -> Iterator[tuple[Any, ...]]:
         yield batch
 
 
+def insert_run_columns(
+    raw_df: pd.DataFrame,
+    columns: Mapping[str, Any],
+    aggregations: Mapping[str, str | Callable[[pd.Series], float]],
+    num_args: int,
+) -> pd.DataFrame:
+    """
+    Inserts per-run columns before the parameter columns of raw profiling data and
+    records their aggregations under :data:`AGGREGATIONS_ATTR`.
+
+    Args:
+        raw_df: The raw profiling data.
+        columns: Mapping from column name to the values of the rows.
+        aggregations: Mapping from column name to the aggregation applied to it.
+        num_args: Number of parameters of the profiled function.
+
+    Returns:
+        A copy of ``raw_df`` with the columns inserted.
+    """
+    attrs = raw_df.attrs
+    raw_df = raw_df.copy()
+    for column, values in columns.items():
+        raw_df.insert(len(raw_df.columns) - num_args, column, values)
+    raw_df.attrs = {
+        **attrs,
+        AGGREGATIONS_ATTR: {**attrs.get(AGGREGATIONS_ATTR, {}), **aggregations},
+    }
+    return raw_df
+
+
 class LogParser:
     """
     Base class for parsing the log files
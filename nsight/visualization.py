@@ -6,16 +6,432 @@ Visualization utilities for Nsight Python profiling and tensor difference analys
 
 This module provides:
     - Plotting functions for profiling results with configurable layout and annotation.
+    - Rendering of plots in background processes.
+    - Plots of the history of stored results across revisions.
 """
+
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
 from collections.abc import Callable, Sequence
-from typing import Any
+from typing import Any, cast
 
 import matplotlib
+import matplotlib.axes
+import matplotlib.collections
+import matplotlib.colors
+import matplotlib.image
+import matplotlib.path
 import matplotlib.pyplot as plt
+import matplotlib.textpath
+import matplotlib.transforms
 import numpy as np
 import pandas as pd
+import PIL.Image
+
+from nsight import exceptions, store, transformation, utils
+
+MAX_TEXT_ARTISTS = 100
+"""Number of points of a subplot above which value labels are not text artists."""
+
+NVIDIA_COLORS = [
+    "#76B900",  # Green
+    "#0070C5",  # Blue
+    "#5C1682",  # Purple
+    "#890C57",  # Red
+    "#FAC200",  # Yellow
+    "#008564",  # Dark Green
+    "#FF5733",  # Orange
+    "#C70039",  # Crimson
+    "#900C3F",  # Dark Red
+    "#581845",  # Dark Purple
+    "#1F618D",  # Dark Blue
+    "#28B463",  # Light Green
+    "#F39C12",  # Bright Yellow
+    "#D35400",  # Dark Orange
+]
+"""Colors of the annotations, in order."""
+
+MAX_TICK_LABELS = 50
+"""Number of category tick labels of a downsampled plot, see ``max_points``."""
+
+DISTRIBUTION_PLOT_TYPES = ("box", "violin", "strip")
+"""Plot types showing the distribution of the runs, which require raw data."""
+
+# Hidden column of the values of the runs of every configuration
+_RUN_VALUES = "_RunValues"
+
+PLOT_HASH_KEY = "nsight-python:hash"
+"""Key of the PNG text chunk holding the hash of the data and arguments of a plot."""
+
+_plot_executor: concurrent.futures.ProcessPoolExecutor | None = None
+_pending_plots: list[concurrent.futures.Future[pd.DataFrame]] = []
+
+
+def _field_labels(df: pd.DataFrame, fields: Sequence[str]) -> pd.Series:
+    """
+    Builds labels like ``"n=1, dtype=float"`` from the values of ``fields`` in every
+    row of ``df``.
+    """
+    labels = pd.Series("", index=df.index, dtype=object)
+    # Values are formatted in the common type of the fields, like rows of df
+    values = df[list(fields)].to_numpy()
+    for i, field in enumerate(fields):
+        column = pd.Series(values[:, i], index=df.index, dtype=object).map(str)
+        labels = labels + ("" if i == 0 else ", ") + f"{field}=" + column
+    return labels
 
-from nsight import exceptions, utils
+
+def _expand_variants(
+    df: pd.DataFrame,
+    variant_fields: Sequence[Any],
+    variant_annotations: Sequence[Any],
+) -> pd.DataFrame:
+    """
+    Splits the rows of the variant annotations into one annotation per combination
+    of the values of the variant fields, e.g. ``"name dtype=float"``. The other
+    annotations come first, followed by the variants in the order of
+    ``variant_annotations`` and of their first appearance.
+    """
+    is_variant = df["Annotation"].isin(variant_annotations)
+    if not is_variant.any():
+        return df
+
+    df = df.copy()
+    variants = df[is_variant]
+    labels = variants["Annotation"].astype(str) + " "
+    labels = labels + _field_labels(variants, variant_fields)
+
+    # Relabel all variant rows at once, then order them by annotation and variant
+    order = {a: i for i, a in enumerate(dict.fromkeys(variant_annotations))}
+    annotation_rank = df["Annotation"].map(order).where(is_variant, -1)
+    variant_rank = pd.Series(-1, index=df.index)
+    variant_rank[is_variant] = labels.groupby(labels, sort=False).ngroup()
+    df.loc[is_variant, "Annotation"] = labels
+    df["_annotation_rank"] = annotation_rank.astype(float)
+    df["_variant_rank"] = variant_rank
+    df = df.sort_values(["_annotation_rank", "_variant_rank"], kind="stable")
+    return df.drop(columns=["_annotation_rank", "_variant_rank"]).reset_index(drop=True)
+
+
+def _text_collection(
+    ax: matplotlib.axes.Axes,
+    x: np.ndarray,
+    y: np.ndarray,
+    labels: Sequence[str],
+    fontsize: float,
+    color: str,
+) -> None:
+    """
+    Draws centered text labels at data coordinates as a single collection of
+    glyph outlines, which renders much faster than one text artist per label.
+    """
+    # Repeated labels share their outline
+    outlines: dict[str, matplotlib.path.Path] = {}
+    for label in labels:
+        if label in outlines:
+            continue
+        path = matplotlib.textpath.TextPath((0, 0), label, size=fontsize)
+        vertices = path.vertices
+        if len(vertices):
+            # The control points bound the glyphs closely enough for centering
+            center = (vertices[:, 0].min() + vertices[:, 0].max()) / 2
+            vertices = vertices - [center, 0]
+        outlines[label] = matplotlib.path.Path(vertices, path.codes)
+    paths = [outlines[label] for label in labels]
+
+    # Glyphs are sized in points, and follow the resolution of the figure
+    points = matplotlib.transforms.Affine2D().scale(1 / 72)
+    collection = matplotlib.collections.PathCollection(
+        paths,
+        offsets=np.column_stack([x, y]),
+        offset_transform=ax.transData,
+        transform=points + ax.figure.dpi_scale_trans,
+        facecolors=color,
+        edgecolors="none",
+    )
+    ax.add_collection(collection, autolim=False)
+
+
+def _plot_hash(arguments: dict[str, Any], *frames: pd.DataFrame) -> str:
+    """
+    Hashes the data and layout arguments of a plot, along with the version of
+    matplotlib that renders it.
+    """
+    digest = hashlib.sha256()
+    for df in frames:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    header = {
+        "columns": [[str(column) for column in df.columns] for df in frames],
+        "dtypes": [[str(dtype) for dtype in df.dtypes] for df in frames],
+        "arguments": arguments,
+        "matplotlib": matplotlib.__version__,
+    }
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _saved_plot_hash(filename: str) -> str | None:
+    """Returns the plot hash stored in a PNG file, if any."""
+    try:
+        with PIL.Image.open(filename) as image:
+            text: dict[str, str] = getattr(image, "text", {})
+            return text.get(PLOT_HASH_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+def _print_data(agg_df: pd.DataFrame) -> None:
+    agg_df["AvgValue"] = agg_df["AvgValue"].map("{:.4f}".format)
+    print("Aggregated Data (Average value and Number of Runs):")
+    print(agg_df.to_string(index=False))
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Selects at most ``max_points`` points of a series with the
+    largest-triangle-three-buckets algorithm, which keeps its visual shape. The
+    first and last points are always kept, missing values are dropped.
+
+    Args:
+        x: The x values of the series, in ascending order.
+        y: The y values of the series.
+        max_points: The number of points to keep, at least 3.
+
+    Returns:
+        The indices of the selected points, in ascending order.
+    """
+    valid = np.flatnonzero(np.isfinite(y))
+    n = len(valid)
+    if n <= max_points:
+        return valid
+    x, y = x[valid], y[valid]
+
+    # Every bucket between the first and the last point contributes one point
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (
+            (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        )
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        # Keep the point spanning the largest triangle with the previously kept
+        # point and the average of the next bucket
+        a = selected[i]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        selected[i + 1] = start + int(np.argmax(area))
+    return valid[selected]
+
+
+def _run_values(
+    agg_df: pd.DataFrame, raw_df: pd.DataFrame, func_fields: Sequence[str]
+) -> pd.Series:
+    """
+    Collects the sorted values of the runs of every row of processed data from the
+    raw data, matched by annotation and parameters.
+    """
+    keys = ["Annotation", *func_fields]
+    codes = pd.MultiIndex.from_frame(agg_df[keys]).get_indexer(
+        pd.MultiIndex.from_frame(raw_df[keys])
+    )
+    values = pd.to_numeric(raw_df["Value"], errors="coerce").to_numpy(dtype=float)
+    matched = codes >= 0
+    sorted_values, starts, counts = transformation._sort_by_group(
+        codes[matched], values[matched], len(agg_df)
+    )
+    runs = pd.Series([None] * len(agg_df), index=agg_df.index, dtype=object)
+    runs[:] = np.split(sorted_values, (starts + counts)[:-1])
+    return runs
+
+
+def _box_stats(runs: Sequence[np.ndarray]) -> list[dict[str, Any]]:
+    """
+    Computes the statistics of a box plot of every group of sorted run values at
+    once. The whiskers extend to the furthest values within 1.5 interquartile
+    ranges of the quartiles, the values beyond are outliers.
+    """
+    counts = np.array([len(values) for values in runs])
+    starts = np.cumsum(counts) - counts
+    values = np.concatenate(runs)
+    q1, median, q3 = (
+        transformation._group_quantile(values, starts, counts, q)
+        for q in (0.25, 0.5, 0.75)
+    )
+    iqr = q3 - q1
+    codes = np.repeat(np.arange(len(runs)), counts)
+    inside = (values >= (q1 - 1.5 * iqr)[codes]) & (values <= (q3 + 1.5 * iqr)[codes])
+
+    whisker_low = np.full(len(runs), np.inf)
+    whisker_high = np.full(len(runs), -np.inf)
+    np.minimum.at(whisker_low, codes[inside], values[inside])
+    np.maximum.at(whisker_high, codes[inside], values[inside])
+    outlier_counts = np.bincount(codes[~inside], minlength=len(runs))
+    outliers = np.split(values[~inside], np.cumsum(outlier_counts)[:-1])
+
+    return [
+        {
+            "med": median[i],
+            "q1": q1[i],
+            "q3": q3[i],
+            "whislo": whisker_low[i],
+            "whishi": whisker_high[i],
+            "fliers": outliers[i],
+        }
+        for i in range(len(runs))
+    ]
+
+
+def _plot_distribution(
+    ax: matplotlib.axes.Axes,
+    plot_type: str,
+    runs: pd.Series,
+    positions: pd.Series,
+    width: float,
+    label: str,
+    color: str,
+) -> None:
+    """
+    Draws the runs of every configuration of an annotation as a box, a violin or
+    jittered points.
+    """
+    has_runs = (runs.map(len) > 0).to_numpy()
+    datasets = list(runs[has_runs])
+    x = positions.to_numpy(dtype=float)[has_runs]
+    if not datasets:
+        return
+
+    if plot_type == "box":
+        boxes = ax.bxp(
+            _box_stats(datasets),
+            positions=x,
+            widths=width * 0.8,
+            patch_artist=True,
+            manage_ticks=False,
+            boxprops={"facecolor": color, "alpha": 0.7},
+            medianprops={"color": "black"},
+            flierprops={"markeredgecolor": color, "markersize": 3},
+        )
+        boxes["boxes"][0].set_label(label)
+    elif plot_type == "violin":
+        violins = ax.violinplot(
+            datasets, positions=x, widths=width * 0.8, showmedians=True
+        )
+        bodies = cast(list[matplotlib.collections.PolyCollection], violins["bodies"])
+        for body in bodies:
+            body.set_facecolor(color)
+            body.set_alpha(0.7)
+        for lines in ("cmedians", "cmins", "cmaxes", "cbars"):
+            violins[lines].set_color(color)
+        bodies[0].set_label(label)
+    else:
+        counts = [len(values) for values in datasets]
+        jitter = np.random.default_rng(0).uniform(-0.4, 0.4, sum(counts)) * width
+        ax.scatter(
+            np.repeat(x, counts) + jitter,
+            np.concatenate(datasets),
+            s=6,
+            alpha=0.6,
+            color=color,
+            label=label,
+        )
+
+
+def _plot_heatmap(
+    ax: matplotlib.axes.Axes,
+    df: pd.DataFrame,
+    y_keys: Sequence[str],
+    norm: matplotlib.colors.Normalize,
+    annotate_points: bool,
+) -> matplotlib.image.AxesImage:
+    """
+    Draws the ``AvgValue`` of every configuration as one image, with the
+    ``Configuration`` labels along the x-axis and the values of ``y_keys`` along
+    the y-axis, both in order of appearance. Missing cells are left blank.
+    """
+    col_codes, col_labels = pd.factorize(df["Configuration"].astype(str))
+    row_codes, row_labels = pd.factorize(_field_labels(df, y_keys))
+    values = np.full((len(row_labels), len(col_labels)), np.nan)
+    values[row_codes, col_codes] = df["AvgValue"].to_numpy(dtype=float)
+
+    image = ax.imshow(
+        values,
+        aspect="auto",
+        origin="lower",
+        interpolation="nearest",
+        cmap="viridis",
+        norm=norm,
+    )
+    ax.set_xticks(np.arange(len(col_labels)))
+    ax.set_xticklabels(col_labels, ha="right", rotation=45, fontsize=9)
+    ax.set_yticks(np.arange(len(row_labels)))
+    ax.set_yticklabels(row_labels, fontsize=9)
+
+    if annotate_points:
+        rows, cols = np.nonzero(~np.isnan(values))
+        cells = values[rows, cols]
+        # viridis is dark for low values
+        dark = np.asarray(norm(cells)) < 0.5
+        for color, mask in (("white", dark), ("black", ~dark)):
+            labels = [f"{value:.2f}" for value in cells[mask]]
+            if len(cells) > MAX_TEXT_ARTISTS:
+                _text_collection(ax, cols[mask], rows[mask], labels, 8, color)
+                continue
+            for x, y, label in zip(cols[mask], rows[mask], labels):
+                ax.text(x, y, label, fontsize=8, color=color, ha="center", va="center")
+    return image
+
+
+def _plot_roofline_ceilings(ax: matplotlib.axes.Axes, df: pd.DataFrame) -> None:
+    """
+    Draws the memory and compute ceilings of the roofline model on log-log axes.
+    """
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Arithmetic intensity (FLOP/byte)")
+
+    peak_flops = df["PeakFLOPs"].max(skipna=True)
+    peak_bandwidth = df["PeakBandwidth"].max(skipna=True)
+    intensity = df["ArithmeticIntensity"][df["ArithmeticIntensity"] > 0]
+    if np.isnan(peak_flops) or np.isnan(peak_bandwidth) or intensity.empty:
+        return
+
+    ridge = peak_flops / peak_bandwidth
+    x_min = min(intensity.min(), ridge) / 10
+    x_max = max(intensity.max(), ridge) * 10
+    ax.plot(
+        [x_min, ridge, x_max],
+        [x_min * peak_bandwidth, peak_flops, peak_flops],
+        color="black",
+        linewidth=1.5,
+        zorder=2,
+    )
+    ax.axvline(x=ridge, color="gray", linestyle="dotted", linewidth=1)
+    ax.text(
+        x_min,
+        x_min * peak_bandwidth,
+        f" {peak_bandwidth / 1e9:.0f} GB/s",
+        fontsize=8,
+        rotation=30,
+        rotation_mode="anchor",
+        transform_rotates_text=True,
+        va="bottom",
+    )
+    ax.text(
+        x_max,
+        peak_flops,
+        f"{peak_flops / 1e12:.1f} TFLOP/s ",
+        fontsize=8,
+        ha="right",
+        va="bottom",
+    )
 
 
 def visualize(
@@ -37,6 +453,12 @@ def visualize(
     variant_fields: Sequence[Any] | None = None,
     variant_annotations: Sequence[Any] | None = None,
     plot_callback: Callable[[matplotlib.figure.Figure], None] | None = None,
+    skip_unchanged: bool = True,
+    y_keys: Sequence[str] | None = None,
+    x_scale: str | None = None,
+    max_points: int | None = None,
+    raw_df: str | pd.DataFrame | None = None,
+    error_bars: bool = False,
 ) -> pd.DataFrame:
     """
     Plots profiling results using line or bar plots in a subplot grid.
@@ -54,13 +476,44 @@ def visualize(
         title: Main plot title.
         filename: Output filename for the saved plot.
         ylabel: Label for the y-axis (typically the metric name).
-        annotate_points: Whether to annotate data points with values.
+        annotate_points: Whether to annotate data points with values. Subplots
+            with more than :data:`MAX_TEXT_ARTISTS` points draw the values as a
+            single collection of glyph outlines.
         show_avg: Whether to add an "Avg" column with average metric values.
-        plot_type: Type of plot: "line" or "bar".
+        plot_type: Type of plot: "line", "bar", "roofline" or "heatmap". A roofline
+            plot shows ``AttainedFLOPs`` against ``ArithmeticIntensity`` on log-log
+            axes with the memory and compute ceilings of the GPU, see
+            :func:`nsight.transformation.roofline`. A heatmap shows the
+            ``AvgValue`` of every configuration as a cell, with ``x_keys`` along
+            the x-axis and ``y_keys`` along the y-axis, and one column of subplots
+            per annotation. Box, violin and strip plots show the distribution of
+            the runs of every configuration from ``raw_df``, see
+            :data:`DISTRIBUTION_PLOT_TYPES`.
         show_geomean: Whether to show geometric mean values.
         show_grid: Whether to display grid lines on the plot.
         variant_fields: List of config fields to use as variant fields (lines).
         variant_annotations: List of annotated range names for which to apply variant splitting. The provided strings must each match one of the names defined using nsight.annotate.
+        plot_callback: Function called with the figure before it is saved.
+        skip_unchanged: Whether to skip rendering if ``filename`` is a PNG file
+            that was rendered from the same data and arguments. Their hash is
+            stored in the PNG metadata under :data:`PLOT_HASH_KEY`. Plots with a
+            ``plot_callback`` are always rendered.
+        y_keys: List of fields to use for the y-axis of heatmaps, which by default
+            use all remaining parameters for the x-axis.
+        x_scale: ``"linear"`` or ``"log"`` to plot lines against the values of a
+            single numeric x-axis field instead of one category per
+            configuration. Averages and geometric means are not shown then.
+            Default: categories.
+        max_points: Maximum number of points drawn per line. Longer lines are
+            downsampled with the largest-triangle-three-buckets algorithm, which
+            keeps their visual shape, and at most :data:`MAX_TICK_LABELS`
+            configurations are labeled. Default: all points.
+        raw_df: Raw profiling data with one row per run or path to CSV file, as
+            returned by
+            :meth:`nsight.collection.core.ProfileResults.to_raw_dataframe`.
+            Required for box, violin and strip plots.
+        error_bars: Whether to draw the 95% confidence intervals
+            ``CI95_Lower`` and ``CI95_Upper`` as error bars of line and bar plots.
 
     """
     if isinstance(agg_df, str):
@@ -68,10 +521,77 @@ def visualize(
     assert isinstance(
         agg_df, pd.DataFrame
     ), f"agg_df must be a pandas DataFrame or a CSV file path, not {type(agg_df)}"
+    if isinstance(raw_df, str):
+        raw_df = pd.read_csv(raw_df)
+    if plot_type in DISTRIBUTION_PLOT_TYPES and raw_df is None:
+        raise ValueError(f"Plots of type '{plot_type}' require raw_df")
+
+    # Hash the inputs before the data is modified below
+    plot_hash = None
+    if (
+        skip_unchanged
+        and plot_callback is None
+        and os.path.splitext(filename)[1].lower() == ".png"
+    ):
+        plot_hash = _plot_hash(
+            {
+                "row_panels": row_panels,
+                "col_panels": col_panels,
+                "x_keys": x_keys,
+                "title": title,
+                "ylabel": ylabel,
+                "annotate_points": annotate_points,
+                "show_avg": show_avg,
+                "plot_type": plot_type,
+                "plot_width": plot_width,
+                "plot_height": plot_height,
+                "show_geomean": show_geomean,
+                "show_grid": show_grid,
+                "variant_fields": variant_fields,
+                "variant_annotations": variant_annotations,
+                "y_keys": y_keys,
+                "x_scale": x_scale,
+                "max_points": max_points,
+                "error_bars": error_bars,
+            },
+            agg_df,
+            *([raw_df] if plot_type in DISTRIBUTION_PLOT_TYPES else []),
+        )
 
     row_panels = row_panels or []
     col_panels = col_panels or []
 
+    if plot_type == "roofline":
+        missing = [
+            col for col in transformation.ROOFLINE_DERIVED if col not in agg_df.columns
+        ]
+        if missing:
+            raise exceptions.ProfilerException(
+                f"Roofline plots require the columns {missing}. "
+                "Profile with roofline=True to collect them."
+            )
+        # Averages over configurations have no place on a roofline
+        show_avg = show_geomean = False
+        ylabel = ylabel or "Attained FLOP/s"
+    elif plot_type == "heatmap":
+        if not y_keys:
+            raise ValueError("Heatmap plots require y_keys")
+        # Every annotation gets its own column of heatmaps
+        col_panels = [*col_panels, "Annotation"]
+        show_avg = show_geomean = False
+    elif plot_type in DISTRIBUTION_PLOT_TYPES:
+        # The runs are shown instead of their averages
+        show_avg = show_geomean = annotate_points = False
+
+    if error_bars:
+        if plot_type not in ("line", "bar"):
+            raise ValueError("Error bars require a line or bar plot")
+        missing = [col for col in ["CI95_Lower", "CI95_Upper"] if col not in agg_df]
+        if missing:
+            raise exceptions.ProfilerException(
+                f"Error bars require the columns {missing}"
+            )
+
     # --- Annotation Variants Expansion ---
     if variant_fields and variant_annotations:
         # Remove variant_fields from Configuration for all annotations
@@ -89,43 +609,17 @@ def visualize(
         if field not in subplot_fields and field not in config_exclude
     ]
 
-    agg_df["Configuration"] = agg_df[non_panel_fields].apply(
-        lambda row: ", ".join(
-            f"{field_name}={value}" for field_name, value in row.items()
-        ),
-        axis=1,
-    )
+    if plot_type in DISTRIBUTION_PLOT_TYPES:
+        # Copy, so the caller's data does not get the hidden column
+        agg_df = agg_df.assign(
+            **{_RUN_VALUES: _run_values(agg_df, raw_df, func_fields)}
+        )
+
+    agg_df["Configuration"] = _field_labels(agg_df, non_panel_fields)
 
     # Expand variant annotations into separate lines, but keep x-ticks shared
     if variant_fields and variant_annotations:
-        df = agg_df.copy()
-        new_rows = []
-        for annotation in variant_annotations:
-            annotation_mask = df["Annotation"] == annotation
-            if not annotation_mask.any():
-                continue
-            annotation_df = df[annotation_mask]
-            # For each unique combination of variant_fields fields
-            unique_combos = annotation_df[variant_fields].drop_duplicates()
-            for _, combo in unique_combos.iterrows():
-                combo_mask = (annotation_df[variant_fields] == combo.values).all(axis=1)
-                combo_df = annotation_df[combo_mask].copy()
-                # Create new annotation label
-                variant_label = (
-                    annotation
-                    + " "
-                    + ", ".join(
-                        f"{k}={v}" for k, v in zip(variant_fields, combo.values)
-                    )
-                )
-                combo_df["Annotation"] = variant_label
-                new_rows.append(combo_df)
-            # Remove the original annotation rows
-            df = df[~annotation_mask]
-        # Add all new variant rows
-        if new_rows:
-            df = pd.concat([df] + new_rows, ignore_index=True)
-        agg_df = df
+        agg_df = _expand_variants(agg_df, variant_fields, variant_annotations)
 
     # --- End Annotation Variants Expansion ---
 
@@ -134,15 +628,96 @@ def visualize(
     hw_info_subtitle = f"{gpu_model}, {host}"
     title_with_hardware_info = f"{title}\n{hw_info_subtitle}"
 
-    # Ensure that all fields in x_keys are present in non_panel_fields
-    if x_keys:
-        for field in x_keys:
+    # Ensure that all fields in x_keys and y_keys are present in non_panel_fields
+    if x_keys or y_keys:
+        for field in [*(x_keys or []), *(y_keys or [])]:
             if field not in non_panel_fields:
                 raise exceptions.ProfilerException(
                     f"Field '{field}' is not present in the DataFrame. "
                     f"Available fields: {non_panel_fields}"
                 )
 
+    # --- x_keys validation and Configuration building ---
+    used_fields = (
+        set(row_panels or []) | set(col_panels or []) | set(variant_fields or [])
+    )
+    if plot_type == "heatmap":
+        used_fields |= set(y_keys or [])
+    if x_keys:
+        overlap = used_fields & set(x_keys)
+        if overlap:
+            raise ValueError(
+                f"x_keys cannot contain fields used in row_panels, col_panels, variant_fields or y_keys: {overlap}"
+            )
+        config_fields = list(x_keys)
+    else:
+        config_fields = [field for field in func_fields if field not in used_fields]
+    configurations = (
+        agg_df["Configuration"]
+        if config_fields == non_panel_fields
+        else _field_labels(agg_df, config_fields)
+    )
+    if plot_type == "heatmap":
+        cells = agg_df[subplot_fields].assign(
+            Configuration=configurations, Row=_field_labels(agg_df, y_keys or [])
+        )
+        if cells.duplicated().any():
+            raise ValueError(
+                "Heatmap cells must have a single value. Use the remaining "
+                "parameters as x_keys or panels."
+            )
+    # --- End x_keys validation and Configuration building ---
+
+    if x_scale is not None:
+        if x_scale not in ("linear", "log"):
+            raise ValueError(f"x_scale must be 'linear' or 'log', not '{x_scale}'")
+        if (
+            plot_type != "line"
+            or len(config_fields) != 1
+            or not pd.api.types.is_numeric_dtype(agg_df[config_fields[0]])
+        ):
+            raise ValueError(
+                "A numeric x-axis requires a line plot against a single numeric "
+                f"field, not {config_fields}"
+            )
+        # Averages have no position on a numeric axis
+        show_avg = show_geomean = False
+    if max_points is not None and max_points < 3:
+        raise ValueError(f"max_points must be at least 3, not {max_points}")
+
+    if plot_hash is not None and _saved_plot_hash(filename) == plot_hash:
+        if _RUN_VALUES in agg_df:
+            agg_df = agg_df.drop(columns=_RUN_VALUES)
+        if print_data:
+            _print_data(agg_df)
+        return agg_df
+
+    # Split the data into subplots once
+    if subplot_fields:
+        subplot_dfs = {
+            key: group
+            for key, group in agg_df.assign(Configuration=configurations).groupby(
+                subplot_fields, sort=False, observed=True
+            )
+        }
+    else:
+        subplot_dfs = {(): agg_df.assign(Configuration=configurations)}
+    empty_df = agg_df.iloc[0:0].assign(Configuration=configurations.iloc[0:0])
+
+    geomeans = agg_df.drop_duplicates("Annotation").set_index("Annotation")
+    if plot_type in DISTRIBUTION_PLOT_TYPES:
+        top = max(
+            (values[-1] for values in agg_df[_RUN_VALUES] if len(values)), default=0
+        )
+    else:
+        top = agg_df["CI95_Upper" if error_bars else "AvgValue"].max(skipna=True)
+    y_max = max(top * 1.1, 1)
+    # Heatmaps of all subplots share one color scale
+    norm = matplotlib.colors.Normalize(
+        agg_df["AvgValue"].min(skipna=True), agg_df["AvgValue"].max(skipna=True)
+    )
+    images = []
+
     unique_rows = (
         agg_df[row_panels].drop_duplicates()
         if row_panels
@@ -175,98 +750,23 @@ def visualize(
     for row_idx, (_, row_values) in enumerate(unique_rows.iterrows()):
         for col_idx, (_, col_values) in enumerate(unique_cols.iterrows()):
             ax = axes[row_idx, col_idx]
-            subplot_df = agg_df
-            if row_panels:
-                subplot_df = subplot_df[
-                    (subplot_df[row_panels] == row_values).all(axis=1)
-                ]
-            if col_panels:
-                subplot_df = subplot_df[
-                    (subplot_df[col_panels] == col_values).all(axis=1)
-                ]
-
-            local_df = subplot_df.copy()
-
-            # --- x_keys validation and Configuration building ---
-            used_fields = (
-                set(row_panels or [])
-                | set(col_panels or [])
-                | set(variant_fields or [])
+            key = (tuple(row_values) if row_panels else ()) + (
+                tuple(col_values) if col_panels else ()
             )
-            if x_keys:
-                overlap = used_fields & set(x_keys)
-                if overlap:
-                    raise ValueError(
-                        f"x_keys cannot contain fields used in row_panels, col_panels, or variant_fields: {overlap}"
-                    )
-                config_fields = x_keys
+            local_df = subplot_dfs.get(key, empty_df)
+
+            if plot_type == "heatmap":
+                images.append(
+                    _plot_heatmap(ax, local_df, y_keys or [], norm, annotate_points)
+                )
+                annotations = []
             else:
-                annotation_idx = local_df.columns.get_loc("AvgValue")
-                func_fields = list(local_df.columns[1:annotation_idx])
-                subplot_fields = row_panels + col_panels  # type: ignore[operator]
-                config_exclude = set(variant_fields or [])
-                config_fields = [
-                    field
-                    for field in func_fields
-                    if field not in subplot_fields and field not in config_exclude
-                ]
-            local_df["Configuration"] = local_df[config_fields].apply(
-                lambda row: ", ".join(
-                    f"{field_name}={value}" for field_name, value in row.items()
-                ),
-                axis=1,
-            )
-            # --- End x_keys validation and Configuration building ---
-
-            # --- Annotation Variants logic per subplot ---
-            if variant_fields and variant_annotations:
-                df = local_df.copy()
-                new_rows = []
-                for annotation in variant_annotations:
-                    annotation_mask = df["Annotation"] == annotation
-                    if not annotation_mask.any():
-                        continue
-                    annotation_df = df[annotation_mask]
-                    unique_combos = annotation_df[variant_fields].drop_duplicates()
-                    for _, combo in unique_combos.iterrows():
-                        combo_mask = (
-                            annotation_df[variant_fields] == combo.values
-                        ).all(axis=1)
-                        combo_df = annotation_df[combo_mask].copy()
-                        variant_label = (
-                            annotation
-                            + " "
-                            + ", ".join(
-                                f"{k}={v}" for k, v in zip(variant_fields, combo.values)
-                            )
-                        )
-                        combo_df["Annotation"] = variant_label
-                        new_rows.append(combo_df)
-                    df = df[~annotation_mask]
-                if new_rows:
-                    df = pd.concat([df] + new_rows, ignore_index=True)
-                local_df = df
-            # --- End Annotation Variants logic per subplot ---
-
-            annotations = local_df["Annotation"].unique()
-            nvidia_colors = [
-                "#76B900",  # Green
-                "#0070C5",  # Blue
-                "#5C1682",  # Purple
-                "#890C57",  # Red
-                "#FAC200",  # Yellow
-                "#008564",  # Dark Green
-                "#FF5733",  # Orange
-                "#C70039",  # Crimson
-                "#900C3F",  # Dark Red
-                "#581845",  # Dark Purple
-                "#1F618D",  # Dark Blue
-                "#28B463",  # Light Green
-                "#F39C12",  # Bright Yellow
-                "#D35400",  # Dark Orange
-            ]
+                annotations = local_df["Annotation"].unique()
+            nvidia_colors = NVIDIA_COLORS
 
             unique_configs = local_df["Configuration"].dropna().unique()
+            x_pos_map = {label: idx for idx, label in enumerate(unique_configs)}
+            text_artists = annotate_points and len(local_df) <= MAX_TEXT_ARTISTS
 
             x_ticks = np.arange(len(unique_configs))
             n_annotations = len(annotations)
@@ -285,18 +785,41 @@ def visualize(
                 avg_values[annotation] = avg_value
 
                 # Map annotation_data to x positions (may be multiple points per x-tick)
-                x_pos_map = {label: idx for idx, label in enumerate(unique_configs)}
                 x_positions = annotation_data["Configuration"].map(x_pos_map)
+                # Downsampled lines are drawn at the positions of their categories
+                line_x = (
+                    x_positions
+                    if max_points is not None
+                    else annotation_data["Configuration"].astype(str)
+                )
+                if x_scale is not None:
+                    annotation_data = annotation_data.sort_values(
+                        config_fields[0], kind="stable"
+                    )
+                    x_positions = line_x = annotation_data[config_fields[0]]
+
+                if (
+                    plot_type == "line"
+                    and max_points is not None
+                    and len(annotation_data) > max_points
+                ):
+                    keep = _lttb_indices(
+                        x_positions.to_numpy(dtype=float),
+                        annotation_data["AvgValue"].to_numpy(dtype=float),
+                        max_points,
+                    )
+                    annotation_data = annotation_data.iloc[keep]
+                    x_positions = line_x = x_positions.iloc[keep]
 
                 # Adjust x positions for grouped bars
-                if plot_type == "bar" and n_annotations > 1:
+                if plot_type in ("bar", *DISTRIBUTION_PLOT_TYPES) and n_annotations > 1:
                     # Center the group of bars around each x-tick
                     x_offset = (i - (n_annotations - 1) / 2) * width
                     x_positions = x_positions + x_offset
 
                 if plot_type == "line":
                     ax.plot(
-                        annotation_data["Configuration"].astype(str),
+                        line_x,
                         annotation_data["AvgValue"],
                         marker="o",
                         label=annotation,
@@ -310,9 +833,68 @@ def visualize(
                         label=annotation,
                         color=color,
                     )
+                elif plot_type in DISTRIBUTION_PLOT_TYPES:
+                    _plot_distribution(
+                        ax,
+                        plot_type,
+                        annotation_data[_RUN_VALUES],
+                        x_positions,
+                        width,
+                        annotation,
+                        color,
+                    )
+                elif plot_type == "roofline":
+                    ax.scatter(
+                        annotation_data["ArithmeticIntensity"],
+                        annotation_data["AttainedFLOPs"],
+                        label=annotation,
+                        color=color,
+                        zorder=3,
+                    )
+
+                if error_bars:
+                    y = annotation_data["AvgValue"]
+                    ax.errorbar(
+                        line_x if plot_type == "line" else x_positions,
+                        y,
+                        yerr=[
+                            y - annotation_data["CI95_Lower"],
+                            annotation_data["CI95_Upper"] - y,
+                        ],
+                        fmt="none",
+                        ecolor="black" if plot_type == "bar" else color,
+                        capsize=3,
+                    )
 
+                # Annotate each roofline point with its configuration
+                if annotate_points and plot_type == "roofline":
+                    for x, y, label in zip(
+                        annotation_data["ArithmeticIntensity"],
+                        annotation_data["AttainedFLOPs"],
+                        annotation_data["Configuration"],
+                    ):
+                        ax.annotate(
+                            label,
+                            (x, y),
+                            textcoords="offset points",
+                            xytext=(4, 4),
+                            fontsize=7,
+                            color=color,
+                        )
                 # Annotate each point with its value (formatted to 2 decimal places)
-                if annotate_points:
+                elif annotate_points and not text_artists:
+                    values = annotation_data["AvgValue"]
+                    valid = values.notna().to_numpy()
+                    _text_collection(
+                        ax,
+                        x_positions.to_numpy(dtype=float)[valid],
+                        values.to_numpy(dtype=float)[valid]
+                        + (0.02 if plot_type == "line" else 0.03),
+                        [f"{y:.2f}" for y in values[valid]],
+                        fontsize=8,
+                        color=color,
+                    )
+                elif annotate_points:
                     for x_pos, y in zip(x_positions, annotation_data["AvgValue"]):
                         ax.text(
                             x_pos,
@@ -366,9 +948,7 @@ def visualize(
                 for i, (annotation, color) in enumerate(
                     zip(annotations, nvidia_colors)
                 ):
-                    geomean = agg_df[agg_df["Annotation"] == annotation][
-                        "Geomean"
-                    ].iloc[0]
+                    geomean = geomeans["Geomean"].get(annotation, np.nan)
                     if not np.isnan(geomean):
                         geomean_x_pos = (
                             sep_index + (i - (n_annotations - 1) / 2) * width
@@ -387,30 +967,50 @@ def visualize(
                             zorder=4,  # Ensure text is above the bar
                         )
 
-            # Ensure all x-axis labels are strings
-            x_labels = list(map(str, unique_configs))
-            if show_avg:
-                x_labels.append("Avg")
-            if show_geomean:
-                x_labels.append("Geomean")
-
-            ax.set_xticks(np.arange(len(x_labels)))
-            ax.set_xticklabels(
-                x_labels,
-                ha="right",  # Align to the right to prevent overlap
-                rotation=45,  # Rotate for better readability
-                fontsize=9,  # Reduce font size slightly
-            )
+            if plot_type == "roofline":
+                _plot_roofline_ceilings(ax, local_df)
+            elif x_scale is not None:
+                ax.set_xscale(x_scale)
+                ax.set_xlabel(config_fields[0])
+                ax.set_ylim(0, y_max)
+            elif plot_type != "heatmap":
+                # Ensure all x-axis labels are strings
+                x_labels = list(map(str, unique_configs))
+                if show_avg:
+                    x_labels.append("Avg")
+                if show_geomean:
+                    x_labels.append("Geomean")
+
+                x_ticks = np.arange(len(x_labels))
+                if max_points is not None and len(unique_configs) > MAX_TICK_LABELS:
+                    # Label every step-th configuration, and the aggregates
+                    step = -(-len(unique_configs) // MAX_TICK_LABELS)
+                    x_ticks = np.r_[
+                        x_ticks[: len(unique_configs) : step],
+                        x_ticks[len(unique_configs) :],
+                    ]
+                    x_labels = [x_labels[tick] for tick in x_ticks]
 
-            ax.set_ylim(0, max(agg_df["AvgValue"].max(skipna=True) * 1.1, 1))
+                ax.set_xticks(x_ticks)
+                ax.set_xticklabels(
+                    x_labels,
+                    ha="right",  # Align to the right to prevent overlap
+                    rotation=45,  # Rotate for better readability
+                    fontsize=9,  # Reduce font size slightly
+                )
+
+                ax.set_ylim(0, y_max)
 
             # Add grid
-            if show_grid:
+            if show_grid and plot_type != "heatmap":
                 ax.grid(True, linestyle="--", alpha=0.7)
                 ax.set_axisbelow(True)  # Put grid behind the plot elements
 
             ylabel = ylabel or agg_df["Metric"].unique()[0]
-            if col_idx == 0:
+            if plot_type == "heatmap":
+                if col_idx == 0:
+                    ax.set_ylabel(", ".join(y_keys or []))
+            elif col_idx == 0:
                 ax.set_ylabel(f"{ylabel} (avg: {agg_df['NumRuns'].max()} runs)")
 
             # Generate combined subplot title with both row and col fields
@@ -429,8 +1029,18 @@ def visualize(
             num_lines = full_title.count("\n") + 1 if full_title else 1
             ax.set_title(full_title, pad=18 + 6 * (num_lines - 1))
 
+    if images:
+        fig.colorbar(
+            images[0],
+            ax=axes,
+            label=f"{ylabel} (avg: {agg_df['NumRuns'].max()} runs)",
+        )
+
     # Use 'best' legend location for each axis
     for ax in axes.flat:
+        if plot_type == "heatmap":
+            # Annotations are in the subplot titles
+            continue
         ax.legend(
             title="Annotation",
             loc="best",  # Let matplotlib pick the best spot
@@ -459,12 +1069,221 @@ def visualize(
         plot_callback(fig)
 
     # Save with tight bounding box to avoid clipping
-    fig.savefig(filename, bbox_inches="tight")
+    fig.savefig(
+        filename,
+        bbox_inches="tight",
+        metadata={PLOT_HASH_KEY: plot_hash} if plot_hash else None,
+    )
 
+    if _RUN_VALUES in agg_df:
+        agg_df = agg_df.drop(columns=_RUN_VALUES)
     if print_data:
-        agg_df["AvgValue"] = agg_df["AvgValue"].map("{:.4f}".format)
-        print("Aggregated Data (Average value and Number of Runs):")
-        print(agg_df.to_string(index=False))
+        _print_data(agg_df)
 
     plt.close()
     return agg_df
+
+
+def _init_plot_worker() -> None:
+    # Workers only write image files, so no interactive backend is needed
+    matplotlib.use("Agg", force=True)
+
+
+def visualize_in_background(
+    *args: Any, **kwargs: Any
+) -> concurrent.futures.Future[pd.DataFrame]:
+    """
+    Plots profiling results like :func:`visualize`, in a worker process using the
+    Agg backend, and returns immediately. Several plots are rendered in parallel.
+
+    Workers are forked where possible, so that they do not import the main module
+    again. A ``plot_callback`` is called in the worker and must be picklable.
+
+    Args:
+        *args: Positional arguments of :func:`visualize`.
+        **kwargs: Keyword arguments of :func:`visualize`.
+
+    Returns:
+        A future of the data returned by :func:`visualize`. See
+        :func:`wait_for_plots` to wait for all plots.
+    """
+    global _plot_executor
+    if _plot_executor is None:
+        methods = multiprocessing.get_all_start_methods()
+        _plot_executor = concurrent.futures.ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context(
+                "fork" if "fork" in methods else None
+            ),
+            initializer=_init_plot_worker,
+        )
+    future = _plot_executor.submit(visualize, *args, **kwargs)
+    _pending_plots.append(future)
+    return future
+
+
+def wait_for_plots() -> list[pd.DataFrame]:
+    """
+    Waits until all plots started by :func:`visualize_in_background` are saved.
+
+    Returns:
+        The data returned by :func:`visualize` for every plot, in the order the
+        plots were started.
+
+    Raises:
+        Exception: The first error raised while rendering a plot.
+    """
+    futures = list(_pending_plots)
+    _pending_plots.clear()
+    concurrent.futures.wait(futures)
+    return [future.result() for future in futures]
+
+
+def visualize_history(
+    results_store: str | store.ResultsStore,
+    function: str,
+    filename: str = "history.png",
+    metric: str | None = None,
+    gpu: str | None = None,
+    host: str | None = None,
+    last: int | None = 100,
+    annotations: Sequence[str] | None = None,
+    higher_is_better: bool = False,
+    min_change_pct: float = 0.0,
+    title: str = "",
+    plot_width: int = 10,
+    plot_height: int = 5,
+    plot_callback: Callable[[matplotlib.figure.Figure], None] | None = None,
+) -> pd.DataFrame:
+    """
+    Plots how the results of a function evolved over the revisions stored in a
+    :class:`nsight.store.ResultsStore`, without profiling old revisions again.
+
+    Every annotation and configuration is drawn as one line over the revisions, in
+    the order they were stored. Results that are significantly worse than those
+    of the previous revision are marked, see
+    :func:`nsight.store.detect_regressions`. Only the columns needed for the plot
+    are loaded from the store.
+
+    Args:
+        results_store: The store or the path of its database.
+        function: Name of the profiled function.
+        filename: Output filename for the saved plot.
+        metric: Metric to plot. Required if several metrics were stored.
+        gpu: GPU whose results to plot. Required if several GPUs were stored.
+        host: Host whose results to plot. Required if several hosts were stored.
+        last: Number of most recently stored revisions to plot, or ``None`` for
+            all revisions.
+        annotations: Annotations to plot. Default: all.
+        higher_is_better: Whether larger metric values are better, e.g. for
+            throughputs.
+        min_change_pct: Minimum relative change in percent for a significant
+            difference to count as a regression.
+        title: Main plot title. Default: the function name.
+        plot_width: Width of the plot in inches.
+        plot_height: Height of the plot in inches.
+        plot_callback: Function called with the figure before it is saved.
+
+    Returns:
+        The plotted results, with the columns added by
+        :func:`nsight.store.detect_regressions`.
+
+    Raises:
+        exceptions.ProfilerException: If no results of the function are stored.
+        ValueError: If results of several metrics, GPUs or hosts are stored and
+            none is selected.
+    """
+    if isinstance(results_store, str):
+        results_store = store.ResultsStore(results_store)
+
+    history = results_store.load(
+        function,
+        metric=metric,
+        gpu=gpu,
+        host=host,
+        last=last,
+        columns=[
+            "Revision",
+            "Timestamp",
+            "Annotation",
+            "Config",
+            "Metric",
+            "GPU",
+            "Host",
+            "AvgValue",
+            "StdDev",
+            "NumRuns",
+        ],
+    )
+    if annotations is not None:
+        history = history[history["Annotation"].isin(annotations)]
+    if history.empty:
+        raise exceptions.ProfilerException(
+            f"No results of '{function}' found in {results_store.path}"
+        )
+    for column in ["Metric", "GPU", "Host"]:
+        values = history[column].unique()
+        if len(values) > 1:
+            raise ValueError(
+                f"Results of '{function}' are stored for several values of "
+                f"{column}: {list(values)}. Select one with {column.lower()}=..."
+            )
+
+    history = store.detect_regressions(history, higher_is_better, min_change_pct)
+    revisions = list(dict.fromkeys(history["Revision"]))
+    x = history["Revision"].map({revision: i for i, revision in enumerate(revisions)})
+
+    fig, ax = plt.subplots(figsize=(plot_width, plot_height), constrained_layout=True)
+    for annotation, color in zip(history["Annotation"].unique(), NVIDIA_COLORS):
+        rows = history["Annotation"] == annotation
+        # One line per configuration, with gaps at revisions without results
+        codes, configs = pd.factorize(history.loc[rows, "Config"])
+        values = np.full((len(configs), len(revisions)), np.nan)
+        values[codes, x[rows].to_numpy()] = history.loc[rows, "AvgValue"]
+        ax.add_collection(
+            matplotlib.collections.LineCollection(
+                [np.column_stack([np.arange(len(revisions)), line]) for line in values],
+                colors=color,
+                linewidths=1,
+                label=annotation,
+            )
+        )
+        ax.scatter(x[rows], history.loc[rows, "AvgValue"], s=8, color=color)
+
+    regressions = history["Regression"].to_numpy(dtype=bool)
+    if regressions.any():
+        ax.scatter(
+            x[regressions],
+            history.loc[regressions, "AvgValue"],
+            marker="v",
+            s=40,
+            color="red",
+            zorder=3,
+            label="Regression",
+        )
+
+    ax.autoscale_view()
+    ax.set_ylim(bottom=0)
+    # Label at most MAX_TICK_LABELS revisions, including the latest
+    step = -(-len(revisions) // MAX_TICK_LABELS)
+    ticks = np.arange(len(revisions))[::-1][::step][::-1]
+    ax.set_xticks(ticks)
+    ax.set_xticklabels(
+        [revisions[tick] for tick in ticks], ha="right", rotation=45, fontsize=9
+    )
+    ax.set_xlabel("Revision")
+    ax.set_ylabel(history["Metric"].iloc[0])
+    ax.grid(True, linestyle="--", alpha=0.7)
+    ax.set_axisbelow(True)
+    ax.legend(title="Annotation", loc="best", fontsize=9, title_fontsize=10)
+    fig.suptitle(
+        f"{title or function}\n{history['GPU'].iloc[0]}, {history['Host'].iloc[0]}",
+        fontsize=14,
+        fontweight="bold",
+    )
+
+    if plot_callback:
+        plot_callback(fig)
+
+    fig.savefig(filename, bbox_inches="tight")
+    plt.close(fig)
+    return history
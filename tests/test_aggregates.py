@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the mergeable summaries of metric values.
+"""
+
+import functools
+
+import numpy as np
+import pytest
+
+from nsight.aggregates import RELATIVE_ACCURACY, AggregateState
+
+
+def test_merge_matches_all_values() -> None:
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1, 1000)
+    chunks = np.array_split(values, [10, 500, 501])
+
+    state = functools.reduce(
+        AggregateState.merge,
+        [AggregateState.from_values(chunk) for chunk in chunks],
+        AggregateState(),
+    )
+
+    assert state.count == 1000
+    assert state.mean == pytest.approx(values.mean())
+    assert state.std == pytest.approx(values.std(ddof=1))
+    assert (state.min, state.max) == (values.min(), values.max())
+    assert state == AggregateState.from_values(values[::-1]).merge(AggregateState())
+
+    for q in [0.01, 0.5, 0.9, 0.99]:
+        # Within the relative accuracy of the values of neighbouring ranks
+        rank = q * (len(values) - 1)
+        lower, upper = np.sort(values)[[int(np.floor(rank)), int(np.ceil(rank))]]
+        estimate = state.quantile(q)
+        assert lower * (1 - RELATIVE_ACCURACY) <= estimate
+        assert estimate <= upper * (1 + RELATIVE_ACCURACY)
+
+    cut = int(len(values) * 0.1)
+    assert state.trimmed_mean(0.1) == pytest.approx(
+        np.sort(values)[cut:-cut].mean(), rel=RELATIVE_ACCURACY
+    )
+
+
+def test_signed_values() -> None:
+    state = AggregateState.from_values([-4.0, 0.0, None, 2.0, np.nan, 8.0])
+
+    assert state.count == 4
+    assert state.quantile(0.0) == -4.0
+    assert state.quantile(0.5) == 0.0
+    assert state.quantile(0.7) == pytest.approx(2.0, rel=RELATIVE_ACCURACY)
+    assert np.isnan(AggregateState().quantile(0.5))
+    assert np.isnan(AggregateState.from_values([1.0]).std)
@@ -6,9 +6,11 @@ import sys
 from typing import Any, Dict
 from unittest.mock import MagicMock, call, patch
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from nsight import collection, exceptions
+from nsight import collection, exceptions, extraction, transformation, utils
 
 
 @patch("subprocess.run")
@@ -72,6 +74,168 @@ def test_launch_ncu_falls_back_without_ncu(mock_run: MagicMock) -> None:
     assert sys.executable in mock_run.call_args_list[1].args[0]
 
 
+def test_plan_metric_passes_single_device() -> None:
+    plan = collection.planner.plan_metric_passes(
+        ["dram__bytes.sum", "gpu__time_duration.sum", "sm__inst_executed.sum"]
+    )
+
+    # The primary metric leads the first pass, free metrics ride along
+    assert plan.passes[0][0] == "dram__bytes.sum"
+    assert "gpu__time_duration.sum" in plan.passes[0]
+    assert plan.num_passes == 2
+    assert len(plan.launches) == 1
+    assert plan.estimated_replays(10) == 20
+    assert plan.estimated_critical_path(10) == 20
+    assert "40 replay(s) per kernel of a run over 20 run(s)" in plan.summary(5, 4)
+
+
+def test_plan_metric_passes_multiple_devices() -> None:
+    metrics = ["gpu__time_duration.sum"] + [f"sm__metric{i}.sum" for i in range(8)]
+    metrics += [f"l1tex__metric{i}.sum" for i in range(2)]
+    plan = collection.planner.plan_metric_passes(metrics, devices=[0, 1])
+
+    assert plan.num_passes == 3
+    assert plan.devices == [0, 1]
+    assert plan.launches[0][0] == "gpu__time_duration.sum"
+    assert sorted(m for launch in plan.launches for m in launch) == sorted(metrics)
+    assert plan.estimated_critical_path(10) == 20
+
+
+def test_profile_sequentially() -> None:
+    rng = np.random.default_rng(0)
+    batches: list[tuple[list[int], int]] = []
+
+    # Configuration 0 differs clearly between the annotations, 1 does not
+    def profile(*args: Any, config_indices: list[int], **kwargs: Any) -> pd.DataFrame:
+        configs, runs = args[1], args[2]
+        batches.append((list(config_indices), runs))
+        rows = [
+            {
+                "Annotation": name,
+                "Value": rng.normal(mean, 1),
+                extraction.CONFIG_INDEX_COLUMN: i,
+                "PowerW": 100.0,
+                "n": config[0],
+            }
+            for name, shift in [("a", 0.0), ("b", 5.0)]
+            for i, config in zip(config_indices, configs)
+            for _ in range(runs)
+            for mean in [100 + (shift if i == 0 else 0.0)]
+        ]
+        # The first configuration of the first batch misses a row of "a"
+        if len(batches) == 1:
+            del rows[0]
+        df = pd.DataFrame(rows)
+        df.attrs[utils.AGGREGATIONS_ATTR] = {}
+        return df
+
+    def func(n: int) -> None:
+        pass
+
+    collector = collection.ncu.NCUCollector()
+    settings = collection.core.ProfileSettings(
+        configs=None,
+        runs=40,
+        output_progress=False,
+        output_detailed=False,
+        derive_metric=None,
+        normalize_against=None,
+        thermal_control=False,
+        output_prefix=None,
+        output_csv=False,
+        ab_test=["a", "b"],
+        ab_batch_runs=5,
+    )
+    sequential_p_values = transformation.sequential_p_values
+    with (
+        patch.object(collector, "_profile", side_effect=profile),
+        patch.object(
+            transformation, "sequential_p_values", side_effect=sequential_p_values
+        ) as p_values_mock,
+    ):
+        df = collector._profile_sequentially(
+            func, [(1,), (2,)], settings, "tag", MagicMock(), []
+        )
+
+    # Configuration 0 stops after the first batch, 1 runs up to the cap
+    assert batches[0] == ([0, 1], 5)
+    assert all(indices == [1] for indices, _ in batches[1:])
+    assert sum(runs for _, runs in batches) == 40
+    assert df.columns.tolist() == [
+        "Annotation",
+        "Value",
+        "PowerW",
+        "SequentialPValue",
+        "n",
+    ]
+    assert df["Annotation"].tolist() == ["a"] * 44 + ["b"] * 45
+    assert df["n"].tolist() == [1] * 4 + [2] * 40 + [1] * 5 + [2] * 40
+    p_values = df.groupby("n")["SequentialPValue"].first()
+    assert p_values[1] <= transformation.SIGNIFICANCE_LEVEL
+    assert p_values[2] > transformation.SIGNIFICANCE_LEVEL
+    assert df.attrs[utils.AGGREGATIONS_ATTR]["SequentialPValue"] == "first"
+    # The mixture variance of configuration 1 is fixed by the first batch
+    mixture_variances = [call.args[6][-1] for call in p_values_mock.call_args_list]
+    assert len(set(mixture_variances)) == 1
+
+
+def test_noise_floor_calibration(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a", "a"],
+            "Value": [10.0, 30.0],
+            "Metric": "gpu__time_duration.sum",
+            "GPU": "H100",
+            "ComputeClock": 1000,
+            "MemoryClock": 2000,
+            "n": [1, 2],
+        }
+    )
+    calibration_df = raw_df.assign(Value=[2.0, 4.0], n=0).drop(columns="n")
+    collector = MagicMock(
+        cache_control="all", clock_control="base", replay_mode="kernel"
+    )
+    collector.collect.return_value = calibration_df
+    settings = collection.core.ProfileSettings(
+        configs=None,
+        runs=5,
+        output_progress=False,
+        output_detailed=False,
+        derive_metric=None,
+        normalize_against=None,
+        thermal_control=False,
+        output_prefix=None,
+        output_csv=False,
+        noise_floor="subtract",
+    )
+
+    floors = collection.calibration.noise_floor(collector, settings, raw_df)
+    assert floors["NoiseFloor"].tolist() == [3.0, 3.0]
+    assert floors["NoiseFloorStdDev"].tolist() == pytest.approx([np.sqrt(2)] * 2)
+
+    # The empty kernel is profiled without the settings of the profiled function
+    func, configs, calibration_settings = collector.collect.call_args.args
+    assert func.__name__ == collection.calibration.KERNEL_NAME
+    assert configs == [()]
+    assert calibration_settings.runs == collection.calibration.CALIBRATION_RUNS
+    assert calibration_settings.noise_floor is None
+
+    # The second lookup is served from the cache
+    collection.calibration.noise_floor(collector, settings, raw_df)
+    assert collector.collect.call_count == 1
+
+    # Other profiling settings have a noise floor of their own
+    collector.replay_mode = "application"
+    collection.calibration.noise_floor(collector, settings, raw_df)
+    assert collector.collect.call_count == 2
+
+    df = collection.calibration.add_noise_floor(raw_df, floors, 1, subtract=True)
+    assert df.columns[-3:].tolist() == ["NoiseFloor", "NoiseFloorStdDev", "n"]
+    assert df["Value"].tolist() == [7.0, 27.0]
+    assert df.attrs[utils.AGGREGATIONS_ATTR]["NoiseFloor"] == "first"
+
+
 # Optional: Add helpers if you want to cleanly test env vars or command strings
 @pytest.fixture(autouse=True)  # type: ignore[misc]
 def patch_helpers(monkeypatch: Any) -> None:
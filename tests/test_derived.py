@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the derived metric expressions.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nsight import derived, extraction
+
+
+def test_expression_names() -> None:
+    assert derived.expression_names(
+        "2 * sm__sass_thread_inst_executed_op_ffma_pred_on.sum / "
+        "max(dram__bytes.sum, 1) + sqrt(n)"
+    ) == [
+        "sm__sass_thread_inst_executed_op_ffma_pred_on.sum",
+        "dram__bytes.sum",
+        "n",
+    ]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["dram__bytes.sum /", "__import__('os')", "open(n)", "n if n else 1", "'abc'"],
+)
+def test_invalid_expression(expression: str) -> None:
+    with pytest.raises(ValueError):
+        derived.parse_expression(expression)
+
+
+def test_required_metrics() -> None:
+    metrics = derived.required_metrics(
+        {
+            "Seconds": "gpu__time_duration.sum * 1e-9",
+            "GBps": "dram__bytes.sum / Seconds / 1e9",
+            "BytesPerElement": "dram__bytes.sum / n",
+        },
+        parameters=["n"],
+    )
+    assert metrics == ["gpu__time_duration.sum", "dram__bytes.sum"]
+
+    # Columns of the profiling data are not collected as metrics
+    metrics = derived.required_metrics(
+        {"PerSM": "Value * GridSize / NumSMs / ComputeClock + dram__bytes.sum"},
+        columns=extraction.DATA_COLUMNS,
+    )
+    assert metrics == ["dram__bytes.sum"]
+
+
+def test_cycle() -> None:
+    with pytest.raises(ValueError, match="cycle"):
+        derived.evaluation_order({"A": "B + 1", "B": "A * 2"})
+
+
+def test_evaluate_derived_metrics() -> None:
+    df = pd.DataFrame(
+        {
+            "gpu__time_duration.sum": [1e9, 2e9, None],
+            "dram__bytes.sum": [4e9, 4e9, 4e9],
+            "n": [1, 2, 4],
+        }
+    )
+    results = derived.evaluate_derived_metrics(
+        {
+            "GBps": "dram__bytes.sum / Seconds / 1e9",
+            "Seconds": "gpu__time_duration.sum * 1e-9",
+            "PerElement": "GBps / n",
+            "One": "1",
+        },
+        df,
+        len(df),
+    )
+
+    assert list(results) == ["Seconds", "One", "GBps", "PerElement"]
+    np.testing.assert_array_equal(results["GBps"], [4.0, 2.0, np.nan])
+    np.testing.assert_array_equal(results["PerElement"], [4.0, 1.0, np.nan])
+    np.testing.assert_array_equal(results["One"], [1.0, 1.0, 1.0])
+
+    with pytest.raises(ValueError, match="neither"):
+        derived.evaluate_derived_metrics({"X": "missing.sum"}, df, len(df))
@@ -0,0 +1,381 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the extraction of profiling data from NVIDIA Nsight Compute reports,
+using an in-memory stand-in for the ``ncu_report`` module.
+"""
+
+import math
+from collections.abc import Sequence
+from typing import Any
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from nsight import exceptions, extraction, transformation, utils
+
+DEVICE_ATTRIBUTES = {
+    "device__attribute_clock_rate": 1500000,
+    "device__attribute_memory_clock_rate": 5000000,
+    "device__attribute_display_name": "Test GPU",
+}
+
+
+class FakeMetric:
+    def __init__(self, value: Any):
+        self._value = value
+
+    def value(self) -> Any:
+        return self._value
+
+
+class FakeDomain:
+    def __init__(self, annotation: str):
+        self._annotation = annotation
+
+    def name(self) -> str:
+        return utils.NVTX_DOMAIN
+
+    def push_pop_ranges(self) -> list[str]:
+        return [self._annotation]
+
+
+class FakeNvtxState:
+    def __init__(self, annotation: str):
+        self._domain = FakeDomain(annotation)
+
+    def domains(self) -> list[int]:
+        return [0]
+
+    def domain_by_id(self, idx: int) -> FakeDomain:
+        return self._domain
+
+
+class FakeMetricEntry(FakeMetric):
+    def __init__(self, name: str, value: Any):
+        super().__init__(value)
+        self._name = name
+
+    def name(self) -> str:
+        return self._name
+
+
+class FakeSection:
+    def __init__(self, identifier: str, metrics: dict[str, Any]):
+        self._identifier = identifier
+        self._metrics = metrics
+
+    def identifier(self) -> str:
+        return self._identifier
+
+    def header_metrics(self) -> list[FakeMetricEntry]:
+        return [FakeMetricEntry(n, v) for n, v in self._metrics.items()]
+
+    def body_metrics(self) -> list[FakeMetricEntry]:
+        return []
+
+
+class FakeAction:
+    def __init__(
+        self,
+        name: str,
+        annotation: str,
+        metrics: dict[str, Any],
+        sections: dict[str, dict[str, Any]] | None = None,
+    ):
+        self._name = name
+        self._annotation = annotation
+        self._metrics = {**DEVICE_ATTRIBUTES, **metrics}
+        self._sections = sections or {}
+
+    def sections(self) -> list[FakeSection]:
+        return [FakeSection(i, m) for i, m in self._sections.items()]
+
+    def name(self) -> str:
+        return self._name
+
+    def metric_by_name(self, name: str) -> FakeMetric | None:
+        if name not in self._metrics:
+            return None
+        return FakeMetric(self._metrics[name])
+
+    def __getitem__(self, name: str) -> FakeMetric:
+        metric = self.metric_by_name(name)
+        if metric is None:
+            raise KeyError(name)
+        return metric
+
+    def nvtx_state(self) -> FakeNvtxState:
+        return FakeNvtxState(self._annotation)
+
+
+class FakeReport:
+    def __init__(self, actions: Sequence[FakeAction]):
+        self._actions = list(actions)
+
+    def num_ranges(self) -> int:
+        return 1
+
+    def range_by_idx(self, idx: int) -> "FakeReport":
+        return self
+
+    def num_actions(self) -> int:
+        return len(self._actions)
+
+    def action_by_idx(self, idx: int) -> FakeAction:
+        return self._actions[idx]
+
+
+def make_report(
+    values: Sequence[dict[str, Any]],
+    annotation: str = "test",
+    sections: Sequence[dict[str, dict[str, Any]]] | None = None,
+) -> FakeReport:
+    sections = sections or [{} for _ in values]
+    return FakeReport(
+        [FakeAction("kernel", annotation, v, s) for v, s in zip(values, sections)]
+    )
+
+
+def kernel_func(n: int) -> None:
+    pass
+
+
+def extract(reports: dict[str, FakeReport], **kwargs: Any) -> pd.DataFrame:
+    kwargs.setdefault("configs", [(1,), (2,)])
+    kwargs.setdefault("iterations", 2)
+    with patch(
+        "nsight.extraction.ncu_report.load_report", side_effect=lambda p: reports[p]
+    ):
+        return extraction.extract_df_from_report(
+            "main.ncu-rep",
+            kwargs.pop("metric", "gpu__time_duration.sum"),
+            kwargs.pop("configs"),
+            kwargs.pop("iterations"),
+            kwargs.pop("func", kernel_func),
+            kwargs.pop("derive_metric", None),
+            None,
+            False,
+            **kwargs,
+        )
+
+
+def test_extract_single_metric() -> None:
+    report = make_report([{"gpu__time_duration.sum": v} for v in [1, 2, 3, 4]])
+    df = extract({"main.ncu-rep": report})
+
+    assert df["Value"].tolist() == [1, 2, 3, 4]
+    assert df["n"].tolist() == [1, 1, 2, 2]
+    assert df.columns[-1] == "n"
+
+    # The configurations can be identified explicitly
+    df = extract({"main.ncu-rep": report}, config_indices=[3, 5])
+    assert df[extraction.CONFIG_INDEX_COLUMN].tolist() == [3, 3, 5, 5]
+    assert df.columns[-2:].tolist() == [extraction.CONFIG_INDEX_COLUMN, "n"]
+
+
+def test_extract_extra_metrics_from_partial_reports() -> None:
+    main = make_report(
+        [
+            {"gpu__time_duration.sum": t, "dram__bytes.sum": b}
+            for t, b in [(1, 10), (2, 20), (3, 30), (4, 40)]
+        ]
+    )
+    partial = make_report([{"sm__inst_executed.sum": i} for i in [100, 200, 300, 400]])
+    df = extract(
+        {"main.ncu-rep": main, "part1.ncu-rep": partial},
+        extra_metrics=["dram__bytes.sum", "sm__inst_executed.sum"],
+        partial_reports=[("part1.ncu-rep", ["sm__inst_executed.sum"])],
+    )
+
+    assert df["Value"].tolist() == [1, 2, 3, 4]
+    assert df["dram__bytes.sum"].tolist() == [10, 20, 30, 40]
+    assert df["sm__inst_executed.sum"].tolist() == [100, 200, 300, 400]
+    assert df.columns[-1] == "n"
+
+    agg = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg["AvgValue"].tolist() == [1.5, 3.5]
+    assert agg["dram__bytes.sum"].tolist() == [15, 35]
+    assert agg["sm__inst_executed.sum"].tolist() == [150, 350]
+
+
+def test_extract_partial_report_mismatch() -> None:
+    main = make_report([{"gpu__time_duration.sum": t} for t in [1, 2, 3, 4]])
+    partial = make_report([{"sm__inst_executed.sum": i} for i in [100, 200]])
+
+    with pytest.raises(exceptions.ProfilerException, match="different number"):
+        extract(
+            {"main.ncu-rep": main, "part1.ncu-rep": partial},
+            extra_metrics=["sm__inst_executed.sum"],
+            partial_reports=[("part1.ncu-rep", ["sm__inst_executed.sum"])],
+        )
+
+
+def test_extract_section_metrics() -> None:
+    sections: list[dict[str, dict[str, Any]]] = [
+        {
+            "SpeedOfLight": {"sm__throughput.avg.pct": v, "gpu__time_duration.sum": v},
+            "LaunchStats": {"launch__block_size": 256, "launch__func_name": "k"},
+            "Occupancy": {"sm__warps_active.avg.pct": 50.0},
+        }
+        for v in [10.0, 20.0, 30.0, 40.0]
+    ]
+    report = make_report(
+        [{"gpu__time_duration.sum": v} for v in [1, 2, 3, 4]], sections=sections
+    )
+    df = extract({"main.ncu-rep": report}, sections=["SpeedOfLight", "LaunchStats"])
+
+    # The primary metric is not duplicated and string metrics are skipped
+    assert "gpu__time_duration.sum" not in df.columns
+    assert "launch__func_name" not in df.columns
+    assert "sm__warps_active.avg.pct" not in df.columns
+    assert df["sm__throughput.avg.pct"].tolist() == [10.0, 20.0, 30.0, 40.0]
+    assert df.columns[-1] == "n"
+
+    agg = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg["sm__throughput.avg.pct"].tolist() == [15.0, 35.0]
+    assert agg["launch__block_size"].tolist() == [256, 256]
+
+    df = extract({"main.ncu-rep": report}, all_sections=True)
+    assert df["sm__warps_active.avg.pct"].tolist() == [50.0] * 4
+
+
+def test_extract_launch_stats() -> None:
+    launch = {
+        "launch__grid_size": 64,
+        "launch__block_size": 128,
+        "launch__registers_per_thread": 32,
+        "launch__shared_mem_per_block_static": 0,
+        "launch__shared_mem_per_block_dynamic": 4096,
+        "launch__waves_per_multiprocessor": 0.5,
+    }
+    report = make_report(
+        [{"gpu__time_duration.sum": v, **launch} for v in [1, 2, 3, 4]]
+    )
+    df = extract({"main.ncu-rep": report})
+
+    assert df["BlockSize"].tolist() == [128] * 4
+    assert df["DynamicSharedMemoryPerBlock"].tolist() == [4096] * 4
+    assert df.columns[-1] == "n"
+
+    agg = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg["GridSize"].tolist() == [64, 64]
+    assert agg["WavesPerSM"].tolist() == [0.5, 0.5]
+
+
+def test_combine_launch_stats() -> None:
+    lhs = utils.NCUActionData(
+        "a",
+        1,
+        1,
+        1,
+        "gpu",
+        metrics={"x": 1.0, "y": 2.0},
+        launch_stats={"BlockSize": 128, "ComputeCapability": "8.0", "NumSMs": None},
+    )
+    rhs = utils.NCUActionData(
+        "b",
+        2,
+        1,
+        1,
+        "gpu",
+        metrics={"x": 3.0},
+        launch_stats={"BlockSize": 256, "ComputeCapability": "8.0", "NumSMs": 108},
+    )
+
+    combined = utils.NCUActionData.combine(lambda x, y: x + y)(lhs, rhs)
+    assert combined.value == 3
+    # Numeric launch statistics stay numeric
+    assert combined.launch_stats == {
+        "BlockSize": 256,
+        "ComputeCapability": "8.0",
+        "NumSMs": 108,
+    }
+    # Metrics reported for only one kernel are combined with NaN
+    assert combined.metrics["x"] == 4.0
+    assert math.isnan(combined.metrics["y"])
+
+    combined = utils.NCUActionData.combine(lambda x, y: x + y)(lhs, lhs)
+    assert combined.launch_stats == lhs.launch_stats
+
+
+def test_extract_occupancy() -> None:
+    device = {
+        "device__attribute_compute_capability_major": 8,
+        "device__attribute_compute_capability_minor": 0,
+        "device__attribute_multiprocessor_count": 108,
+    }
+    launch = {
+        "launch__grid_size": 216,
+        "launch__block_size": 256,
+        "launch__registers_per_thread": 64,
+        "launch__shared_mem_per_block_static": 0,
+        "launch__shared_mem_per_block_dynamic": 0,
+    }
+    report = make_report(
+        [{"gpu__time_duration.sum": v, **device, **launch} for v in [1, 2, 3, 4]]
+    )
+    df = extract({"main.ncu-rep": report})
+
+    assert df["ComputeCapability"].tolist() == ["8.0"] * 4
+    assert df["TheoreticalOccupancyPct"].tolist() == [50.0] * 4
+    assert df["OccupancyLimiter"].tolist() == ["Registers"] * 4
+    assert df["PredictedWavesPerSM"].tolist() == [0.5] * 4
+    assert df.columns[-1] == "n"
+
+    agg = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg["ActiveBlocksPerSM"].tolist() == [4, 4]
+
+    # Without the device attributes, the occupancy is unknown
+    report = make_report(
+        [{"gpu__time_duration.sum": v, **launch} for v in [1, 2, 3, 4]]
+    )
+    df = extract({"main.ncu-rep": report})
+    assert df["ComputeCapability"].isna().all()
+    assert df["TheoreticalOccupancyPct"].isna().all()
+
+
+def test_extract_vectorized_derive_metric() -> None:
+    report = make_report([{"gpu__time_duration.sum": v} for v in [1, 2, 3, 4]])
+
+    def per_row(value: float, n: int) -> float:
+        return value * n
+
+    calls = 0
+
+    @transformation.vectorized
+    def per_column(values: Any, n: Any) -> Any:
+        nonlocal calls
+        calls += 1
+        return values * n
+
+    expected = extract({"main.ncu-rep": report}, derive_metric=per_row)
+    df = extract({"main.ncu-rep": report}, derive_metric=per_column)
+
+    assert calls == 1
+    assert df["Value"].tolist() == expected["Value"].tolist() == [1, 2, 6, 8]
+    assert df["Transformed"].tolist() == ["per_column"] * 4
+
+
+def test_extract_derived_metrics() -> None:
+    report = make_report(
+        [
+            {"gpu__time_duration.sum": t, "dram__bytes.sum": b}
+            for t, b in [(1, 10), (2, 20), (4, 20), (5, 50)]
+        ]
+    )
+    df = extract(
+        {"main.ncu-rep": report},
+        extra_metrics=["dram__bytes.sum"],
+        derived={"BytesPerNs": "dram__bytes.sum / gpu__time_duration.sum * n"},
+        derive_metric=lambda value, n: value * 100,
+    )
+
+    assert df["Value"].tolist() == [100, 200, 400, 500]
+    assert df["BytesPerNs"].tolist() == [10, 10, 10, 20]
+    assert df.columns[-1] == "n"
+
+    agg = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg["BytesPerNs"].tolist() == [10, 15]
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the import time of the package, in particular in the child process
+profiled by ncu.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Modules the profiled child process must not import
+HEAVY_MODULES = ["matplotlib", "pandas", "scipy", "ncu_report", "PIL", "sqlite3"]
+
+# Prints the loaded modules, and the modules of the package which imported numpy
+# themselves, when the child process exits, which is right after profiling if the
+# function is profiled. numpy itself is imported by nvtx.
+CHILD_SCRIPT = textwrap.dedent("""
+    import os
+    import sys
+
+    import nsight
+
+    def report(code):
+        print(",".join(sorted({name.split(".")[0] for name in sys.modules})))
+        print(",".join(
+            sorted(
+                name
+                for name, module in list(sys.modules.items())
+                if name.startswith("nsight") and "np" in vars(module)
+            )
+        ))
+        sys.stdout.flush()
+        real_exit(code)
+
+    real_exit, os._exit = os._exit, report
+
+    @nsight.analyze.plot(plot_type="bar")
+    @nsight.analyze.kernel(configs=[(1,), (2,)], runs=3, thermal_control=False)
+    def benchmark(n):
+        with nsight.annotate("kernel"):
+            pass
+
+    benchmark()
+    os._exit(0)
+    """)
+
+
+def _run(args: list[str], profiled: str | None) -> subprocess.CompletedProcess[str]:
+    env = os.environ.copy()
+    env.pop("NSPY_NCU_PROFILE", None)
+    if profiled is not None:
+        env["NSPY_NCU_PROFILE"] = profiled
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def _import_time(module: str) -> float:
+    """Returns the cumulative import time of a module in microseconds."""
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"], None).stderr
+    lines = [line for line in stderr.splitlines() if line.startswith("import time:")]
+    return float(lines[-1].split("|")[1])
+
+
+@pytest.mark.parametrize("profiled", ["benchmark", "other_function"])
+def test_child_imports(profiled: str) -> None:
+    # The profiled function runs through run_profile_session before exiting
+    lines = _run(["-c", CHILD_SCRIPT], profiled).stdout.splitlines()
+    loaded = set(lines[-2].split(","))
+    assert "nsight" in loaded
+    assert not loaded.intersection(HEAVY_MODULES)
+    assert lines[-1] == ""
+
+
+def test_import_time() -> None:
+    # Importing the package takes less time than importing pandas alone
+    assert _import_time("nsight") < _import_time("pandas")
+
+
+def test_lazy_attributes() -> None:
+    script = textwrap.dedent("""
+        import sys
+
+        import nsight
+
+        assert "nsight.visualization" not in sys.modules
+        assert nsight.visualization.visualize
+        assert nsight.vectorized is nsight.transformation.vectorized
+        assert "store" in dir(nsight)
+        """)
+    _run(["-c", script], None)
+
+    import nsight
+
+    with pytest.raises(AttributeError):
+        nsight.missing
@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import numpy as np
+import pandas as pd
+
+from nsight import occupancy
+
+
+def test_theoretical_occupancy_limiters() -> None:
+    result = occupancy.theoretical_occupancy(
+        block_size=[128, 256, 1024, 32],
+        registers_per_thread=[32, 64, 32, 16],
+        shared_memory_per_block=[0, 0, 48 * 1024, 0],
+        compute_capability="8.0",
+    )
+
+    assert result["ActiveBlocksPerSM"].tolist() == [16, 4, 2, 32]
+    assert result["TheoreticalOccupancyPct"].tolist() == [100, 50, 100, 50]
+    assert result["OccupancyLimiter"].tolist() == [
+        "Warps",
+        "Registers",
+        "Warps",
+        "Blocks",
+    ]
+    assert result["PredictedWavesPerSM"].isna().all()
+
+
+def test_theoretical_occupancy_shared_memory_and_waves() -> None:
+    result = occupancy.theoretical_occupancy(
+        block_size=128,
+        shared_memory_per_block=64 * 1024,
+        compute_capability="8.6",
+        grid_size=np.array([84, 168]),
+        num_sms=84,
+    )
+
+    assert result["ActiveBlocksPerSM"].tolist() == [1, 1]
+    assert result["OccupancyLimiter"].tolist() == ["SharedMemory"] * 2
+    assert result["PredictedWavesPerSM"].tolist() == [1, 2]
+
+
+def test_theoretical_occupancy_invalid_inputs() -> None:
+    result = occupancy.theoretical_occupancy(
+        block_size=pd.Series([256, None, "128|256", 256]),
+        compute_capability=["8.9", "8.9", "8.9", "1.0"],
+    )
+
+    assert result["ActiveBlocksPerSM"].tolist()[0] == 6
+    assert result["TheoreticalOccupancyPct"].iloc[1:].isna().all()
+    assert result["OccupancyLimiter"].iloc[1:].isna().all()
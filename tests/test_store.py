@@ -0,0 +1,143 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the database of profiling results.
+"""
+
+import pathlib
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nsight import collection, exceptions, store
+
+
+def make_results(avg: list[float], gpu: str = "H100") -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Annotation": ["a", "a", "b"],
+            "n": [1, 2, 1],
+            "dtype": ["float", "float", "half"],
+            "AvgValue": avg,
+            "StdDev": [1.0, 1.0, np.nan],
+            "MinValue": avg,
+            "MaxValue": avg,
+            "NumRuns": [20, 20, 1],
+            "Metric": "gpu__time_duration.sum",
+            "GPU": gpu,
+            "Host": "node1",
+        }
+    )
+
+
+def test_results_store(tmp_path: pathlib.Path) -> None:
+    results_store = store.ResultsStore(str(tmp_path / "results.db"))
+    results_store.append(make_results([10.0, 20.0, 30.0]), "bench", "v1", 1.0)
+    results_store.append(make_results([11.0, 21.0, 31.0]), "bench", "v2", 2.0)
+    results_store.append(make_results([12.0, 22.0, 32.0]), "bench", "v2", 3.0)
+    results_store.append(make_results([5.0, 5.0, 5.0]), "other", "v3", 4.0)
+
+    assert results_store.revisions("bench") == ["v1", "v2"]
+
+    # The latest results of a revision replace earlier ones
+    loaded = results_store.load("bench", "v2")
+    assert loaded["AvgValue"].tolist() == [12.0, 22.0, 32.0]
+    assert loaded["Config"][2] == '{"dtype": "half", "n": 1}'
+    assert np.isnan(loaded["StdDev"][2])
+    assert len(results_store.load("bench")) == 6
+    assert results_store.load("bench", gpu="A100").empty
+
+    # Only the requested revisions and columns are loaded
+    latest = results_store.load("bench", last=1, columns=["Revision", "AvgValue"])
+    assert latest.columns.tolist() == ["Revision", "AvgValue"]
+    assert latest["Revision"].unique().tolist() == ["v2"]
+
+
+def test_compare_to_baseline(tmp_path: pathlib.Path) -> None:
+    pytest.importorskip("scipy")
+    results_store = store.ResultsStore(str(tmp_path / "results.db"))
+    results_store.append(make_results([10.0, 20.0, 30.0]), "bench", "v1")
+    results_store.append(make_results([100.0, 100.0, 100.0], "A100"), "bench", "v1")
+
+    current = make_results([12.0, 19.0, 60.0])
+    compared = store.compare_to_baseline(results_store, current, "bench")
+
+    assert compared["BaselineValue"].tolist() == [10.0, 20.0, 30.0]
+    assert compared["ChangePct"].tolist() == pytest.approx([20.0, -5.0, 100.0])
+    # A single run has no variance to test against
+    assert compared["Regression"].tolist() == [True, False, False]
+
+    compared = store.compare_to_baseline(
+        results_store, current, "bench", higher_is_better=True
+    )
+    assert compared["Regression"].tolist() == [False, True, False]
+
+    compared = store.compare_to_baseline(
+        results_store, current, "bench", min_change_pct=25.0
+    )
+    assert not compared["Regression"].any()
+
+    with pytest.raises(exceptions.ProfilerException):
+        store.compare_to_baseline(results_store, current, "bench", "v0")
+    with pytest.raises(exceptions.ProfilerException):
+        store.compare_to_baseline(results_store, current, "missing")
+
+
+def test_detect_regressions(tmp_path: pathlib.Path) -> None:
+    pytest.importorskip("scipy")
+    results_store = store.ResultsStore(str(tmp_path / "results.db"))
+    results_store.append(make_results([10.0, 20.0, 30.0]), "bench", "v1", 1.0)
+    results_store.append(make_results([10.2, 30.0, 30.0]), "bench", "v2", 2.0)
+    results_store.append(make_results([10.1, 30.0, 30.0]), "bench", "v3", 3.0)
+
+    history = store.detect_regressions(results_store.load("bench"))
+
+    assert history["Revision"].tolist() == ["v1"] * 3 + ["v2"] * 3 + ["v3"] * 3
+    # The first revision has nothing to compare against
+    assert history["PValue"][:3].isna().all()
+    assert history["ChangePct"][4] == pytest.approx(50.0)
+    assert history["Regression"].tolist() == [False] * 4 + [True] + [False] * 4
+
+
+def test_profiler_stores_unnormalized_results(tmp_path: pathlib.Path) -> None:
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a", "a", "b", "b"],
+            "Value": [10.0, 12.0, 20.0, 24.0],
+            "Metric": "gpu__time_duration.sum",
+            "GPU": "H100",
+            "Host": "node1",
+            "n": 1,
+        }
+    )
+    collector = MagicMock()
+    collector.collect.return_value = raw_df
+    settings = collection.core.ProfileSettings(
+        configs=[(1,)],
+        runs=2,
+        output_progress=False,
+        output_detailed=False,
+        derive_metric=None,
+        normalize_against="a",
+        thermal_control=False,
+        output_prefix=None,
+        output_csv=False,
+        store=str(tmp_path / "results.db"),
+        revision="v1",
+    )
+
+    def bench(n: int) -> None:
+        pass
+
+    results = collection.core.NsightProfiler(settings, collector)(bench)()
+    assert results is not None
+    assert results.to_dataframe()["AvgValue"].tolist() == [1.0, 0.5]
+
+    # The mean and the spread of the stored results share the unit of the metric
+    stored = store.ResultsStore(str(tmp_path / "results.db")).load("bench", "v1")
+    assert stored["Metric"].tolist() == ["gpu__time_duration.sum"] * 2
+    assert stored["AvgValue"].tolist() == [11.0, 22.0]
+    assert stored["StdDev"].tolist() == pytest.approx([np.sqrt(2), np.sqrt(8)])
@@ -0,0 +1,287 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the background sampling of GPU telemetry.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections.abc import Callable
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import nsight
+from nsight import annotation, collection, exceptions, telemetry, transformation, utils
+
+
+def make_reader() -> tuple[list[list[float]], Callable[[], list[float]]]:
+    """Returns the samples read so far and a reader of distinct fake samples."""
+    samples: list[list[float]] = []
+    counter = itertools.count()
+
+    def read() -> list[float]:
+        i = next(counter)
+        samples.append([100.0 + i, 50.0 + i, 1500.0, np.nan, float(1 << (i % 3))])
+        return samples[-1]
+
+    return samples, read
+
+
+def test_telemetry_sampler() -> None:
+    samples, read = make_reader()
+    sampler = telemetry.TelemetrySampler(0.001, capacity=4, read=read)
+    sampler.sample()
+    sampler.start_run()
+    for _ in range(5):
+        sampler.sample()
+    first = sampler.end_run()
+
+    # The ring buffer only holds the last samples of a long run
+    assert first["PowerW"] == pytest.approx(np.mean([s[0] for s in samples[-4:]]))
+    assert first["MaxTemperatureC"] == samples[-1][1]
+    assert first["SMClockMHz"] == 1500.0
+    assert np.isnan(first["MemoryClockMHz"])
+    assert first["ThrottleReasons"] == 7
+
+    # A run shorter than the interval has the sample read at its end
+    sampler.start_run()
+    second = sampler.end_run()
+    assert second["PowerW"] == samples[-1][0]
+    assert second["ThrottleReasons"] == samples[-1][4]
+    assert sampler.summaries == [first, second]
+
+    # The background thread samples until it is stopped
+    num_samples = len(samples)
+    with sampler:
+        time.sleep(0.05)
+    assert len(samples) > num_samples + 10
+    num_samples = len(samples)
+    time.sleep(0.01)
+    assert len(samples) == num_samples
+
+    with pytest.raises(ValueError):
+        telemetry.TelemetrySampler(0)
+
+
+def test_add_telemetry_columns() -> None:
+    # Two annotations, two configurations and two runs, ordered by run
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 4 + ["b"] * 4,
+            "Value": np.arange(8.0),
+            "n": [1, 1, 2, 2] * 2,
+        }
+    )
+    summaries = [
+        {
+            "PowerW": 100.0 * (run + 1),
+            "MaxTemperatureC": 50.0 + run,
+            "SMClockMHz": 1500.0,
+            "MemoryClockMHz": np.nan,
+            "ThrottleReasons": float(1 << run),
+        }
+        for run in range(4)
+    ]
+
+    df = telemetry.add_telemetry_columns(raw_df, summaries, 1)
+    assert df.columns.tolist() == [
+        "Annotation",
+        "Value",
+        *telemetry.TELEMETRY_COLUMNS,
+        "n",
+    ]
+    assert df["PowerW"].tolist() == [100.0, 200.0, 300.0, 400.0] * 2
+
+    agg_df = transformation.aggregate_data(df, lambda n: None, None, False)
+    assert agg_df["PowerW"].tolist() == [150.0, 350.0] * 2
+    assert agg_df["MaxTemperatureC"].tolist() == [51.0, 53.0] * 2
+    assert agg_df["ThrottleReasons"].tolist() == [3.0, 12.0] * 2
+    assert agg_df["MemoryClockMHz"].isna().all()
+
+    with pytest.raises(exceptions.ProfilerException):
+        telemetry.add_telemetry_columns(raw_df, summaries[:3], 1)
+
+
+def test_run_profile_session_telemetry(tmp_path: str) -> None:
+    samples, read = make_reader()
+    path = os.path.join(tmp_path, "telemetry.json")
+
+    with patch("nsight.telemetry._nvml_reader", return_value=read):
+        collection.core.run_profile_session(
+            lambda n: None, [(1,), (2,), (3,)], 2, False, False, False, 0.001, path
+        )
+
+    summaries = telemetry.load_records(path)
+    assert len(summaries) == 6
+    assert list(summaries[0]) == list(telemetry.TELEMETRY_COLUMNS)
+    assert summaries[-1]["MaxTemperatureC"] == samples[-1][1]
+
+    # Sampling and energy measurement stop when the profiled function fails
+    def fail(n: int) -> None:
+        with nsight.annotate("kernel"):
+            raise RuntimeError("kernel failed")
+
+    num_threads = threading.active_count()
+    with (
+        patch("nsight.telemetry._nvml_reader", return_value=read),
+        patch("nsight.telemetry._nvml_handle", return_value="handle"),
+        patch("nsight.thermovision.get_gpu_energy", return_value=1.0),
+        patch("nsight.utils.synchronize_device"),
+        pytest.raises(RuntimeError),
+    ):
+        collection.core.run_profile_session(
+            fail, [(1,)], 2, False, False, False, 0.001, path, path
+        )
+    assert threading.active_count() == num_threads
+    assert annotation.ENERGY_METER is None
+
+    with pytest.raises(exceptions.ProfilerException):
+        telemetry.load_records(os.path.join(tmp_path, "missing.json"))
+
+
+def test_energy_meter() -> None:
+    counter = itertools.count()
+    synchronized: list[None] = []
+    meter = telemetry.EnergyMeter(
+        read=lambda: 1.5 * next(counter),
+        synchronize=lambda: synchronized.append(None),
+    )
+    meter.start()
+
+    def func(n: int) -> None:
+        with nsight.annotate("a"):
+            next(counter)
+        with nsight.annotate("b"):
+            pass
+
+    # Short functions are called repeatedly until the batch is long enough
+    meter.max_batch_calls = 3
+    meter.measure(func, (1,))
+    assert meter.records == [("a", 3.0), ("b", 1.5)]
+    assert len(synchronized) == 12
+    assert annotation.ENERGY_METER is None
+
+    # Long functions are called once
+    with patch("nsight.telemetry.ENERGY_MIN_BATCH_SECONDS", 0):
+        meter.measure(func, (1,))
+    assert meter.records[2:] == [("a", 3.0), ("b", 1.5)]
+
+    # The regions are not NVTX ranges while measuring
+    with patch("nvtx.annotate.__enter__") as enter:
+        meter.measure(func, (1,))
+    enter.assert_not_called()
+
+    # Regions without an energy counter are NaN
+    meter = telemetry.EnergyMeter(read=lambda: None, synchronize=lambda: None)
+    meter.start()
+    meter.measure(func, (1,))
+    assert np.isnan(meter.records[0][1])
+
+
+def test_energy_meter_device(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "2,3")
+    with (
+        patch("nsight.telemetry._nvml_handle", return_value="handle2") as handle,
+        patch("nsight.thermovision.get_gpu_energy", return_value=5.0) as energy,
+    ):
+        meter = telemetry.EnergyMeter(synchronize=lambda: None)
+        meter.start()
+        meter.start_region()
+    handle.assert_called_once_with(2)
+    energy.assert_called_once_with("handle2")
+
+
+def test_add_energy_columns() -> None:
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a", "a", "b", "b"],
+            "Value": [1.0, 2.0, 3.0, 4.0],
+            "n": [1, 2, 1, 2],
+        }
+    )
+    # The annotations alternate within every run
+    records = [["a", 2.0], ["b", 4.0], ["a", 0.0], ["b", np.nan]]
+
+    df = telemetry.add_energy_columns(raw_df, records, 1)
+    assert df.columns.tolist() == ["Annotation", "Value", "Energy_J", "n"]
+    np.testing.assert_array_equal(df["Energy_J"], [2.0, 0.0, 4.0, np.nan])
+
+    with pytest.raises(exceptions.ProfilerException):
+        telemetry.add_energy_columns(raw_df, records[:3], 1)
+
+    # The calls per joule are the inverse of the aggregated energy
+    df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 4 + ["b"] * 2,
+            "Value": 1.0,
+            "Energy_J": [1.0, 3.0, 0.0, 0.0, 4.0, np.nan],
+            "n": [1, 1, 2, 2, 1, 1],
+        }
+    )
+    df.attrs[utils.AGGREGATIONS_ATTR] = telemetry.ENERGY_COLUMNS
+    agg_df = transformation.aggregate_data(df, lambda n: None, None, False)
+    agg_df = telemetry.perf_per_watt(agg_df)
+    position = agg_df.columns.get_loc("Energy_J")
+    assert agg_df.columns[position + 1] == "PerfPerWatt"
+    np.testing.assert_array_equal(agg_df["PerfPerWatt"], [0.5, np.nan, 0.25])
+
+    energy_df = transformation.select_metric(df.replace(0.0, np.nan), "Energy_J")
+    agg_df = transformation.aggregate_data(energy_df, lambda n: None, None, False)
+    agg_df = telemetry.perf_per_watt(agg_df, "AvgValue")
+    np.testing.assert_array_equal(agg_df["PerfPerWatt"], [0.5, np.nan, 0.25])
+
+    with pytest.raises(ValueError):
+        telemetry.perf_per_watt(agg_df)
+
+
+def test_run_profile_session_energy(tmp_path: str) -> None:
+    path = os.path.join(tmp_path, "energy.json")
+    counter = itertools.count()
+    calls: list[int] = []
+
+    def func(n: int) -> None:
+        calls.append(n)
+        with nsight.annotate("kernel"):
+            pass
+
+    with (
+        patch("nsight.telemetry._nvml_handle", return_value="handle"),
+        patch(
+            "nsight.thermovision.get_gpu_energy",
+            side_effect=lambda handle: float(next(counter)),
+        ),
+        patch("nsight.utils.synchronize_device"),
+        patch("nsight.telemetry.ENERGY_MIN_BATCH_SECONDS", 0),
+    ):
+        collection.core.run_profile_session(
+            func, [(1,), (2,)], 3, False, False, False, energy_path=path
+        )
+
+    # Every profiled run is followed by a measured call
+    assert calls == [1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2]
+    assert telemetry.load_records(path) == [["kernel", 1.0]] * 6
+    assert annotation.ENERGY_METER is None
+
+    # Short functions are called at most energy_batch_calls extra times per run
+    calls.clear()
+    with (
+        patch("nsight.telemetry._nvml_handle", return_value="handle"),
+        patch("nsight.thermovision.get_gpu_energy", return_value=0.0),
+        patch("nsight.utils.synchronize_device"),
+        patch("nsight.telemetry.ENERGY_MIN_BATCH_SECONDS", 60),
+    ):
+        collection.core.run_profile_session(
+            func, [(1,)], 2, False, False, False, energy_path=path, energy_batch_calls=2
+        )
+    assert calls == [1] * 6
+
+    # Without energy, the function is only called for the profiled runs
+    calls.clear()
+    collection.core.run_profile_session(func, [(1,), (2,)], 3, False, False, False)
+    assert calls == [1, 1, 1, 2, 2, 2]
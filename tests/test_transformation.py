@@ -0,0 +1,432 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the processing of raw profiling data.
+"""
+
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nsight import aggregates, exceptions, transformation, utils
+
+
+def test_roofline() -> None:
+    agg_df = pd.DataFrame(
+        {
+            "Annotation": ["a", "a", "a"],
+            "n": [1, 2, 3],
+            "AvgValue": [1.0, 1.0, 1.0],
+            "ArithmeticIntensity": [1.0, 100.0, np.nan],
+            "AttainedFLOPs": [5e11, 5e12, np.nan],
+            "PeakFLOPs": [1e13] * 3,
+            "PeakBandwidth": [1e12] * 3,
+            "FLOP": [1.0] * 3,
+        }
+    )
+    result = transformation.roofline(agg_df)
+
+    assert result["RidgePoint"].tolist() == [10.0] * 3
+    assert result["Bound"].tolist()[:2] == ["Memory", "Compute"]
+    assert pd.isna(result["Bound"][2])
+    assert result["RooflineFLOPs"].tolist()[:2] == [1e12, 1e13]
+    assert result["RooflineEfficiencyPct"].tolist()[:2] == [50.0, 50.0]
+
+    with pytest.raises(exceptions.ProfilerException, match="roofline=True"):
+        transformation.roofline(agg_df.drop(columns="PeakFLOPs"))
+
+
+def make_raw_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Annotation": ["a"] * 4 + ["b"] * 4,
+            "Value": [1.0, 3.0, 4.0, np.nan, 2.0, 2.0, 8.0, 8.0],
+            "Metric": ["gpu__time_duration.sum"] * 8,
+            "Kernel": ["k1", "k2"] * 4,
+            "GPU": ["gpu"] * 8,
+            "shape": [(1, 2), (1, 2), "large", "large"] * 2,
+            "n": [2, 2, 1, 1] * 2,
+        }
+    )
+
+
+def kernel_func(shape: Any, n: int) -> None:
+    pass
+
+
+def test_aggregate_data() -> None:
+    agg_df = transformation.aggregate_data(make_raw_df(), kernel_func, None, False)
+
+    # Configurations keep their order and non-sortable values become strings
+    assert agg_df["Annotation"].tolist() == ["a", "a", "b", "b"]
+    assert agg_df["shape"].tolist() == ["(1, 2)", "large"] * 2
+    assert agg_df["n"].tolist() == [2, 1, 2, 1]
+    assert agg_df["n"].dtype == np.int64
+    assert agg_df["AvgValue"].tolist() == [2.0, 4.0, 2.0, 8.0]
+    assert agg_df["NumRuns"].tolist() == [2, 1, 2, 2]
+    assert agg_df["Kernel"].tolist() == ["k1"] * 4
+    assert agg_df["Geomean"].tolist() == pytest.approx([np.sqrt(8)] * 2 + [4.0] * 2)
+
+    agg_df = transformation.aggregate_data(make_raw_df(), kernel_func, "b", False)
+    assert agg_df["AvgValue"].tolist() == [1.0, 2.0, 1.0, 1.0]
+
+
+def test_aggregate_data_geomean() -> None:
+    rng = np.random.default_rng(2)
+    values = rng.lognormal(5, 3, 3 * 500)
+    values[[10, 700]] = [np.nan, -1.0]
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": np.repeat(["a", "b", "c"], 500),
+            "Value": values,
+            "Metric": "gpu__time_duration.sum",
+            "n": np.tile(np.arange(500), 3),
+        }
+    )
+
+    def func(n: int) -> None:
+        pass
+
+    agg_df = transformation.aggregate_data(raw_df, func, None, False)
+
+    # Matches the geometric mean of every annotation computed one at a time,
+    # bit for bit, ignoring missing values and the logarithm of a negative value
+    expected = {}
+    for annotation in agg_df["Annotation"].unique():
+        valid = agg_df.loc[agg_df["Annotation"] == annotation, "AvgValue"].dropna()
+        with np.errstate(invalid="ignore"):
+            expected[annotation] = np.exp(np.mean(np.log(valid)))
+    assert agg_df["Geomean"].tolist() == agg_df["Annotation"].map(expected).tolist()
+    assert agg_df["Geomean"].notna().all()
+
+
+def test_select_metric() -> None:
+    raw_df = make_raw_df()
+    raw_df.insert(4, "Energy_J", [2.0, 4.0, 1.0, 1.0, 5.0, 7.0, 3.0, np.nan])
+    raw_df.attrs[utils.AGGREGATIONS_ATTR] = {"Energy_J": "mean"}
+
+    df = transformation.select_metric(raw_df, "Energy_J")
+    assert "Energy_J" not in df.columns
+    assert df.columns[-2:].tolist() == ["shape", "n"]
+    assert df.attrs[utils.AGGREGATIONS_ATTR] == {}
+    assert raw_df["Value"][0] == 1.0
+
+    agg_df = transformation.aggregate_data(df, kernel_func, None, False)
+    assert agg_df["Metric"].tolist() == ["Energy_J"] * 4
+    assert agg_df["AvgValue"].tolist() == [3.0, 1.0, 6.0, 3.0]
+
+    with pytest.raises(ValueError):
+        transformation.select_metric(raw_df, "PowerW")
+
+
+def test_aggregate_data_varying_column() -> None:
+    df = make_raw_df()
+    df.loc[1, "GPU"] = "other"
+
+    with pytest.raises(AssertionError, match="Column 'GPU' has multiple values"):
+        transformation.aggregate_data(df, kernel_func, None, False)
+
+
+def make_noisy_df() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    values = [rng.normal(10, 1, 20), rng.normal(5, 0.5, 20)]
+    values[0][3] = 100.0
+    values[1][7] = np.nan
+    return pd.DataFrame(
+        {
+            "Annotation": ["a"] * 40,
+            "Value": np.concatenate(values),
+            "n": [1] * 20 + [2] * 20,
+        }
+    )
+
+
+def single_arg_func(n: int) -> None:
+    pass
+
+
+def test_aggregate_data_statistics() -> None:
+    df = make_noisy_df()
+    agg_df = transformation.aggregate_data(
+        df.copy(),
+        single_arg_func,
+        None,
+        False,
+        statistics=["median", "p90", "trimmed_mean"],
+    )
+
+    assert agg_df.columns[agg_df.columns.get_loc("NumRuns") + 1 :][:3].tolist() == [
+        "MedianValue",
+        "P90Value",
+        "TrimmedMeanValue",
+    ]
+    for i, (_, group) in enumerate(df.groupby("n")):
+        values = group["Value"].dropna().to_numpy()
+        assert agg_df["MedianValue"][i] == pytest.approx(np.median(values))
+        assert agg_df["P90Value"][i] == pytest.approx(np.quantile(values, 0.9))
+        cut = int(len(values) * 0.1)
+        assert agg_df["TrimmedMeanValue"][i] == pytest.approx(
+            np.sort(values)[cut : len(values) - cut].mean()
+        )
+
+
+@pytest.mark.parametrize("method", ["mad", "iqr"])
+def test_aggregate_data_outlier_rejection(method: Literal["mad", "iqr"]) -> None:
+    agg_df = transformation.aggregate_data(
+        make_noisy_df(), single_arg_func, None, False, outlier_rejection=method
+    )
+
+    assert agg_df["OutliersRemoved"][0] >= 1
+    assert agg_df["MaxValue"][0] < 100.0
+    assert agg_df["AvgValue"][0] == pytest.approx(10, abs=1)
+    assert (agg_df["NumRuns"] + agg_df["OutliersRemoved"]).tolist() == [20, 19]
+
+
+def test_aggregate_data_confidence_intervals() -> None:
+    pytest.importorskip("scipy")
+    df = make_noisy_df()
+    normal = transformation.aggregate_data(df.copy(), single_arg_func, None, False)
+    t = transformation.aggregate_data(
+        df.copy(), single_arg_func, None, False, ci_method="t"
+    )
+    bootstrap = transformation.aggregate_data(
+        df.copy(), single_arg_func, None, False, ci_method="bootstrap"
+    )
+
+    # The t-distribution has heavier tails than the normal distribution
+    assert (t["CI95_Lower"] < normal["CI95_Lower"]).all()
+    assert (t["CI95_Upper"] > normal["CI95_Upper"]).all()
+    assert (bootstrap["CI95_Lower"] < bootstrap["AvgValue"]).all()
+    assert (bootstrap["CI95_Upper"] > bootstrap["AvgValue"]).all()
+    assert bootstrap["CI95_Lower"][1] == pytest.approx(
+        normal["CI95_Lower"][1], rel=0.05
+    )
+
+    # Every group keeps its own interval when the input is not in sorted order
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(
+        {
+            "Annotation": ["zeta"] * 20 + ["alpha"] * 20 + ["mid"] * 20,
+            "Value": np.concatenate(
+                [rng.normal(1000, 1, 20), rng.normal(10, 1, 20), rng.normal(500, 1, 20)]
+            ),
+            "n": [1] * 60,
+        }
+    )
+    bootstrap = transformation.aggregate_data(
+        df, single_arg_func, None, False, ci_method="bootstrap"
+    )
+    assert bootstrap["Annotation"].tolist() == ["zeta", "alpha", "mid"]
+    assert (bootstrap["CI95_Lower"] < bootstrap["AvgValue"]).all()
+    assert (bootstrap["CI95_Upper"] > bootstrap["AvgValue"]).all()
+
+
+def test_statistic_column() -> None:
+    assert transformation.statistic_column("p99.9") == "P99.9Value"
+    with pytest.raises(ValueError):
+        transformation.statistic_column("p200")
+
+
+def test_aggregate_data_merge_previous() -> None:
+    df = make_noisy_df()
+    df.insert(2, "dram__bytes.sum", np.arange(40.0))
+    df.attrs[utils.AGGREGATIONS_ATTR] = {"dram__bytes.sum": "mean"}
+    first, second = df.iloc[::2].copy(), df.iloc[1::2].copy()
+
+    expected = transformation.aggregate_data(
+        df, single_arg_func, None, False, statistics=["median"]
+    )
+    previous = transformation.aggregate_data(
+        first, single_arg_func, None, False, statistics=["median"], keep_state=True
+    )
+    assert previous.columns[-1] == aggregates.STATE_COLUMN
+
+    merged = transformation.aggregate_data(
+        second, single_arg_func, None, False, statistics=["median"], previous=previous
+    )
+
+    assert merged["NumRuns"].tolist() == [20, 19]
+    for col in ["AvgValue", "StdDev", "MinValue", "MaxValue", "CI95_Lower", "Geomean"]:
+        assert merged[col].tolist() == pytest.approx(expected[col].tolist())
+    # Additional metrics are weighted by the number of valid runs of each chunk
+    assert merged["dram__bytes.sum"].tolist() == pytest.approx(
+        expected["dram__bytes.sum"].tolist(), rel=0.01
+    )
+    assert merged["MedianValue"].tolist() == pytest.approx(
+        expected["MedianValue"].tolist(), rel=0.05
+    )
+
+    # Outliers are rejected per chunk and their counts are summed
+    previous = transformation.aggregate_data(
+        first, single_arg_func, None, False, outlier_rejection="mad", keep_state=True
+    )
+    current = transformation.aggregate_data(
+        second, single_arg_func, None, False, outlier_rejection="mad"
+    )
+    merged = transformation.aggregate_data(
+        second, single_arg_func, None, False, outlier_rejection="mad", previous=previous
+    )
+    assert (
+        merged["OutliersRemoved"].tolist()
+        == (previous["OutliersRemoved"] + current["OutliersRemoved"]).tolist()
+    )
+
+
+def make_comparison_df() -> pd.DataFrame:
+    rng = np.random.default_rng(2)
+    frames = []
+    for annotation, speedup in [("base", 1.0), ("fast", 1.5), ("same", 1.0)]:
+        for n in [1, 2]:
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Annotation": annotation,
+                        "Value": rng.normal(10 / speedup, 0.5, 15),
+                        "n": n,
+                    }
+                )
+            )
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize("test", ["welch", "mannwhitney"])
+def test_compare_annotations(test: Literal["welch", "mannwhitney"]) -> None:
+    scipy_stats = pytest.importorskip("scipy.stats")
+    df = make_comparison_df()
+    agg_df = transformation.aggregate_data(df.copy(), single_arg_func, None, False)
+    compared = transformation.compare_annotations(
+        df, agg_df, single_arg_func, "base", test=test, correction="none"
+    )
+
+    baseline = compared["Annotation"] == "base"
+    assert compared.loc[baseline, ["Speedup", "PValue"]].isna().all().all()
+    assert not compared.loc[baseline, "Significant"].any()
+    assert compared["Significant"].tolist() == [False, False, True, True, False, False]
+
+    for _, row in compared[~baseline].iterrows():
+        values = df.loc[(df["Annotation"] == row["Annotation"]) & (df["n"] == row["n"])]
+        reference = df.loc[(df["Annotation"] == "base") & (df["n"] == row["n"])]
+        if test == "welch":
+            expected = scipy_stats.ttest_ind(
+                values["Value"], reference["Value"], equal_var=False
+            ).pvalue
+        else:
+            expected = scipy_stats.mannwhitneyu(
+                values["Value"], reference["Value"], method="asymptotic"
+            ).pvalue
+        assert row["PValue"] == pytest.approx(expected)
+        assert row["Speedup"] == pytest.approx(
+            reference["Value"].mean() / values["Value"].mean()
+        )
+        assert row["SpeedupCI95_Lower"] < row["Speedup"] < row["SpeedupCI95_Upper"]
+
+    with pytest.raises(ValueError, match="missing"):
+        transformation.compare_annotations(df, agg_df, single_arg_func, "missing")
+
+
+def test_adjust_p_values() -> None:
+    p_values = np.array([0.01, 0.04, np.nan, 0.03, 0.005])
+
+    holm = transformation._adjust_p_values(p_values, "holm")
+    assert holm[[4, 0, 3, 1]] == pytest.approx([0.02, 0.03, 0.06, 0.06])
+    assert np.isnan(holm[2])
+    bh = transformation._adjust_p_values(p_values, "fdr_bh")
+    assert bh[[4, 0, 3, 1]] == pytest.approx([0.02, 0.02, 0.04, 0.04])
+    bonferroni = transformation._adjust_p_values(p_values, "bonferroni")
+    assert bonferroni[[4, 0, 3, 1]] == pytest.approx([0.02, 0.04, 0.12, 0.16])
+
+
+def test_sequential_p_values() -> None:
+    # Without a difference, the p-values rarely fall below the significance level
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(10, 1, (2, 500, 40))
+    p_values = transformation.sequential_p_values(
+        a.mean(axis=1),
+        a.var(axis=1, ddof=1),
+        40,
+        b.mean(axis=1),
+        b.var(axis=1, ddof=1),
+        40,
+        2.0,
+    )
+    assert (p_values <= transformation.SIGNIFICANCE_LEVEL).mean() < 0.02
+
+    p_values = transformation.sequential_p_values(
+        np.array([10.0, 10.0, 10.0, 10.0]),
+        np.array([1.0, 1.0, 0.0, np.nan]),
+        np.array([20, 20, 5, 1]),
+        np.array([12.0, 10.0, 11.0, 20.0]),
+        np.array([1.0, 1.0, 0.0, np.nan]),
+        np.array([20, 20, 5, 1]),
+        np.array([2.0, 2.0, 0.0, 2.0]),
+    )
+    assert p_values[0] < 0.001
+    assert p_values[1] == 1.0
+    assert p_values[2] == 0.0
+    assert p_values[3] == 1.0
+
+    # Without a mixture variance, nothing is decided
+    p_values = transformation.sequential_p_values(12.0, 1.0, 20, 10.0, 1.0, 20, np.nan)
+    assert p_values == 1.0
+
+
+def test_flag_noise_floor() -> None:
+    agg_df = pd.DataFrame(
+        {
+            "AvgValue": [3.5, 10.0, 1.0],
+            "NoiseFloor": [3.0, 3.0, np.nan],
+            "NoiseFloorStdDev": [0.5, 0.5, np.nan],
+        }
+    )
+
+    flagged = transformation.flag_noise_floor(agg_df)
+    assert flagged["NearNoiseFloor"].tolist() == [True, False, False]
+    flagged = transformation.flag_noise_floor(agg_df, sigmas=1.0, subtracted=True)
+    assert flagged["NearNoiseFloor"].tolist() == [False, False, False]
+
+    # Normalized averages are compared in the unit of the metric
+    normalized = agg_df.assign(
+        AvgValue=[2.0, 2.0, 2.0], NormalizationValue=[7.0, 20.0, 2.0]
+    )
+    flagged = transformation.flag_noise_floor(normalized)
+    assert flagged["NearNoiseFloor"].tolist() == [True, False, False]
+
+    with pytest.raises(exceptions.ProfilerException):
+        transformation.flag_noise_floor(agg_df.drop(columns="NoiseFloor"))
+
+
+def test_normalize_clocks() -> None:
+    compute, memory = transformation.CLOCK_THROUGHPUT_METRICS.values()
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 4,
+            "Value": [100.0, 100.0, 100.0, 100.0],
+            "Metric": ["gpu__time_duration.sum"] * 3 + ["dram__bytes.sum"],
+            "Transformed": [False] * 4,
+            "ComputeClock": [1000, 2000, 2000, 2000],
+            "MemoryClock": [500, 1000, 1000, 1000],
+            compute: [80.0, 20.0, np.nan, 80.0],
+            memory: [20.0, 80.0, np.nan, 20.0],
+            "n": [1, 2, 3, 4],
+        }
+    )
+    raw_df.attrs[utils.AGGREGATIONS_ATTR] = {compute: "mean", memory: "mean"}
+
+    df = transformation.normalize_clocks(raw_df, single_arg_func, 1000, 1000)
+
+    # Compute bound runs scale with the compute clock, memory bound runs with the
+    # memory clock, and non-time metrics are left untouched
+    assert df["ClockScale"].tolist() == pytest.approx([0.9, 1.2, 2.0, 1.0])
+    assert df["Value"].tolist() == pytest.approx([90.0, 120.0, 200.0, 100.0])
+    assert df["OriginalValue"].tolist() == [100.0] * 4
+    assert df.columns[-3:].tolist() == ["OriginalValue", "ClockScale", "n"]
+    assert df.attrs[utils.AGGREGATIONS_ATTR]["ClockScale"] == "mean"
+
+    agg_df = transformation.aggregate_data(df, single_arg_func, None, False)
+    assert agg_df["ClockScale"].tolist() == pytest.approx([0.9, 1.2, 2.0, 1.0])
+
+    with pytest.raises(ValueError):
+        transformation.normalize_clocks(raw_df, single_arg_func, 0, 1000)
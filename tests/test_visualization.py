@@ -0,0 +1,389 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the plotting of processed profiling data.
+"""
+
+from pathlib import Path
+
+import matplotlib.cbook
+import matplotlib.figure
+import numpy as np
+import pandas as pd
+import pytest
+
+from nsight import exceptions, store, visualization
+
+
+def make_agg_df(**columns: list[float]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Annotation": ["a", "a", "b", "b"],
+            "n": [1, 2, 1, 2],
+            "AvgValue": [1.0, 2.0, 3.0, 4.0],
+            "NumRuns": [2] * 4,
+            "Metric": ["gpu__time_duration.sum"] * 4,
+            "GPU": ["Test GPU"] * 4,
+            "Host": ["host"] * 4,
+            "Geomean": [1.4, 1.4, 3.5, 3.5],
+            **columns,
+        }
+    )
+
+
+def test_visualize_roofline(tmp_path: Path) -> None:
+    agg_df = make_agg_df(
+        ArithmeticIntensity=[1.0, 2.0, 50.0, 100.0],
+        AttainedFLOPs=[1e11, 2e11, 5e12, 8e12],
+        PeakFLOPs=[1e13] * 4,
+        PeakBandwidth=[1e12] * 4,
+        FLOP=[1.0] * 4,
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "roofline.png"),
+        plot_type="roofline",
+        plot_callback=figures.append,
+    )
+
+    ax = figures[0].axes[0]
+    assert ax.get_xscale() == "log" and ax.get_yscale() == "log"
+    # One scatter per annotation, below the ceilings
+    assert len(ax.collections) == 2
+    assert (tmp_path / "roofline.png").exists()
+
+
+def test_visualize_variants(tmp_path: Path) -> None:
+    agg_df = pd.DataFrame(
+        {
+            "Annotation": ["b", "a", "b", "a", "b", "a"],
+            "dtype": ["f16", "f16", "f32", "f32", "f16", "f16"],
+            "n": [1, 1, 1, 1, 2, 2],
+            "AvgValue": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            "NumRuns": [2] * 6,
+            "Metric": ["gpu__time_duration.sum"] * 6,
+            "GPU": ["Test GPU"] * 6,
+            "Host": ["host"] * 6,
+            "Geomean": [1.0] * 6,
+        }
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    result = visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "variants.png"),
+        variant_fields=["dtype"],
+        variant_annotations=["b"],
+        plot_callback=figures.append,
+    )
+
+    # Other annotations first, then the variants in order of appearance
+    assert list(dict.fromkeys(result["Annotation"])) == [
+        "a",
+        "b dtype=f16",
+        "b dtype=f32",
+    ]
+    assert result["Configuration"].tolist()[:3] == ["n=1", "n=1", "n=2"]
+    legend = figures[0].axes[0].get_legend()
+    assert legend is not None
+    assert [text.get_text() for text in legend.get_texts()] == [
+        "a",
+        "b dtype=f16",
+        "b dtype=f32",
+    ]
+
+
+def test_visualize_many_points(tmp_path: Path) -> None:
+    n = visualization.MAX_TEXT_ARTISTS + 1
+    agg_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * n,
+            "n": range(n),
+            "AvgValue": [float(i) for i in range(n)],
+            "NumRuns": [2] * n,
+            "Metric": ["gpu__time_duration.sum"] * n,
+            "GPU": ["Test GPU"] * n,
+            "Host": ["host"] * n,
+            "Geomean": [1.0] * n,
+        }
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "sweep.png"),
+        show_avg=False,
+        show_geomean=False,
+        plot_callback=figures.append,
+    )
+
+    # The value labels are one collection instead of a text artist per point
+    ax = figures[0].axes[0]
+    assert not ax.texts
+    labels = [c for c in ax.collections if len(c.get_paths()) == n]
+    assert len(labels) == 1
+    assert (tmp_path / "sweep.png").exists()
+
+
+def test_visualize_in_background(tmp_path: Path) -> None:
+    for name in ["a", "b"]:
+        visualization.visualize_in_background(
+            make_agg_df(), None, None, filename=str(tmp_path / f"{name}.png")
+        )
+
+    results = visualization.wait_for_plots()
+
+    assert len(results) == 2
+    assert (tmp_path / "a.png").exists() and (tmp_path / "b.png").exists()
+    assert visualization.wait_for_plots() == []
+
+
+def test_visualize_in_background_error(tmp_path: Path) -> None:
+    visualization.visualize_in_background(
+        make_agg_df(), ["n"], None, x_keys=["n"], filename=str(tmp_path / "a.png")
+    )
+
+    with pytest.raises(exceptions.ProfilerException):
+        visualization.wait_for_plots()
+
+
+def test_visualize_skip_unchanged(tmp_path: Path) -> None:
+    filename = tmp_path / "plot.png"
+
+    first = visualization.visualize(make_agg_df(), None, None, filename=str(filename))
+    saved = filename.stat().st_mtime_ns
+    second = visualization.visualize(make_agg_df(), None, None, filename=str(filename))
+
+    # Identical data and arguments: the plot is not rendered again
+    assert filename.stat().st_mtime_ns == saved
+    pd.testing.assert_frame_equal(first, second)
+
+    changed = make_agg_df()
+    changed.loc[0, "AvgValue"] = 10.0
+    visualization.visualize(changed, None, None, filename=str(filename))
+    assert filename.stat().st_mtime_ns != saved
+
+
+def test_visualize_heatmap(tmp_path: Path) -> None:
+    agg_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 6 + ["b"] * 6,
+            "m": [1, 1, 1, 2, 2, 2] * 2,
+            "n": [1, 2, 4] * 4,
+            "AvgValue": [float(i) for i in range(12)],
+            "NumRuns": [2] * 12,
+            "Metric": ["gpu__time_duration.sum"] * 12,
+            "GPU": ["Test GPU"] * 12,
+            "Host": ["host"] * 12,
+            "Geomean": [1.0] * 12,
+        }
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "heatmap.png"),
+        plot_type="heatmap",
+        y_keys=["m"],
+        plot_callback=figures.append,
+    )
+
+    # One image per annotation, with m along the y-axis and n along the x-axis
+    axes = figures[0].axes[:2]
+    for ax, offset in zip(axes, [0, 6]):
+        (image,) = ax.get_images()
+        array = image.get_array()
+        assert array is not None
+        assert array.tolist() == [
+            [offset + 0.0, offset + 1.0, offset + 2.0],
+            [offset + 3.0, offset + 4.0, offset + 5.0],
+        ]
+        assert [t.get_text() for t in ax.get_xticklabels()] == ["n=1", "n=2", "n=4"]
+    assert [t.get_text() for t in axes[0].get_yticklabels()] == ["m=1", "m=2"]
+
+    with pytest.raises(ValueError):
+        visualization.visualize(
+            agg_df, None, None, filename=str(tmp_path / "a.png"), plot_type="heatmap"
+        )
+
+
+def test_lttb_indices() -> None:
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[500] = 10.0
+    y[700] = np.nan
+
+    indices = visualization._lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    # Outliers are kept, missing values dropped
+    assert 500 in indices and 700 not in indices
+    np.testing.assert_array_equal(
+        visualization._lttb_indices(x[:50], y[:50], 100), x[:50]
+    )
+
+
+def test_visualize_numeric_x(tmp_path: Path) -> None:
+    n = [2**i for i in range(20)]
+    agg_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 20,
+            "n": n[::-1],
+            "AvgValue": [float(i) for i in range(20)],
+            "NumRuns": [2] * 20,
+            "Metric": ["gpu__time_duration.sum"] * 20,
+            "GPU": ["Test GPU"] * 20,
+            "Host": ["host"] * 20,
+            "Geomean": [1.0] * 20,
+        }
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "sweep.png"),
+        x_scale="log",
+        max_points=10,
+        plot_callback=figures.append,
+    )
+
+    ax = figures[0].axes[0]
+    assert ax.get_xscale() == "log"
+    (line,) = ax.get_lines()
+    x = np.asarray(line.get_xdata())
+    assert len(x) == 10 and x[0] == 1 and x[-1] == 2**19
+    assert np.all(np.diff(x) > 0)
+
+    with pytest.raises(ValueError):
+        visualization.visualize(
+            agg_df, None, None, filename=str(tmp_path / "a.png"), x_scale="symlog"
+        )
+
+
+def test_box_stats() -> None:
+    rng = np.random.default_rng(0)
+    runs = [np.sort(rng.standard_t(3, size)) for size in [5, 40, 200]]
+
+    stats = visualization._box_stats(runs)
+
+    for values, result in zip(runs, stats):
+        (expected,) = matplotlib.cbook.boxplot_stats(values)
+        for key in ["med", "q1", "q3", "whislo", "whishi"]:
+            assert result[key] == pytest.approx(expected[key])
+        np.testing.assert_array_equal(np.sort(result["fliers"]), expected["fliers"])
+
+
+@pytest.mark.parametrize("plot_type", visualization.DISTRIBUTION_PLOT_TYPES)
+def test_visualize_distribution(tmp_path: Path, plot_type: str) -> None:
+    agg_df = make_agg_df()
+    raw_df = pd.DataFrame(
+        {
+            "Annotation": ["a"] * 6 + ["b"] * 6,
+            "Value": [1.0, 1.5, 2.0, 2.0, 2.5, 3.0, 3.0, 3.5, 4.0, 4.0, 4.5, 5.0],
+            "Metric": ["gpu__time_duration.sum"] * 12,
+            "n": [1, 1, 1, 2, 2, 2] * 2,
+        }
+    )
+    figures: list[matplotlib.figure.Figure] = []
+
+    result = visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / f"{plot_type}.png"),
+        plot_type=plot_type,
+        raw_df=raw_df,
+        plot_callback=figures.append,
+    )
+
+    assert "_RunValues" not in result and "_RunValues" not in agg_df
+    ax = figures[0].axes[0]
+    legend = ax.get_legend()
+    assert legend is not None
+    assert [text.get_text() for text in legend.get_texts()] == ["a", "b"]
+    assert [t.get_text() for t in ax.get_xticklabels()] == ["n=1", "n=2"]
+    if plot_type == "strip":
+        points = np.concatenate(
+            [np.asarray(c.get_offsets())[:, 1] for c in ax.collections]
+        )
+        assert sorted(points) == sorted(raw_df["Value"])
+
+    with pytest.raises(ValueError):
+        visualization.visualize(
+            agg_df, None, None, filename=str(tmp_path / "a.png"), plot_type=plot_type
+        )
+
+
+def test_visualize_error_bars(tmp_path: Path) -> None:
+    agg_df = make_agg_df(CI95_Lower=[0.5, 1.5, 2.5, 3.5], CI95_Upper=[2, 3, 4, 5])
+    figures: list[matplotlib.figure.Figure] = []
+
+    visualization.visualize(
+        agg_df,
+        None,
+        None,
+        filename=str(tmp_path / "errors.png"),
+        error_bars=True,
+        plot_callback=figures.append,
+    )
+
+    ax = figures[0].axes[0]
+    assert len(ax.containers) >= 2
+    # The whiskers reach the upper bound of every confidence interval
+    assert ax.get_ylim()[1] == pytest.approx(5 * 1.1)
+
+
+def test_visualize_history(tmp_path: Path) -> None:
+    pytest.importorskip("scipy")
+    results_store = store.ResultsStore(str(tmp_path / "results.db"))
+    for revision, timestamp, slowdown in [
+        ("v1", 1.0, 0),
+        ("v2", 2.0, 5),
+        ("v3", 3.0, 0),
+    ]:
+        results = make_agg_df(StdDev=[0.1] * 4, MinValue=[0.0] * 4, MaxValue=[9.0] * 4)
+        results["AvgValue"] += [slowdown, 0, 0, 0]
+        results_store.append(results, "bench", revision, timestamp)
+    figures: list[matplotlib.figure.Figure] = []
+
+    history = visualization.visualize_history(
+        results_store,
+        "bench",
+        filename=str(tmp_path / "history.png"),
+        last=2,
+        plot_callback=figures.append,
+    )
+
+    # Only the last two revisions, with the slowdown of v2 recovered in v3
+    assert history["Revision"].unique().tolist() == ["v2", "v3"]
+    ax = figures[0].axes[0]
+    assert [t.get_text() for t in ax.get_xticklabels()] == ["v2", "v3"]
+    legend = ax.get_legend()
+    assert legend is not None
+    assert [text.get_text() for text in legend.get_texts()] == ["a", "b"]
+    assert (tmp_path / "history.png").exists()
+
+    history = visualization.visualize_history(
+        results_store, "bench", filename=str(tmp_path / "history.png")
+    )
+    assert history["Regression"].sum() == 1
+
+    with pytest.raises(exceptions.ProfilerException):
+        visualization.visualize_history(
+            results_store, "other", filename=str(tmp_path / "other.png")
+        )